@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# benchmarks/params_tree.py
+
+"""Benchmark ``ParamsTree`` operations on a large synthetic tree.
+
+Usage:
+    python benchmarks/params_tree.py [<n_leaves>] [<repeat>]
+
+Requires deNEST to be installed (eg ``pip install -e .``).
+"""
+
+import sys
+import time
+
+from denest.parameters import ParamsTree
+
+DEPTH = 4
+
+
+def synthetic_tree(n_leaves, branching=10, n_params=5):
+    """Return a tree-like dict with ``n_leaves`` leaves and data at each level.
+
+    The leaves' data overrides some of the inherited data.
+    """
+
+    def node(level, index):
+        data = {
+            "params": {f"p{level}_{i}": index + i for i in range(n_params)},
+            "nest_params": {f"np{level}_{i}": float(i) for i in range(n_params)},
+        }
+        if level == DEPTH - 1:
+            data["params"]["p0_0"] = index
+            return data
+        n_children = branching if level < DEPTH - 2 else n_leaves // branching ** (
+            DEPTH - 2
+        )
+        for i in range(n_children):
+            data[f"n{level + 1}_{i}"] = node(level + 1, i)
+        return data
+
+    return node(0, 0)
+
+
+def lookups(tree):
+    """Read all the inherited data of all the leaves."""
+    total = 0
+    for leaf in tree.leaves():
+        for key in ParamsTree.DATA_KEYS:
+            data = leaf.data[key]
+            total += len(data)
+            for name in data:
+                data[name]  # pylint: disable=pointless-statement
+    return total
+
+
+def timeit(function, repeat):
+    """Return the best time (s) of ``repeat`` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n_leaves=10000, repeat=3):
+    mapping = synthetic_tree(n_leaves)
+    tree = ParamsTree(mapping)
+    other = ParamsTree(synthetic_tree(n_leaves))
+    overrides = ParamsTree({"params": {"p0_0": -1}, "n1_0": {"params": {"p1_0": -1}}})
+    # Leaf names are only unique within the lowest subtrees
+    subtree = tree.find("n1_0/n2_0")
+    names = [name for name, _ in subtree.named_leaves()]
+    paths = [
+        "/".join(str(node.name) for node in [leaf, *leaf.ancestors()][-2::-1])
+        for leaf in tree.leaves()
+    ]
+    print(f"ParamsTree benchmark: {len(tree.leaves())} leaves, depth {DEPTH}")
+    benchmarks = {
+        "construction": lambda: ParamsTree(mapping),
+        "inherited lookups": lambda: lookups(tree),
+        "leaves": tree.leaves,
+        "named_leaves": tree.named_leaves,
+        "find": lambda: [tree.find(path) for path in paths],
+        "leaf": lambda: [subtree.leaf(name) for name in names],
+        "copy": tree.copy,
+        "merge": lambda: ParamsTree.merge(tree, other),
+        "merge (overrides)": lambda: ParamsTree.merge(overrides, tree),
+    }
+    for name, function in benchmarks.items():
+        print(f"  {name:<20} {1000 * timeit(function, repeat):10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# benchmarks/startup.py
+
+"""Benchmark the parameter tree handling of ``Network`` construction.
+
+``Simulation`` and ``Network`` add the subtrees they are built from as
+children of their own tree. This compares adding children by re-parenting a
+shared copy of the subtrees (current) with rebuilding them from nested
+dictionaries (baseline), and times the construction of the example network if
+NEST is installed.
+
+Usage:
+    python benchmarks/startup.py [<n_leaves>] [<repeat>]
+
+Requires deNEST to be installed (eg ``pip install -e .``).
+"""
+
+import sys
+from pathlib import Path
+
+from params_tree import synthetic_tree, timeit
+
+from denest import load_trees
+from denest.parameters import ParamsTree
+
+EXAMPLE_TREE = Path(__file__).parents[1] / "params" / "tree_paths.yml"
+
+
+def add_children(parent, subtrees, baseline=False):
+    """Add subtrees as children of a tree, as in ``_update_tree_child``."""
+    for name, subtree in subtrees.items():
+        if baseline:
+            child = ParamsTree(subtree.asdict(), parent=parent, name=name)
+        else:
+            child = subtree.copy(parent=parent, name=name)
+        parent.children[name] = child
+
+
+def main(n_leaves=10000, repeat=3):
+    example = load_trees(EXAMPLE_TREE)
+    network_tree = example.children["network"]
+    synthetic = ParamsTree({f"child_{i}": synthetic_tree(n_leaves // 10)
+                            for i in range(10)})
+    print(f"Startup benchmark: {len(synthetic.leaves())} synthetic leaves")
+    benchmarks = {}
+    for name, tree in [("example network", network_tree),
+                       ("synthetic", synthetic)]:
+        subtrees = dict(tree.children)
+        for label, baseline in [("baseline", True), ("shared", False)]:
+            benchmarks[f"children: {name} ({label})"] = (
+                lambda subtrees=subtrees, baseline=baseline: add_children(
+                    ParamsTree(), subtrees, baseline=baseline
+                )
+            )
+    try:
+        import nest  # pylint: disable=unused-import
+    except ImportError:
+        print("  NEST isn't installed: skipping `Network` construction")
+    else:
+        from denest.network import Network
+
+        benchmarks["Network construction"] = lambda: Network(network_tree)
+    for name, function in benchmarks.items():
+        print(f"  {name:<36} {1000 * timeit(function, repeat):10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -5,7 +5,9 @@
 """deNEST: a declarative frontend for NEST"""
 
 import logging.config
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pprint import pformat
 
@@ -13,12 +15,16 @@ from .__about__ import *
 from .io.load import load_yaml
 from .network import Network
 from .parameters import ParamsTree
+from .pool import SimulationPool
 from .session import Session
 from .simulation import Simulation
-from .utils import misc
+from .sweep import fork_sweep, sweep
+from .utils import cache as output_cache
+from .utils import misc, parse_cache
 
 __all__ = [
-    "load_trees", "run", "Simulation", "Network", "Session", "ParamsTree"
+    "load_trees", "run", "sweep", "fork_sweep", "Simulation", "Network",
+    "Session", "ParamsTree", "SimulationPool"
 ]
 
 logging.config.dictConfig(
@@ -41,14 +47,26 @@ logging.config.dictConfig(
 log = logging.getLogger(__name__)
 
 
-def load_trees(path, *overrides):
+def load_trees(path, *overrides, parse_cache_dir=None, n_threads=None):
     """Load a list of parameter files, optionally overriding some values.
 
+    Parameter files are read and parsed in a pool of threads, and parsed
+    files are optionally cached (see :mod:`denest.utils.parse_cache`). The
+    time spent loading each file is logged at the DEBUG level.
+
     Args:
         path (str): The filepath to load.
         *overrides (tree-like): Variable number of tree-like parameters that
             should override those from the path. Last in list is applied first.
 
+    Keyword Args:
+        parse_cache_dir (str | None): Directory of the cache of parsed
+            parameter files. Defaults to the ``DENEST_PARSE_CACHE_DIR``
+            environment variable. If None, parsed files aren't cached.
+        n_threads (int | None): Number of threads loading parameter files.
+            Defaults to the number of files, up to 16 and to four times the
+            number of CPUs.
+
     Returns:
         ParamsTree: The loaded parameter tree with overrides applied.
     """
@@ -61,18 +79,40 @@ def load_trees(path, *overrides):
     rel_path_list = load_yaml(path)
     log.info("Finished loading parameter file paths")
     log.info("Loading parameters files: \n%s", pformat(rel_path_list))
-    return ParamsTree.merge(
+    start_time = time.perf_counter()
+    paths = [Path(path.parent, relative_path) for relative_path in rel_path_list]
+    if n_threads is None:
+        n_threads = min(16, len(paths), 4 * (os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=max(1, n_threads)) as executor:
+        # `map` returns the trees in the order of the files, which sets the
+        # precedence of the merge
+        trees = list(
+            executor.map(lambda path: _load_tree(path, parse_cache_dir), paths)
+        )
+    tree = ParamsTree.merge(
         *[ParamsTree(overrides_tree) for overrides_tree in overrides],
-        *[
-            ParamsTree.read(Path(path.parent, relative_path))
-            for relative_path in rel_path_list
-        ],
+        *trees,
         name=path,
     )
-    log.info("Finished loading parameter files.")
+    log.info(
+        "Finished loading parameter files in %.3f s",
+        time.perf_counter() - start_time,
+    )
+    return tree
+
+
+def _load_tree(path, parse_cache_dir):
+    """Load a parameter file and log the time spent."""
+    start_time = time.perf_counter()
+    tree = ParamsTree(parse_cache.load(path, parse_cache_dir))
+    log.debug(
+        "Loaded parameter file %s in %.3f s", path, time.perf_counter() - start_time
+    )
+    return tree
 
 
-def run(path, *overrides, output_dir=None, input_dir=None):
+def run(path, *overrides, output_dir=None, input_dir=None, cache=False,
+        cache_dir=None):
     """Run the simulation specified by the parameters at ``path``.
 
     Args:
@@ -87,6 +127,19 @@ def run(path, *overrides, output_dir=None, input_dir=None):
         output_dir (str | None): None or the path to the output directory.
             Passed to :class:`Simulation` If defined, overrides the
             ``output_dir`` simulation parameter.
+        cache (bool): If true, the simulation is skipped if the output
+            directory already contains the output of a completed simulation
+            with the same fingerprint (see :mod:`denest.utils.cache`).
+        cache_dir (str | None): If not None, path to a directory in which the
+            output directories of completed simulations are recorded by
+            fingerprint. If the output of a simulation with the same
+            fingerprint is recorded and the output directory doesn't exist,
+            the simulation is skipped and the output directory is linked to
+            the recorded output.
+
+    Returns:
+        Simulation | None: The simulation that was run, or None if it was
+            skipped.
     """
     # Timing of simulation time
     start_time = time.time()
@@ -97,6 +150,19 @@ def run(path, *overrides, output_dir=None, input_dir=None):
     # Load parameters
     tree = load_trees(path, *overrides)
 
+    # Skip simulations whose output already exists
+    fingerprint = None
+    if cache or cache_dir is not None:
+        fingerprint, cached_output_dir = _cached_output(
+            tree, input_dir, output_dir, cache, cache_dir
+        )
+        if cached_output_dir is not None:
+            log.info(
+                "Skipping simulation: output of completed simulation found at "
+                "%s", cached_output_dir
+            )
+            return None
+
     # Initialize simulation
     log.info("Initializing simulation...")
     sim = Simulation(tree, input_dir=input_dir, output_dir=output_dir)
@@ -111,3 +177,41 @@ def run(path, *overrides, output_dir=None, input_dir=None):
     log.info("Total simulation virtual time: %s ms", sim.total_time())
     log.info("Total simulation real time: %s", misc.pretty_time(start_time))
     log.info("Simulation output written to: %s", Path(sim.output_dir).resolve())
+
+    # Mark the output as complete
+    if fingerprint is not None:
+        output_cache.mark_complete(sim.output_dir, fingerprint)
+        if cache_dir is not None:
+            output_cache.link_output(cache_dir, fingerprint, sim.output_dir)
+    return sim
+
+
+def _cached_output(tree, input_dir, output_dir, use_output_dir, cache_dir):
+    """Return the fingerprint of a simulation and its existing output or None.
+
+    The output directory is linked to the output recorded in ``cache_dir`` if
+    it doesn't exist.
+    """
+    if "simulation" in tree.children:
+        sim_params = tree.children["simulation"].params
+    else:
+        sim_params = {}
+    defaults = Simulation.OPTIONAL_SIM_PARAMS
+    if input_dir is None:
+        input_dir = sim_params.get("input_dir", defaults["input_dir"])
+    if output_dir is None:
+        output_dir = sim_params.get("output_dir", defaults["output_dir"])
+    fingerprint = output_cache.simulation_fingerprint(tree, input_dir)
+    log.info("Simulation fingerprint: %s", fingerprint)
+    if use_output_dir and output_cache.is_complete(output_dir, fingerprint):
+        return fingerprint, Path(output_dir)
+    if cache_dir is not None:
+        cached = output_cache.cached_output(cache_dir, fingerprint)
+        output_path = Path(output_dir)
+        if cached is not None and not (
+            output_path.exists() or output_path.is_symlink()
+        ):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.symlink_to(cached, target_is_directory=True)
+            return fingerprint, cached
+    return fingerprint, None
@@ -6,17 +6,23 @@ deNEST: a declarative interface to NEST
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 Usage:
-    python -m denest <tree_paths.yml> [options]
+    python -m denest <tree_paths.yml> [--output=PATH]
+    python -m denest sweep <tree_paths.yml> <sweep.yml> [--output=PATH] [--workers=N] [--threads=N]
     python -m denest -h | --help
     python -m denest -v | --version
 
 Arguments:
     <tree_paths.yml>  YAML file containing list of relative paths of files to
                       load and merge into a parameter tree
+    <sweep.yml>       YAML file containing the list of override trees of the
+                      points of a parameter sweep
 
 Options:
     -o --output=PATH  Directory in which simulation results will be saved.
-                      Overrides ``'output_dir'`` simulation parameter.
+                      Overrides ``'output_dir'`` simulation parameter. For
+                      sweeps, directory containing the output of each point.
+    --workers=N       Number of worker processes of a sweep.
+    --threads=N       Number of NEST threads per worker of a sweep.
     -h --help         Show this.
     -v --version      Show version.
 """
@@ -25,8 +31,9 @@ import sys
 
 from docopt import docopt
 
-from . import run
+from . import run, sweep
 from .__about__ import __version__
+from .io.load import load_yaml
 from .utils.autodict import AutoDict
 
 # Maps CLI options to their corresponding path in the parameter tree.
@@ -51,7 +58,20 @@ def main():
         }
     )
     # Run it!
-    run(arguments["<tree_paths.yml>"], overrides)
+    if arguments["sweep"]:
+        sweep(
+            arguments["<tree_paths.yml>"],
+            load_yaml(arguments["<sweep.yml>"]),
+            n_workers=_optional_int(arguments["--workers"]),
+            threads_per_worker=_optional_int(arguments["--threads"]),
+            output_dir=arguments["--output"] or "sweep",
+        )
+    else:
+        run(arguments["<tree_paths.yml>"], overrides)
+
+
+def _optional_int(value):
+    return None if value is None else int(value)
 
 
 if __name__ == "__main__":
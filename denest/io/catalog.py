@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# catalog.py
+
+"""SQLite catalog of a simulation's output.
+
+The catalog lists all the recorders of a simulation along with their type,
+layer/population or projection, data format, raw data files (and their size),
+and the session times. Loaders query the catalog rather than globbing and
+parsing the recorders' metadata files when it is available.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+from .save import output_filename, output_subdir
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE recorders (
+    metadata_filename TEXT PRIMARY KEY,
+    label TEXT,
+    type TEXT,
+    layer_name TEXT,
+    population_name TEXT,
+    projection_name TEXT,
+    format TEXT,
+    colnames TEXT,
+    dtypes TEXT,
+    shared INTEGER,
+    gids TEXT
+);
+CREATE TABLE files (
+    metadata_filename TEXT,
+    position INTEGER,
+    filename TEXT,
+    session TEXT,
+    bytes INTEGER
+);
+CREATE INDEX files_metadata_filename ON files (metadata_filename);
+CREATE TABLE sessions (
+    name TEXT PRIMARY KEY,
+    start REAL,
+    end REAL
+);
+"""
+
+
+def catalog_path(output_dir, create_dir=False, rank=None):
+    """Return the path to the catalog of an output directory.
+
+    If ``rank`` is not None, return the path to the catalog shard of an MPI
+    process (see :func:`merge_catalogs`).
+    """
+    path = Path(
+        output_subdir(output_dir, "catalog", create_dir=create_dir),
+        output_filename("catalog"),
+    )
+    if rank is None:
+        return path
+    return path.with_name(f"{path.stem}-rank{rank}{path.suffix}")
+
+
+def write_catalog(output_dir, recorders_metadata, session_times, rank=None,
+                  local_filenames=None):
+    """Write the catalog of a simulation's output.
+
+    The catalog is written to a temporary file and then moved in place, so
+    that readers never see a partially written catalog.
+
+    In MPI simulations, each process writes its own catalog shard, which
+    lists only the raw data files it writes. The shards are then combined
+    with :func:`merge_catalogs`.
+
+    Args:
+        output_dir (str or Path): Path to the simulation's output directory.
+        recorders_metadata (dict): ``{<metadata_path>: <metadata>}``
+            dictionary for all the recorders.
+        session_times (dict): ``{<session_name>: (<start>, <end>)}``
+            dictionary.
+
+    Keyword Args:
+        rank (int | None): If not None, write the catalog shard of this MPI
+            process.
+        local_filenames (dict | None): ``{<metadata_filename>:
+            <filenames>}`` dictionary of the raw data files written by this
+            process. If not None, only these files are listed.
+    """
+    path = catalog_path(output_dir, create_dir=True, rank=rank)
+    tmp_path = path.with_name(path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    with closing(sqlite3.connect(str(tmp_path))) as connection:
+        with connection:
+            connection.executescript(_SCHEMA)
+            for metadata_path, metadata in recorders_metadata.items():
+                metadata_path = Path(metadata_path)
+                _insert_recorder(
+                    connection,
+                    metadata_path,
+                    metadata,
+                    local_filenames=(
+                        None if local_filenames is None
+                        else set(local_filenames.get(metadata_path.name, []))
+                    ),
+                )
+            connection.executemany(
+                "INSERT INTO sessions VALUES (?, ?, ?)",
+                [(name, start, end) for name, (start, end) in session_times.items()],
+            )
+    os.replace(tmp_path, path)
+    log.info("Wrote output catalog at %s", path)
+    return path
+
+
+def merge_catalogs(output_dir):
+    """Combine the catalog shards of all MPI processes into one catalog.
+
+    The recorders and sessions are taken from the first shard, and the files
+    of all shards are listed in the order of the recorders' metadata. File
+    sizes are updated. The shards are kept.
+
+    Returns:
+        Path: Path to the merged catalog.
+
+    Raises:
+        FileNotFoundError: If there is no catalog shard.
+    """
+    path = catalog_path(output_dir, create_dir=True)
+    shard_paths = sorted(
+        path.parent.glob(f"{path.stem}-rank*{path.suffix}"),
+        key=lambda shard: int(shard.stem.rsplit("-rank", 1)[1]),
+    )
+    if not shard_paths:
+        raise FileNotFoundError(f"No catalog shards in {path.parent}")
+    tmp_path = path.with_name(path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    with closing(sqlite3.connect(str(tmp_path))) as connection:
+        connection.executescript(_SCHEMA)
+        for i, shard_path in enumerate(shard_paths):
+            # Databases can't be attached within a transaction
+            connection.execute("ATTACH DATABASE ? AS shard", (str(shard_path),))
+            with connection:
+                if i == 0:
+                    connection.execute(
+                        "INSERT INTO recorders SELECT * FROM shard.recorders"
+                    )
+                    connection.execute(
+                        "INSERT INTO sessions SELECT * FROM shard.sessions"
+                    )
+                connection.execute("INSERT INTO files SELECT * FROM shard.files")
+            connection.execute("DETACH DATABASE shard")
+    os.replace(tmp_path, path)
+    update_file_sizes(output_dir)
+    log.info("Merged %s catalog shards at %s", len(shard_paths), path)
+    return path
+
+
+def update_recorder(metadata_path, metadata):
+    """Update the catalog entry of a recorder after its metadata changed.
+
+    Does nothing if there is no catalog in the recorder's directory.
+    """
+    metadata_path = Path(metadata_path)
+    path = _data_dir_catalog(metadata_path.parent)
+    if path is None:
+        return
+    with closing(sqlite3.connect(str(path))) as connection:
+        with connection:
+            connection.execute(
+                "DELETE FROM recorders WHERE metadata_filename = ?",
+                (metadata_path.name,),
+            )
+            connection.execute(
+                "DELETE FROM files WHERE metadata_filename = ?",
+                (metadata_path.name,),
+            )
+            _insert_recorder(connection, metadata_path, metadata)
+
+
+def update_sessions(output_dir, session_times, rank=None):
+    """Replace the session times in the catalog (or a catalog shard)."""
+    path = catalog_path(output_dir, rank=rank)
+    with closing(sqlite3.connect(str(path))) as connection:
+        with connection:
+            connection.execute("DELETE FROM sessions")
+            connection.executemany(
+                "INSERT INTO sessions VALUES (?, ?, ?)",
+                [(name, start, end) for name, (start, end) in session_times.items()],
+            )
+
+
+def update_file_sizes(output_dir, rank=None):
+    """Update the size of all the files listed in the catalog (or a shard)."""
+    path = catalog_path(output_dir, rank=rank)
+    data_dir = path.parent
+    with closing(sqlite3.connect(str(path))) as connection:
+        with connection:
+            filenames = [
+                row[0] for row in
+                connection.execute("SELECT DISTINCT filename FROM files")
+            ]
+            connection.executemany(
+                "UPDATE files SET bytes = ? WHERE filename = ?",
+                [(_size(data_dir / filename), filename) for filename in filenames],
+            )
+
+
+def load_catalog(output_dir):
+    """Return the catalog's recorders as a pandas df.
+
+    The ``bytes`` and ``n_files`` columns contain the total size and number
+    of each recorder's raw data files.
+    """
+    with closing(sqlite3.connect(str(catalog_path(output_dir)))) as connection:
+        return pd.read_sql_query(
+            "SELECT recorders.*, COUNT(files.filename) AS n_files, "
+            "SUM(files.bytes) AS bytes FROM recorders "
+            "LEFT JOIN files USING (metadata_filename) "
+            "GROUP BY recorders.metadata_filename "
+            "ORDER BY recorders.metadata_filename",
+            connection,
+        )
+
+
+def load_catalog_sessions(output_dir):
+    """Return ``{<session_name>: (<start>, <end>)}`` from the catalog."""
+    with closing(sqlite3.connect(str(catalog_path(output_dir)))) as connection:
+        return {
+            name: (start, end) for name, start, end
+            in connection.execute("SELECT name, start, end FROM sessions")
+        }
+
+
+def catalog_metadata_paths(output_dir):
+    """Return the sorted paths of all recorder metadata files in the catalog.
+
+    Returns ``None`` if there is no catalog.
+    """
+    path = catalog_path(output_dir)
+    if not path.exists():
+        return None
+    with closing(sqlite3.connect(str(path))) as connection:
+        return [
+            path.parent / row[0] for row in connection.execute(
+                "SELECT metadata_filename FROM recorders "
+                "ORDER BY metadata_filename"
+            )
+        ]
+
+
+def catalog_entry(metadata_path):
+    """Return a recorder's metadata from the catalog in its directory.
+
+    Returns:
+        dict | None: ``None`` if there is no catalog or if the recorder is not
+            in the catalog. Otherwise, a dictionary containing the same
+            ``type``, ``label``, ``format``, ``colnames``, ``dtypes``,
+            ``filenames`` and ``session_filenames`` entries as the
+            recorder's metadata file. The ``shared`` and ``gids`` entries are
+            present for recorders sharing their node with other populations.
+    """
+    metadata_path = Path(metadata_path)
+    path = _data_dir_catalog(metadata_path.parent)
+    if path is None:
+        return None
+    with closing(sqlite3.connect(str(path))) as connection:
+        row = connection.execute(
+            "SELECT label, type, format, colnames, dtypes, shared, gids "
+            "FROM recorders "
+            "WHERE metadata_filename = ?",
+            (metadata_path.name,),
+        ).fetchone()
+        if row is None:
+            return None
+        files = connection.execute(
+            "SELECT filename, session FROM files WHERE metadata_filename = ? "
+            "ORDER BY position",
+            (metadata_path.name,),
+        ).fetchall()
+    label, type_, format_, colnames, dtypes, shared, gids = row
+    entry = {
+        "label": label,
+        "type": type_,
+        "colnames": json.loads(colnames),
+        "filenames": [filename for filename, _ in files],
+    }
+    if format_ is not None:
+        entry["format"] = format_
+    if dtypes is not None:
+        entry["dtypes"] = json.loads(dtypes)
+    if shared:
+        entry["shared"] = True
+        entry["gids"] = json.loads(gids)
+    if files and all(session is not None for _, session in files):
+        entry["session_filenames"] = {}
+        for filename, session in files:
+            entry["session_filenames"].setdefault(session, []).append(filename)
+    return entry
+
+
+def _data_dir_catalog(data_dir):
+    """Return the path to the catalog in a data directory or None."""
+    path = Path(data_dir, output_filename("catalog"))
+    return path if path.exists() else None
+
+
+def _insert_recorder(connection, metadata_path, metadata, local_filenames=None):
+    connection.execute(
+        "INSERT INTO recorders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            metadata_path.name,
+            metadata.get("label"),
+            metadata.get("type"),
+            metadata.get("layer_name"),
+            metadata.get("population_name"),
+            metadata.get("projection_name"),
+            metadata.get("format"),
+            json.dumps(metadata.get("colnames")),
+            json.dumps(metadata["dtypes"]) if "dtypes" in metadata else None,
+            bool(metadata.get("shared", False)),
+            json.dumps(metadata["gids"]) if metadata.get("shared") else None,
+        ),
+    )
+    # Map filenames to their session if the output is partitioned
+    file_sessions = {
+        filename: session
+        for session, filenames in metadata.get("session_filenames", {}).items()
+        for filename in filenames
+    }
+    data_dir = metadata_path.parent
+    # Positions refer to the full list of files, even when only some of them
+    # are listed, so that merged shards keep the metadata's order
+    connection.executemany(
+        "INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                metadata_path.name,
+                position,
+                filename,
+                file_sessions.get(filename),
+                _size(data_dir / filename),
+            )
+            for position, filename in enumerate(metadata.get("filenames", []))
+            if local_filenames is None or filename in local_filenames
+        ],
+    )
+
+
+def _size(path):
+    """Return the size of a file, or None if it doesn't exist (yet)."""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# checkpoint.py
+
+"""Saving and loading of simulation checkpoints.
+
+A checkpoint is a directory containing:
+    - ``checkpoint.yml``: Kernel time, index of the next session to run and
+      status of the sessions run so far. Written last, so that a checkpoint
+      is complete if this file exists.
+    - ``parameter_tree.yml``: The simulation's full parameter tree.
+    - ``state.pkl``: Dynamic state of the network (see
+      :meth:`denest.network.Network.get_state`).
+"""
+
+import logging
+import os
+import pickle
+from pathlib import Path
+
+from .load import load_yaml
+from .save import save_as_yaml
+
+log = logging.getLogger(__name__)
+
+INFO_FILENAME = "checkpoint.yml"
+STATE_FILENAME = "state.pkl"
+TREE_FILENAME = "parameter_tree.yml"
+
+
+def save_checkpoint(path, tree, info, state):
+    """Save a checkpoint in a directory, replacing any previous checkpoint.
+
+    Args:
+        path (str or Path): Checkpoint directory.
+        tree (ParamsTree): Full simulation parameter tree.
+        info (dict): Checkpoint information.
+        state (dict): Network state.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    info_path = path / INFO_FILENAME
+    # Invalidate the previous checkpoint until this one is complete
+    if info_path.exists():
+        info_path.unlink()
+    tree.write(path / TREE_FILENAME)
+    tmp_path = path / (STATE_FILENAME + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path / STATE_FILENAME)
+    save_as_yaml(info_path, info)
+    log.info("Saved checkpoint at %s", path)
+
+
+def load_checkpoint(path):
+    """Load a checkpoint.
+
+    Returns:
+        tuple: ``(<tree_path>, <info>, <state>)``
+
+    Raises:
+        FileNotFoundError: If there is no complete checkpoint at ``path``.
+    """
+    path = Path(path)
+    info_path = path / INFO_FILENAME
+    if not info_path.exists():
+        raise FileNotFoundError(f"No complete checkpoint at {path}")
+    info = load_yaml(info_path)
+    with open(path / STATE_FILENAME, "rb") as f:
+        state = pickle.load(f)
+    return path / TREE_FILENAME, info, state
@@ -5,11 +5,14 @@
 """Utility functions for data loading."""
 
 import logging
+from collections import namedtuple
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import yaml
 
+from .catalog import catalog_entry, catalog_metadata_paths
 from .save import output_path, output_subdir
 
 log = logging.getLogger(__name__)
@@ -20,32 +23,130 @@ def load_session_times(output_dir):
     return load_yaml(output_path(output_dir, "session_times"))
 
 
+def load_session_metadata(output_dir):
+    """Load the metadata of all sessions as a pandas df.
+
+    The df has one row per session, indexed by session name and sorted by
+    start time. The performance metrics of sessions that were run are in
+    separate columns (see :meth:`denest.session.Session.save_metadata`).
+    """
+    metadata_dir = output_subdir(output_dir, "session_metadata", create_dir=False)
+    rows = []
+    for path in sorted(metadata_dir.glob("*.yml")):
+        metadata = load_yaml(path)
+        metrics = metadata.pop("metrics", {})
+        rows.append({**metadata, **metrics})
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).set_index("name").sort_values("start")
+
+
 def metadata_paths(output_dir):
-    """Return list of paths to all recorder metadata files."""
+    """Return list of paths to all recorder metadata files.
+
+    The paths are queried from the output catalog if it exists.
+    """
+    paths = catalog_metadata_paths(output_dir)
+    if paths is not None:
+        return paths
     metadata_dir = output_subdir(output_dir, "recorders_metadata", create_dir=False)
     # "metadata" files are the ones without .ext
     return sorted(metadata_dir.glob("*.yml"))
 
 
-def load(metadata_path):
+def load(metadata_path, sessions=None):
     """Load tabular data from metadata file and return a pandas df.
 
     The data files are assumed to be in the same directory as the metadata.
+    The recorder's column names and data files are queried from the output
+    catalog if it exists rather than parsed from the metadata file.
 
     Args:
         metadata_path (str or Path): Path to the yaml file containing the
             metadata for a recorder.
 
+    Keyword Args:
+        sessions (list[str] | None): If not ``None``, load only the data
+            recorded during the sessions with these names. If the output was
+            partitioned by session (see
+            :func:`denest.io.partition.partition_by_session`), only the
+            partitions of these sessions are read.
+
+    The raw data of recorders sharing their node with other populations
+    (``shared`` metadata entry) is filtered by GID.
+
     Returns:
         pd.DataFrame : pd dataframe containing the raw data, possibly
             subsampled. Columns may be dropped ( see `usecols` kwarg) and 'x',
             'y' 'z' location fields may be added (see `assign_locations` kwarg).
     """
     log.info("Loading metadata from %s", metadata_path)
-    metadata = load_yaml(metadata_path)
-    filepaths = get_filepaths(metadata_path)
+    metadata = catalog_entry(metadata_path)
+    if metadata is None:
+        metadata = load_yaml(metadata_path)
+    filepaths = get_filepaths(metadata_path, metadata, sessions=sessions)
+
+    if metadata.get("format") == "binary":
+        df = load_binary_as_df(metadata["colnames"], metadata["dtypes"], *filepaths)
+    else:
+        df = load_as_df(metadata["colnames"], *filepaths)
+    if metadata.get("shared") and len(df):
+        # The recorder node is shared with other populations
+        df = df[gid_mask(df["gid"].to_numpy(), metadata["gids"])]
+    if sessions is not None and "session_filenames" not in metadata and len(df):
+        # Unpartitioned output: filter by session times. Recorder metadata
+        # is saved in the `data` subdirectory of the output directory.
+        session_times = load_session_times(Path(metadata_path).parent.parent)
+        names, index = session_index(df["time"].to_numpy(), session_times)
+        keep = [i for i, name in enumerate(names) if name in sessions]
+        df = df[np.isin(index, keep)]
+    return df
+
 
-    return load_as_df(metadata["colnames"], *filepaths)
+def gid_mask(senders, gids):
+    """Return a boolean mask of the ``senders`` array elements in ``gids``."""
+    gids = np.asarray(gids)
+    if not len(gids):
+        return np.zeros(len(senders), dtype=bool)
+    gid_min, gid_max = gids.min(), gids.max()
+    # Population gids are usually contiguous
+    if gid_max - gid_min + 1 == len(np.unique(gids)):
+        return (senders >= gid_min) & (senders <= gid_max)
+    return np.isin(senders, gids)
+
+
+def load_binary_as_df(colnames, dtypes, *paths):
+    """Load columnar binary data harvested by deNEST and return a pandas df.
+
+    Arguments:
+        colnames (tuple[str]): The names of the columns.
+        dtypes (tuple[str]): The dtype of each column.
+        *paths (filepath): The files to load data from. There is one file per
+            column, in the same order as ``colnames``. Data partitioned by
+            session consists in consecutive groups of column files.
+
+    Returns:
+        pd.DataFrame: The loaded data.
+    """
+    if not paths:
+        return pd.DataFrame()
+    assert len(colnames) == len(dtypes)
+    assert not len(paths) % len(colnames)
+    return pd.DataFrame({
+        colname: np.concatenate([
+            _read_binary(path, dtype) for path in paths[i::len(colnames)]
+        ])
+        for i, (colname, dtype) in enumerate(zip(colnames, dtypes))
+    })
+
+
+def _read_binary(path, dtype, offset=0, count=-1):
+    """Read a column of harvested data. Missing files contain no data."""
+    if not Path(path).exists():
+        return np.array([], dtype=dtype)
+    return np.fromfile(
+        path, dtype=dtype, count=count, offset=offset * np.dtype(dtype).itemsize
+    )
 
 
 def load_as_df(colnames, *paths, sep="\t", index_col=False, header=None, **kwargs):
@@ -82,13 +183,218 @@ def load_as_df(colnames, *paths, sep="\t", index_col=False, header=None, **kwarg
     )
 
 
-def get_filepaths(metadata_path):
-    metadata_path = Path(metadata_path)
+class SpikeTensor(namedtuple("SpikeTensor", ["coords", "counts", "shape"])):
+    """Sparse ``(time_bin, row, col, unit)`` spike count tensor in COO format.
+
+    Attributes:
+        coords (np.ndarray): ``(4, nnz)`` integer array of the indices of the
+            non-zero entries.
+        counts (np.ndarray): ``(nnz,)`` array of spike counts.
+        shape (tuple[int]): ``(n_bins, nrows, ncols, nunits)``.
+
+    ``coords``, ``counts`` and ``shape`` can be passed directly to
+    ``sparse.COO``.
+    """
+
+    __slots__ = ()
+
+    def todense(self):
+        """Return the tensor as a dense numpy array."""
+        dense = np.zeros(self.shape, dtype=self.counts.dtype)
+        dense[tuple(self.coords)] = self.counts
+        return dense
+
+
+def load_spike_tensor(metadata_path, bin_size=1.0, start=0.0, end=None,
+                      chunksize=1000000):
+    """Load a spike detector's output as a sparse binned spike count tensor.
+
+    The raw data files are read in chunks of ``chunksize`` rows, so that the
+    full spike train is never loaded in memory. Spikes are binned in time and
+    mapped to their location within the population using the ``locations``
+    and ``population_shape`` recorder metadata.
+
+    Args:
+        metadata_path (str or Path): Path to the yaml file containing the
+            metadata for a spike detector.
+
+    Keyword Args:
+        bin_size (float): Duration of time bins in ms. (default 1.0)
+        start (float): Start of the time window in ms. Spikes at times lower
+            than ``start`` are ignored. (default 0.0)
+        end (float | None): End of the time window in ms. Spikes at times
+            greater than or equal to ``end`` are ignored. If ``None``, the
+            window ends with the last time bin containing spikes.
+        chunksize (int): Number of rows read at once from each file.
+
+    Returns:
+        SpikeTensor: Sparse tensor of shape ``(n_bins, nrows, ncols, nunits)``
+    """
+    if bin_size <= 0:
+        raise ValueError("`bin_size` should be strictly positive.")
+    if end is not None and end < start:
+        raise ValueError("`end` should be greater than `start`.")
+    log.info("Loading spike tensor from %s", metadata_path)
     metadata = load_yaml(metadata_path)
+    if metadata["type"] != "spike_detector":
+        raise ValueError(
+            f"Can't build a spike tensor from a recorder of type "
+            f"`{metadata['type']}`. Expected `spike_detector`."
+        )
+    population_shape = tuple(metadata["population_shape"])
+    n_units = int(np.prod(population_shape))
+    if metadata["locations"]:
+        # Map gids to their flat index within the population. Gids of other
+        # populations (eg for shared recorders) map to -1
+        gids = np.array(list(metadata["locations"].keys()), dtype=np.int64)
+        gid_offset = gids.min()
+        gid_to_unit = np.full(gids.max() - gid_offset + 1, -1, dtype=np.int64)
+        gid_to_unit[gids - gid_offset] = np.ravel_multi_index(
+            np.array(list(metadata["locations"].values())).T, population_shape
+        )
+        filepaths = get_filepaths(metadata_path, metadata)
+    else:
+        # No unit is recorded: the tensor is empty
+        gid_offset, gid_to_unit, filepaths = 0, np.empty(0, dtype=np.int64), []
+
+    keys, counts = [], []
+    for chunk in _iter_chunks(metadata, filepaths, chunksize):
+        times = chunk["time"].to_numpy()
+        chunk_gids = chunk["gid"].to_numpy(dtype=np.int64) - gid_offset
+        mask = (
+            (times >= start)
+            & (chunk_gids >= 0)
+            & (chunk_gids < len(gid_to_unit))
+        )
+        if end is not None:
+            mask &= times < end
+        units = gid_to_unit[chunk_gids[mask]]
+        bins = ((times[mask] - start) // bin_size).astype(np.int64)
+        in_population = units >= 0
+        # Reduce each chunk to (bin, unit) counts before accumulating
+        chunk_keys, chunk_counts = np.unique(
+            bins[in_population] * n_units + units[in_population],
+            return_counts=True,
+        )
+        keys.append(chunk_keys)
+        counts.append(chunk_counts)
+
+    if keys:
+        keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate(counts))
+    else:
+        keys, counts = np.array([], dtype=np.int64), np.array([])
+    counts = counts.astype(np.int64)
+    if end is not None:
+        n_bins = int(np.ceil((end - start) / bin_size))
+    else:
+        n_bins = int(keys.max() // n_units + 1) if len(keys) else 0
+    shape = (n_bins,) + population_shape
+    coords = np.vstack(
+        [keys // n_units, *np.unravel_index(keys % n_units, population_shape)]
+    ).astype(np.int64)
+    return SpikeTensor(coords, counts, shape)
+
+
+def _iter_chunks(metadata, filepaths, chunksize):
+    """Yield the raw data of a recorder as dataframes of ``chunksize`` rows."""
+    if metadata.get("format") == "binary":
+        yield from _iter_binary_chunks(metadata, filepaths, chunksize)
+        return
+    for path in filepaths:
+        # NEST creates empty files for virtual processes without data
+        if not Path(path).stat().st_size:
+            continue
+        yield from pd.read_csv(
+            path,
+            names=metadata["colnames"],
+            usecols=["gid", "time"],
+            sep="\t",
+            index_col=False,
+            header=None,
+            chunksize=chunksize,
+        )
+
+
+def _iter_binary_chunks(metadata, filepaths, chunksize):
+    """Yield ``gid`` and ``time`` columns of harvested data by chunks."""
+    n_columns = len(metadata["colnames"])
+    # Iterate on groups of column files (one group per session partition)
+    for i in range(0, len(filepaths), n_columns):
+        columns = {
+            colname: (path, dtype)
+            for colname, dtype, path in zip(
+                metadata["colnames"], metadata["dtypes"],
+                filepaths[i:i + n_columns]
+            )
+            if colname in ["gid", "time"]
+        }
+        gid_path, gid_dtype = columns["gid"]
+        n_rows = (
+            Path(gid_path).stat().st_size // np.dtype(gid_dtype).itemsize
+            if Path(gid_path).exists() else 0
+        )
+        for offset in range(0, n_rows, chunksize):
+            yield pd.DataFrame({
+                colname: _read_binary(path, dtype, offset=offset, count=chunksize)
+                for colname, (path, dtype) in columns.items()
+            })
+
+
+def get_filepaths(metadata_path, metadata=None, sessions=None):
+    """Return the paths to a recorder's raw data files.
+
+    Args:
+        metadata_path (str or Path): Path to the recorder's metadata file.
+        metadata (dict | None): Loaded content of the metadata file. Loaded
+            from ``metadata_path`` if ``None``.
+        sessions (list[str] | None): If not ``None`` and the recorder's output
+            was partitioned by session, return only the paths of these
+            sessions' partitions.
+    """
+    metadata_path = Path(metadata_path)
+    if metadata is None:
+        metadata = load_yaml(metadata_path)
     # Check loaded metadata
     assert "filenames" in metadata
+    filenames = metadata["filenames"]
+    if sessions is not None and "session_filenames" in metadata:
+        missing = set(sessions) - set(metadata["session_filenames"])
+        if missing:
+            raise ValueError(f"Unknown sessions: {sorted(missing)}")
+        filenames = [
+            filename
+            for session in sessions
+            for filename in metadata["session_filenames"][session]
+        ]
     # We assume metadata and data are in the same directory
-    return [metadata_path.parent / filename for filename in metadata["filenames"]]
+    return [metadata_path.parent / filename for filename in filenames]
+
+
+def session_index(times, session_times):
+    """Return the index of the session during which each event happened.
+
+    Events at time ``t`` belong to the session such that
+    ``start < t <= end``. Events at the start of the first session belong to
+    the first session.
+
+    Args:
+        times (np.ndarray): Event times.
+        session_times (dict): ``{<session_name>: (<start>, <end>)}``
+            dictionary.
+
+    Returns:
+        tuple: ``(<names>, <index>)`` where ``<names>`` is the list of
+            session names ordered by start time and ``<index>`` the index in
+            ``<names>`` of each event's session. Events outside of all sessions
+            have index ``-1``.
+    """
+    sessions = sorted(session_times.items(), key=lambda item: tuple(item[1]))
+    names = [name for name, _ in sessions]
+    ends = np.array([end for _, (_, end) in sessions])
+    index = np.searchsorted(ends, times, side="left")
+    index[index == len(ends)] = -1
+    return names, index
 
 
 def load_yaml(*args):
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# partition.py
+
+"""Partitioning of recorder output by session."""
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .catalog import update_recorder
+from .load import _read_binary, get_filepaths, load_yaml, session_index
+from .save import save_as_yaml
+
+log = logging.getLogger(__name__)
+
+
+def partition_by_session(metadata_path, session_times, chunksize=1000000,
+                         partitioned=None):
+    """Split a recorder's raw data into one partition per session.
+
+    The raw data files are read in chunks of ``chunksize`` rows. ASCII data
+    from all virtual processes is written to a single tab-separated file per
+    session. Binary (harvested) data is written to one file per column and
+    session. The original raw data files are deleted, and the recorder's
+    metadata (and the output catalog if it exists) is updated with the new
+    ``filenames`` and with a ``session_filenames`` entry mapping session names
+    to their partition.
+
+    Recorders without a ``time`` column are left unchanged.
+
+    Recorders sharing their node (and raw data files) with other populations
+    should be partitioned with the same ``partitioned`` dictionary, so that
+    their common raw data files are split only once.
+
+    Args:
+        metadata_path (str or Path): Path to the yaml file containing the
+            metadata for a recorder.
+        session_times (dict): ``{<session_name>: (<start>, <end>)}``
+            dictionary.
+
+    Keyword Args:
+        chunksize (int): Number of rows read at once from each file.
+        partitioned (dict | None): Dictionary of the partitions already
+            written, updated in place. Maps the tuple of original raw data
+            filenames to the corresponding session filenames.
+
+    Returns:
+        dict: The updated metadata.
+    """
+    metadata_path = Path(metadata_path)
+    metadata = load_yaml(metadata_path)
+    colnames = metadata["colnames"]
+    if "session_filenames" in metadata or not colnames or "time" not in colnames:
+        return metadata
+    if partitioned is None:
+        partitioned = {}
+    key = tuple(metadata["filenames"])
+    if key in partitioned:
+        session_filenames = partitioned[key]
+    else:
+        log.info("Partitioning recorder data by session: %s", metadata_path)
+        filepaths = get_filepaths(metadata_path, metadata)
+        if metadata.get("format") == "binary":
+            session_filenames = _partition_binary(
+                metadata, filepaths, session_times, chunksize
+            )
+        else:
+            session_filenames = _partition_ascii(
+                metadata, filepaths, session_times, chunksize
+            )
+        for path in filepaths:
+            if path.exists():
+                path.unlink()
+        partitioned[key] = session_filenames
+    metadata["filenames"] = [
+        filename for filenames in session_filenames.values() for filename in filenames
+    ]
+    metadata["session_filenames"] = session_filenames
+    save_as_yaml(metadata_path, metadata)
+    update_recorder(metadata_path, metadata)
+    return metadata
+
+
+def _partition_prefix(filename):
+    """Strip the virtual process or column suffix from a raw data filename."""
+    return Path(filename).name.rsplit("-", 1)[0]
+
+
+def _new_partitions(paths):
+    """Create empty partition files, overwriting existing ones."""
+    for path in paths:
+        path.write_bytes(b"")
+
+
+def _sorted_session_names(session_times):
+    return [
+        name for name, _
+        in sorted(session_times.items(), key=lambda item: tuple(item[1]))
+    ]
+
+
+def _partition_ascii(metadata, filepaths, session_times, chunksize):
+    if not filepaths:
+        return {name: [] for name in _sorted_session_names(session_times)}
+    data_dir = filepaths[0].parent
+    prefix = _partition_prefix(metadata["filenames"][0])
+    extension = Path(metadata["filenames"][0]).suffix
+    session_filenames = {
+        name: [f"{prefix}-{name}{extension}"]
+        for name in _sorted_session_names(session_times)
+    }
+    _new_partitions(
+        data_dir / filenames[0] for filenames in session_filenames.values()
+    )
+    for path in filepaths:
+        # NEST creates empty files for virtual processes without data
+        if not path.stat().st_size:
+            continue
+        for chunk in pd.read_csv(
+            path,
+            names=metadata["colnames"],
+            sep="\t",
+            index_col=False,
+            header=None,
+            chunksize=chunksize,
+        ):
+            names, index = session_index(chunk["time"].to_numpy(), session_times)
+            for i in np.unique(index[index >= 0]):
+                chunk[index == i].to_csv(
+                    data_dir / session_filenames[names[i]][0],
+                    sep="\t",
+                    header=False,
+                    index=False,
+                    mode="a",
+                )
+    return session_filenames
+
+
+def _partition_binary(metadata, filepaths, session_times, chunksize):
+    """Partition harvested data.
+
+    In MPI simulations, ``filepaths`` contains one group of column files per
+    MPI process (see :meth:`BaseRecorder.harvest_filenames`). The events of
+    all the groups are appended to the same session partitions.
+    """
+    n_columns = len(metadata["colnames"])
+    data_dir = filepaths[0].parent
+    prefix = _partition_prefix(metadata["filenames"][0])
+    if len(metadata["filenames"]) > n_columns:
+        # Strip the rank
+        prefix = prefix.rsplit("-", 1)[0]
+    session_filenames = {
+        name: [f"{prefix}-{name}-{colname}.bin" for colname in metadata["colnames"]]
+        for name in _sorted_session_names(session_times)
+    }
+    _new_partitions(
+        data_dir / filename
+        for filenames in session_filenames.values()
+        for filename in filenames
+    )
+    for start in range(0, len(filepaths), n_columns):
+        _partition_binary_group(
+            metadata,
+            filepaths[start:start + n_columns],
+            session_times,
+            chunksize,
+            data_dir,
+            session_filenames,
+        )
+    return session_filenames
+
+
+def _partition_binary_group(metadata, filepaths, session_times, chunksize,
+                            data_dir, session_filenames):
+    """Append one group of column files to the session partitions."""
+    columns = list(zip(metadata["colnames"], metadata["dtypes"], filepaths))
+    time_path, time_dtype = [
+        (path, dtype) for colname, dtype, path in columns if colname == "time"
+    ][0]
+    n_rows = (
+        time_path.stat().st_size // np.dtype(time_dtype).itemsize
+        if time_path.exists() else 0
+    )
+    for offset in range(0, n_rows, chunksize):
+        times = _read_binary(time_path, time_dtype, offset=offset, count=chunksize)
+        names, index = session_index(times, session_times)
+        for j, (colname, dtype, path) in enumerate(columns):
+            values = _read_binary(path, dtype, offset=offset, count=chunksize)
+            for i in np.unique(index[index >= 0]):
+                with open(data_dir / session_filenames[names[i]][j], "ab") as f:
+                    values[index == i].tofile(f)
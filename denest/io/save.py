@@ -21,10 +21,22 @@ OUTPUT_SUBDIRS = {
     "recorders_metadata": ("data",),
     "projection_recorders_metadata": ("data",),
     "session_times": (),
+    "session_status": (),
+    "session_metadata": ("sessions",),  # Metadata and metrics of each session
+    "catalog": ("data",),  # SQLite catalog of recorders and their files
+    "rates": (),  # Population rates computed during the simulation
+    "checkpoint": ("checkpoint",),  # Saved with Simulation.checkpoint
+    "resume": (),  # Checkpoint of a resumed simulation
+    "fingerprint": (),  # Fingerprint of a completed simulation
+    "autotune": (),  # Benchmark of the number of threads
 }
 
-# Subdirectories that are cleared during OUTPUT_DIR initialization
-CLEAR_SUBDIRS = [subdir for subdir in OUTPUT_SUBDIRS.values()]
+# Subdirectories that are cleared during OUTPUT_DIR initialization. The
+# checkpoint is preserved so that rerunning a simulation in its output
+# directory doesn't delete the checkpoint it could be resumed from.
+CLEAR_SUBDIRS = [
+    subdir for key, subdir in OUTPUT_SUBDIRS.items() if key != "checkpoint"
+]
 
 
 def save_as_yaml(path, tree):
@@ -139,14 +151,38 @@ def recorder_metadata_filename(label):
     return label
 
 
-def metadata_filename():
-    return "session_metadata.yml"
+def session_metadata_filename(session_name):
+    return session_name + ".yml"
 
 
 def session_times_filename():
     return "session_times.yml"
 
 
+def session_status_filename():
+    return "session_status.yml"
+
+
+def catalog_filename():
+    return "catalog.sqlite"
+
+
+def rates_filename():
+    return "rates.tsv"
+
+
+def fingerprint_filename():
+    return "fingerprint.txt"
+
+
+def autotune_filename():
+    return "autotune.yml"
+
+
+def resume_filename():
+    return "resume.yml"
+
+
 def tree_filename():
     return "parameter_tree.yml"
 
@@ -163,6 +199,12 @@ FILENAME_FUNCS = {
     "tree": tree_filename,
     "recorders_metadata": recorder_metadata_filename,
     "session_times": session_times_filename,
-    "session_metadata": metadata_filename,
+    "session_status": session_status_filename,
+    "session_metadata": session_metadata_filename,
     "versions": version_info_filename,
+    "catalog": catalog_filename,
+    "rates": rates_filename,
+    "resume": resume_filename,
+    "fingerprint": fingerprint_filename,
+    "autotune": autotune_filename,
 }
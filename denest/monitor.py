@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# monitor.py
+
+"""Online monitoring of population firing rates."""
+
+import logging
+import math
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from .io.save import output_path
+from .utils.validation import ParameterError
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+# Population rates (Hz) over the interval ``(start, end]`` of kernel time.
+RateSample = namedtuple("RateSample", ["session", "start", "end", "rates"])
+
+
+class RateMonitor:
+    """Compute per-population firing rates while the simulation is running.
+
+    The monitor is meant to be used as a simulation hook (see
+    :meth:`Simulation.add_hook`). Each time it is called, it computes the mean
+    firing rate of each population recorded by a spike detector since the
+    previous call, from the number of events counted by the spike detectors
+    (``n_events`` NEST parameter, plus the events already harvested for
+    recorders in harvest mode). The monitor's overhead is therefore a single
+    ``GetStatus`` call and doesn't depend on the amount of recorded data.
+
+    Spike detectors shared across populations are ignored, since their
+    events can't be attributed to a population without reading them. Stop
+    conditions can't apply to the populations they record (see
+    :meth:`validate_stop_conditions`). The rates of the populations whose
+    spike detector is inactivated during a session (``record`` session
+    parameter) are NaN.
+
+    The last ``window`` samples are kept in memory (``samples`` attribute),
+    and all samples are appended to a tab-separated file in the output
+    directory.
+
+    In MPI simulations, the event counts of all the processes are summed
+    with ``mpi4py``, so that every process computes the same rates and takes
+    the same decision to abort a session. The samples are saved by the first
+    process only.
+
+    After each call, the monitor evaluates the session's stop conditions
+    (``stop_conditions`` session parameter) and aborts the session if any of
+    them is met. A condition is evaluated only once the samples of the
+    session in memory cover its ``duration``. The number of samples kept in
+    memory is increased if needed to cover the conditions' durations (see
+    :meth:`validate_stop_conditions`).
+
+    Args:
+        network (Network): A created network.
+        output_dir (str or Path): Output directory of the simulation.
+
+    Keyword Args:
+        window (int): Number of samples kept in memory. (default 100)
+
+    Raises:
+        ParameterError: In MPI simulations, if ``mpi4py`` isn't installed.
+    """
+
+    def __init__(self, network, output_dir, window=100):
+        import nest
+
+        # Rank of this MPI process, or None without MPI
+        self._rank = nest.Rank() if nest.NumProcesses() > 1 else None
+        if self._rank is not None:
+            try:
+                import mpi4py  # pylint: disable=unused-import
+            except ImportError as error:
+                raise ParameterError(
+                    "Rate monitoring and stop conditions require `mpi4py` in "
+                    "MPI simulations."
+                ) from error
+        self.recorders = []
+        # Shared spike detectors, whose populations aren't monitored
+        self.ignored_recorders = []
+        for recorder in network.get_population_recorders("spike_detector"):
+            if recorder.shared:
+                log.warning(
+                    "Rate monitor: ignoring shared spike detector `%s`", recorder
+                )
+                self.ignored_recorders.append(recorder)
+                continue
+            self.recorders.append(recorder)
+        self.labels = [str(recorder) for recorder in self.recorders]
+        self._n_units = np.array([len(recorder.gids) for recorder in self.recorders])
+        self._gids = np.array(
+            [recorder.gid[0] for recorder in self.recorders], dtype=int
+        )
+        self.samples = deque(maxlen=window)
+        # Cumulative real time spent computing and saving rates
+        self.overhead = 0.0
+        self.n_calls = 0
+        # Start of the first interval
+        self._time = nest.GetKernelStatus("time")
+        self._n_events = self.n_events()
+        self.path = output_path(output_dir, "rates")
+        if not self._rank:
+            with open(self.path, "w") as f:
+                f.write("\t".join(["session", "start", "end"] + self.labels) + "\n")
+        log.info(
+            "Monitoring the rates of %s populations in %s",
+            len(self.recorders),
+            self.path,
+        )
+
+    def n_events(self):
+        """Return the number of events recorded so far by each recorder.
+
+        In MPI simulations, the counts of all the processes are summed.
+        """
+        import nest
+
+        if not self.recorders:
+            return np.array([], dtype=np.int64)
+        n_events = nest.GetStatus(
+            [recorder.gid[0] for recorder in self.recorders], "n_events"
+        )
+        n_events = np.array(n_events, dtype=np.int64) + np.array(
+            [recorder.n_harvested for recorder in self.recorders], dtype=np.int64
+        )
+        if self._rank is not None:
+            from mpi4py import MPI
+
+            total = np.empty_like(n_events)
+            MPI.COMM_WORLD.Allreduce(n_events, total, op=MPI.SUM)
+            return total
+        return n_events
+
+    def __call__(self, session, network):
+        """Compute and save the rates since the previous call."""
+        import nest
+
+        start_real_time = time.perf_counter()
+        now = nest.GetKernelStatus("time")
+        n_events = self.n_events()
+        if now > self._time:
+            # `nest.ResetNetwork` may reset the recorders' event counters
+            new_events = np.where(
+                n_events >= self._n_events, n_events - self._n_events, n_events
+            )
+            rates = 1000.0 * new_events / self._n_units / (now - self._time)
+            # Inactivated recorders don't record the population's spikes
+            rates[np.isin(self._gids, session.inactivated_gids)] = np.nan
+            sample = RateSample(session.name, self._time, now, rates)
+            self.samples.append(sample)
+            self._save(sample)
+        self._time, self._n_events = now, n_events
+        for condition in session.stop_conditions:
+            reason = self.check_stop_condition(session, condition)
+            if reason is not None:
+                session.abort(reason)
+                break
+        overhead = time.perf_counter() - start_real_time
+        self.overhead += overhead
+        self.n_calls += 1
+        log.debug("Rate monitor overhead: %.3f ms", 1000 * overhead)
+
+    def rates(self, duration=None):
+        """Return a (<n_samples>, <n_populations>) array of recent rates.
+
+        Keyword Args:
+            duration (float | None): If not None, return only the samples
+                ending within the last ``duration`` ms.
+        """
+        samples = [
+            sample
+            for sample in self.samples
+            if duration is None or sample.end > self._time - duration
+        ]
+        return np.array([sample.rates for sample in samples]).reshape(
+            len(samples), len(self.recorders)
+        )
+
+    def population_mask(self, layers=None, populations=None):
+        """Return a boolean mask of the monitored populations of interest."""
+        return np.array(
+            [
+                _selects(recorder, layers, populations)
+                for recorder in self.recorders
+            ],
+            dtype=bool,
+        )
+
+    def validate_stop_conditions(self, sessions, network):
+        """Check that the sessions' stop conditions apply to some population.
+
+        Args:
+            sessions (list[Session]): Sessions of the simulation.
+            network (Network): The monitored network.
+
+        The number of samples kept in memory is increased so that they cover
+        the longest ``duration`` of the conditions.
+
+        Raises:
+            ParameterError: If a stop condition selects a population recorded
+                by a shared spike detector or by a spike detector inactivated
+                during the session, doesn't select any monitored population,
+                or is longer than the session.
+        """
+        window = self.samples.maxlen
+        for session in sessions:
+            inactivated_gids = set(session.recorders_to_inactivate(network))
+            for condition in session.stop_conditions:
+                if condition["duration"] > session.simulation_time:
+                    raise ParameterError(
+                        f"Stop condition of session `{session.name}` can't be "
+                        f"met: its duration is longer than the session "
+                        f"({session.simulation_time} ms): {condition}"
+                    )
+                window = max(
+                    window, _n_samples(session.chunk_durations(), condition)
+                )
+                inactive = [
+                    str(recorder)
+                    for recorder in self.recorders
+                    if recorder.gid[0] in inactivated_gids
+                    and _selects(
+                        recorder, condition["layers"], condition["populations"]
+                    )
+                ]
+                if inactive:
+                    raise ParameterError(
+                        f"Stop condition of session `{session.name}` applies "
+                        f"to populations whose spike detector is inactivated "
+                        f"during the session (`record` session parameter): "
+                        f"{inactive}. Restrict the condition's `layers` and "
+                        f"`populations` or record these spike detectors: "
+                        f"{condition}"
+                    )
+                ignored = [
+                    str(recorder)
+                    for recorder in self.ignored_recorders
+                    if _selects(
+                        recorder, condition["layers"], condition["populations"]
+                    )
+                ]
+                if ignored:
+                    raise ParameterError(
+                        f"Stop condition of session `{session.name}` applies "
+                        f"to populations recorded by shared spike detectors, "
+                        f"whose rates aren't monitored: {ignored}. Restrict "
+                        f"the condition's `layers` and `populations` or don't "
+                        f"share these spike detectors: {condition}"
+                    )
+                if not self.population_mask(
+                    condition["layers"], condition["populations"]
+                ).any():
+                    raise ParameterError(
+                        f"Stop condition of session `{session.name}` doesn't "
+                        f"apply to any population recorded by a (non-shared) "
+                        f"spike detector: {condition}"
+                    )
+        if window > self.samples.maxlen:
+            log.info(
+                "Rate monitor: keeping %s samples to cover the stop conditions",
+                window,
+            )
+            self.samples = deque(self.samples, maxlen=window)
+
+    def check_stop_condition(self, session, condition):
+        """Return the reason for which a stop condition is met, or None."""
+        mask = self.population_mask(condition["layers"], condition["populations"])
+        # Most recent samples of the session covering the condition's duration
+        samples, covered = [], 0.0
+        for sample in reversed(self.samples):
+            if sample.session != session.name or covered >= condition["duration"]:
+                break
+            samples.append(sample)
+            covered += sample.end - sample.start
+        if covered < condition["duration"]:
+            return None
+        # Mean rate across populations and samples
+        n_units = self._n_units[mask]
+        rate = sum(
+            (sample.end - sample.start) * np.dot(sample.rates[mask], n_units)
+            for sample in samples
+        ) / (covered * n_units.sum())
+        if condition["above"] is not None and rate > condition["above"]:
+            comparison = f"above {condition['above']} Hz"
+        elif condition["below"] is not None and rate <= condition["below"]:
+            comparison = f"below {condition['below']} Hz"
+        else:
+            return None
+        return (
+            f"Mean rate of {rate:.6g} Hz {comparison} over the last {covered} ms "
+            f"(layers: {condition['layers']}, populations: "
+            f"{condition['populations']})"
+        )
+
+    def _save(self, sample):
+        if self._rank:
+            return
+        with open(self.path, "a") as f:
+            f.write(
+                "\t".join(
+                    [sample.session, str(sample.start), str(sample.end)]
+                    + [f"{rate:.6g}" for rate in sample.rates]
+                )
+                + "\n"
+            )
+
+
+def _n_samples(chunk_durations, condition):
+    """Return the number of chunks covering the duration of a condition.
+
+    All the chunks of a session have the same duration, except the last one
+    which may be shorter.
+    """
+    return min(
+        len(chunk_durations),
+        math.ceil(condition["duration"] / chunk_durations[0]) + 1,
+    )
+
+
+def _selects(recorder, layers, populations):
+    """Return whether a recorder's population is selected by a condition."""
+    return (layers is None or recorder.layer_name in layers) and (
+        populations is None or recorder.population_name in populations
+    )
@@ -6,21 +6,53 @@
 
 import itertools
 import logging
+from collections import namedtuple
+from pathlib import Path
 
+import numpy as np
 from tqdm import tqdm
 
 from ..parameters import ParamsTree
 from ..utils import validation
 from ..utils.validation import ParameterError
 from .projections import ProjectionModel, TopoProjection
-from .layers import InputLayer, Layer
+from .layers import CHANGE_TYPES, InputLayer, Layer
 from .models import Model, SynapseModel
-from .recorders import ProjectionRecorder, PopulationRecorder
+from .recorders import (PopulationRecorder, ProjectionRecorder,
+                        SHARED_RECORDER_SCOPES)
 from .utils import if_not_created, log
 
 log = logging.getLogger(__name__)
 
 
+# Numerical unit parameters returned by ``GetStatus`` that can't be set.
+READONLY_UNIT_STATUS_KEYS = [
+    "archiver_length",
+    "global_id",
+    "local",
+    "local_id",
+    "node_uses_wfr",
+    "parent",
+    "supports_precise_spikes",
+    "t_spike",
+    "thread",
+    "thread_local_id",
+    "vp",
+]
+
+# Synapse model parameters whose presence in the defaults of a NEST synapse
+# model denotes plasticity (STDP traces, short-term plasticity, ...)
+PLASTIC_SYNAPSE_KEYS = [
+    "Kplus",
+    "tau_plus",
+    "Wmax",
+    "tau_rec",
+    "tau_fac",
+    "tau_P",
+    "tau_c",
+    "tau_n",
+]
+
 LAYER_TYPES = {
     None: Layer,
     'InputLayer': InputLayer,
@@ -30,6 +62,12 @@ CONNECTION_TYPES = {
     'topological': TopoProjection,
 }
 
+# Synapse changes resolved by `Network.compile_synapse_changes`
+SynapseChangePlan = namedtuple(
+    "SynapseChangePlan",
+    ["synapse_model", "projection", "params", "change_type", "from_array"],
+)
+
 
 class Network(object):
     """Represent a full network.
@@ -118,6 +156,8 @@ class Network(object):
         self.projections = []
         self.population_recorders = []
         self.projection_recorders = []
+        # Cached NEST connections (see `Network.connections`)
+        self._connections = {}
 
         self.build_neuron_models(self.tree.children['neuron_models'])
         self.build_synapse_models(self.tree.children['synapse_models'])
@@ -131,10 +171,14 @@ class Network(object):
 
     @staticmethod
     def build_named_leaves_dict(constructor, node):
-        """Construct all leaves and return as a dictionary."""
+        """Construct all leaves and return as a dictionary.
+
+        Raises:
+            DuplicateLeafError: If leaves have the same name.
+        """
         named_leaves = {
             name: constructor(name, dict(leaf.params), dict(leaf.nest_params))
-            for name, leaf in node.named_leaves(root=False)
+            for name, leaf in node.named_leaves(root=False, unique=True)
         }
         msg = f"Build N={len(named_leaves)} ``{constructor.__name__}`` objects"
         log.info(msg)
@@ -146,11 +190,8 @@ class Network(object):
         if not isinstance(tree, ParamsTree):
             child_tree = ParamsTree(tree, parent=self.tree, name=child_name)
         else:
-            child_tree = ParamsTree(
-                tree.asdict(),
-                parent=self.tree,
-                name=child_name
-            )
+            # The copy shares the tree's data until either is modified
+            child_tree = tree.copy(parent=self.tree, name=child_name)
         # Add as child
         self.tree.children[child_name] = child_tree
 
@@ -223,7 +264,7 @@ class Network(object):
                 name, dict(leaf.params), dict(leaf.nest_params)
             )
             for name, leaf
-            in self.tree.children['layers'].named_leaves(root=False)
+            in self.tree.children['layers'].named_leaves(root=False, unique=True)
         }
         log.info(
             f"Build N={len(self.layers)} ``Layer`` or ``InputLayer`` objects."
@@ -543,6 +584,8 @@ class Network(object):
                         'model' : <model>,
                         'layers': <layers_list>,
                         'populations': <populations_list>,
+                        'harvest': <harvest>,
+                        'shared': <shared>,
                     }
 
                 where:
@@ -554,6 +597,19 @@ class Network(object):
                   ``None``, all the populations in each layer of interest
                   are considered. For :class:`InputLayer` layers, only the
                   population of parrot neurons can be recorded.
+                - ``<harvest>`` (bool) is optional. If ``True``, the recorders
+                  record to memory and their events are harvested into
+                  binary columnar files at the end of each session, rather
+                  than written as ASCII by NEST. (Default: ``False``)
+                - ``<shared>`` (None, 'layer' or 'network') is optional. If
+                  'layer', a single recorder node is created in NEST for all
+                  the populations of interest of each layer. If 'network', a
+                  single recorder node is created for all the populations of
+                  interest across layers. Recorders of the same model and
+                  harvest mode share their node whenever they are specified
+                  with the same ``shared`` value. The events of each
+                  population are recovered from the GIDs during loading. If
+                  None, one node is created per population. (Default: None)
                 For each item in the list, a recorder of ``model`` will be
                 created and connected to the population(s) of interest of each
                 layer(s) of interest.
@@ -568,6 +624,14 @@ class Network(object):
         # Iterate on layers x population for each item in list
         for item in population_recorders_items:
             model = item['model']
+            harvest = item.get('harvest', False)
+            shared = item.get('shared', None)
+            if shared not in SHARED_RECORDER_SCOPES:
+                raise ParameterError(
+                    f"Invalid value for ``shared`` population recorder "
+                    f"parameter: `{shared}`. Should be one of "
+                    f"{SHARED_RECORDER_SCOPES}"
+                )
             layer_names = item['layers']
             # Use all layers if <layers> is None
             if layer_names is None:
@@ -585,23 +649,56 @@ class Network(object):
                     if p in layer.recordable_population_names
                 ]:
                     population_recorders_args.append(
-                        (model, layer_name, population_name)
+                        (model, layer_name, population_name, harvest, shared)
                     )
 
+        # Check that recorders are not specified with different ``harvest`` or
+        # ``shared`` values
+        population_recorders_args = sorted(
+            set(population_recorders_args), key=lambda args: args[:3]
+        )
+        recorder_keys = [args[:3] for args in population_recorders_args]
+        if not len(set(recorder_keys)) == len(recorder_keys):
+            raise ParameterError(
+                "Population recorders specified with different values of "
+                "``harvest`` or ``shared`` by ``population_recorders`` "
+                "network/recorders parameter. (<model>, <layer_name>, "
+                "<population_name>) tuples should uniquely specify population "
+                "recorders."
+            )
+
         # Verbose
         msg = f"Build N={len(population_recorders_args)} population recorders."
         log.info(msg)
 
         # Build the unique population recorder objects
-        return [
-            PopulationRecorder(
+        population_recorders = []
+        # Owner and label of the shared nodes, by (model, harvest, shared,
+        # <layer_name>)
+        shared_devices = {}
+        for (model, layer_name, population_name, harvest, shared) in (
+            population_recorders_args
+        ):
+            recorder = PopulationRecorder(
                 model,
                 layer=self.layers[layer_name],
-                population_name=population_name
+                population_name=population_name,
+                harvest=harvest,
             )
-            for (model, layer_name, population_name)
-            in sorted(set(population_recorders_args))
-        ]
+            if shared is not None:
+                if shared == 'layer':
+                    device_key = (model, harvest, shared, layer_name)
+                    label = f"{model}_{layer_name}"
+                else:
+                    device_key = (model, harvest, shared)
+                    label = model
+                # The first recorder of each group creates the node
+                owner, label = shared_devices.setdefault(
+                    device_key, (recorder, label)
+                )
+                recorder.share_device(owner, label)
+            population_recorders.append(recorder)
+        return population_recorders
 
     def __repr__(self):
         return '{classname}({tree})'.format(
@@ -656,6 +753,70 @@ class Network(object):
             method = getattr(recorder, method_name)
             method(*args, **kwargs)
 
+    def harvest_recorders(self):
+        """Harvest the events recorded in memory by recorders in harvest mode.
+
+        Returns:
+            int: Total number of harvested events.
+        """
+        return sum(recorder.harvest() for recorder in self.get_recorders())
+
+    def count_recorded_spikes(self):
+        """Return the number of spikes recorded so far by spike detectors.
+
+        Includes the spikes already harvested. Queried with a single
+        ``GetStatus`` call.
+        """
+        import nest
+
+        recorders = [
+            recorder
+            for recorder in self.get_population_recorders("spike_detector")
+            if recorder.owns_device
+        ]
+        if not recorders:
+            return 0
+        n_events = nest.GetStatus(
+            [recorder.gid[0] for recorder in recorders], "n_events"
+        )
+        return int(
+            sum(n_events) + sum(recorder.n_harvested for recorder in recorders)
+        )
+
+    def raw_data_size(self):
+        """Return the total size in bytes of the recorders' raw data files.
+
+        Only the files written by this MPI process are considered.
+        """
+        import nest
+
+        data_path = Path(nest.GetKernelStatus("data_path"))
+        filenames = {
+            filename
+            for recorder in self.get_recorders()
+            for filename in recorder.raw_data_filenames(local=True)
+        }
+        size = 0
+        for filename in filenames:
+            try:
+                size += (data_path / filename).stat().st_size
+            except FileNotFoundError:
+                pass
+        return size
+
+    def local_raw_data_filenames(self, output_dir):
+        """Return the raw data files written by this MPI process.
+
+        Returns:
+            dict: ``{<metadata_filename>: <filenames>}`` dictionary for all
+                the recorders.
+        """
+        return {
+            recorder.metadata_path(output_dir).name:
+                recorder.raw_data_filenames(local=True)
+            for recorder in self.get_recorders()
+        }
+
     def get_recorders(self, recorder_class=None, recorder_type=None):
         """Yield all :class:`PopulationRecorder` and :class:`ProjectionRecorder` objects.
 
@@ -726,11 +887,107 @@ class Network(object):
         self._create_all(self.projection_recorders)
         log.info('Connecting layers...')
         self._create_all(self.projections)
+        self.invalidate_connections()
         self.print_network_size()
 
+    def connections(self, synapse_model=None, projection=None):
+        """Return the NEST connections of a synapse model or a projection.
+
+        Connections are queried once with ``nest.GetConnections`` and cached
+        until :meth:`invalidate_connections` is called. The cache is cleared
+        by :meth:`create`, which is the only way deNEST changes the network's
+        connectivity. Connections created or deleted otherwise (eg with
+        ``nest.Connect`` or by structural plasticity) are only seen after
+        calling :meth:`invalidate_connections`.
+
+        Args:
+            synapse_model (str | None): Name of a NEST synapse model.
+            projection (str | None): Name of a projection, of the form
+                ``'<projection_model>-<source_layer>-<source_population>-
+                <target_layer>-<target_population>'`` (see
+                ``BaseProjection.__str__``).
+                Exactly one of ``synapse_model`` and ``projection`` should be
+                specified.
+
+        Returns:
+            tuple: NEST connection handles.
+
+        Raises:
+            ParameterError: If the projection doesn't exist, if other
+                projections share its connections (same layers, overlapping
+                populations and same NEST synapse model), or if not exactly
+                one of ``synapse_model`` and ``projection`` is specified.
+        """
+        import nest
+
+        if (synapse_model is None) == (projection is None):
+            raise ParameterError(
+                "Specify exactly one of `synapse_model` and `projection` to "
+                f"select connections (got {synapse_model}, {projection})"
+            )
+        key = ('synapse_model', synapse_model) if projection is None \
+            else ('projection', projection)
+        if key not in self._connections:
+            if projection is None:
+                conns = nest.GetConnections(synapse_model=synapse_model)
+            else:
+                proj = self._get_projection(projection)
+                overlapping = _overlapping_projections(proj, self.projections)
+                if overlapping:
+                    raise ParameterError(
+                        f"Can't select the connections of projection "
+                        f"`{projection}`: they can't be told apart from those "
+                        f"of projections {[str(p) for p in overlapping]}, "
+                        f"which use the same NEST synapse model "
+                        f"`{proj.nest_synapse_model}` between the same "
+                        f"populations. Select the connections by synapse model "
+                        f"or use distinct synapse models for these projections."
+                    )
+                conns = nest.GetConnections(
+                    source=proj.source.gids(population=proj.source_population),
+                    target=proj.target.gids(population=proj.target_population),
+                    synapse_model=proj.nest_synapse_model,
+                )
+            self._connections[key] = conns
+        return self._connections[key]
+
+    def invalidate_connections(self):
+        """Clear the cache of connections used by :meth:`connections`."""
+        self._connections = {}
+
+    def _get_projection(self, name):
+        """Return a projection from its name."""
+        for projection in self.projections:
+            if str(projection) == name:
+                return projection
+        raise ParameterError(f"Unknown projection: `{name}`")
+
     @staticmethod
-    def change_synapse_states(synapse_changes):
-        """Change parameters for some projections of a population.
+    def change_synapse_states(synapse_changes, input_dir=None):
+        """Change parameters for some synapses, selected by synapse model.
+
+        Kept for backward compatibility: connections are queried with
+        ``nest.GetConnections`` (rather than with :meth:`connections`) and
+        changes can't select connections by projection. Use
+        :meth:`set_state` or :meth:`compile_synapse_changes` and
+        :meth:`apply_synapse_changes` instead.
+
+        Refer to :meth:`compile_synapse_changes` for a description of
+        ``synapse_changes``.
+
+        Raises:
+            ParameterError: If the changes are invalid or if a change selects
+                connections by projection.
+        """
+        import nest
+
+        for plan in _compile_synapse_changes(synapse_changes, input_dir):
+            _apply_synapse_change(
+                plan, nest.GetConnections(synapse_model=plan.synapse_model)
+            )
+
+    def compile_synapse_changes(self, synapse_changes=None, input_dir=None):
+        """Validate synapse changes and load their arrays without applying them.
 
         Args:
             synapse_changes (list):
@@ -738,23 +995,55 @@ class Network(object):
 
                     {
                         'synapse_model': <synapse_model>,
-                        'params': {<param1>: <value1>}
+                        'projection': <projection_name>,
+                        'change_type': <change_type>,
+                        'from_array': <from_array>,
+                        'params': {<param1>: <value1>},
                     }
 
-                where the dictionary in ``params`` is passed to
-                ``nest.SetStatus()`` to set the parameters for all
-                projections with synapse model ``<synapse_model>``.
+                where ``<synapse_model>`` (str) or ``<projection_name>``
+                (str) specifies the connections of interest (see
+                :meth:`connections`), and ``<change_type>``
+                ('constant', 'multiplicative' or 'additive', default
+                ``'constant'``) and ``<from_array>`` (bool, default
+                ``False``) are interpreted as for unit changes (see
+                :meth:`set_state`). If ``<from_array>`` is true, the values
+                in ``params`` are arrays (or relative paths from
+                ``input_dir`` to arrays) with one value per connection, in
+                the order returned by :meth:`connections`.
+            input_dir (str | Path | None): Directory in which the arrays are
+                loaded from.
+
+        Returns:
+            list[SynapseChangePlan]: Changes passed to
+                :meth:`apply_synapse_changes`.
+
+        Raises:
+            ParameterError: If the changes are invalid.
+            FileNotFoundError: If an array file is missing.
         """
-        import nest
-        for changes in tqdm(
-                sorted(synapse_changes, key=_synapse_sorting_map),
-                desc="-> Changing synapses's state."):
-            target_conns = nest.GetConnections(
-                synapse_model=changes['synapse_model']
+        return _compile_synapse_changes(
+            synapse_changes, input_dir, get_projection=self._get_projection
+        )
+
+    def apply_synapse_changes(self, plans):
+        """Apply the changes returned by :meth:`compile_synapse_changes`.
+
+        Each parameter is set for all the connections of interest with a
+        single ``SetStatus`` call, using the cached connections.
+
+        Raises:
+            ValueError: If an array doesn't have one value per connection or
+                if a non-float parameter is changed multiplicatively or
+                additively.
+        """
+        for plan in plans:
+            _apply_synapse_change(
+                plan,
+                self.connections(
+                    synapse_model=plan.synapse_model, projection=plan.projection
+                ),
             )
-            change_params = changes['params']
-            log.info("Changing status for %s projections of type %s. Applying dict: %s", len(target_conns), changes['synapse_model'], change_params)
-            nest.SetStatus(target_conns, change_params)
 
     def set_state(self, unit_changes=None, synapse_changes=None,
                   input_dir=None):
@@ -816,6 +1105,12 @@ class Network(object):
                   The ``<change_type>`` and ``<from_array>`` parameters
                   specify the interpretation of the ``<param_change>`` value.
 
+            synapse_changes (list): List of dictionaries specifying the changes
+                applied to the network's synapses. Refer to
+                :meth:`compile_synapse_changes`.
+            input_dir (str | Path | None): Directory in which the arrays of
+                the unit and synapse changes are loaded from.
+
         Examples:
             >>> # Load parameter files and create the network object
             >>> import denest
@@ -865,6 +1160,28 @@ class Network(object):
             ...     'nest_params': {'g_peak_AMPA': 2.0}
             ... })
         """
+        self.apply_unit_changes(
+            self.compile_unit_changes(unit_changes, input_dir=input_dir)
+        )
+        self.apply_synapse_changes(
+            self.compile_synapse_changes(synapse_changes, input_dir=input_dir)
+        )
+
+    def compile_unit_changes(self, unit_changes=None, input_dir=None):
+        """Validate and resolve unit changes without applying them.
+
+        Input arrays are loaded and mapped to the GIDs of each population of
+        interest, so that errors are raised before any change is applied.
+        Refer to :meth:`set_state` for a description of ``unit_changes``.
+
+        Returns:
+            list[UnitChangePlan]: Changes passed to
+                :meth:`apply_unit_changes`.
+
+        Raises:
+            ParameterError: If some changes are invalid (eg unknown layers or
+                ``change_type``).
+        """
         UNIT_CHANGES_OPTIONAL = {
             'nest_params': {},
             'population_name': None,
@@ -876,6 +1193,7 @@ class Network(object):
         if unit_changes is None:
             unit_changes = []
 
+        plans = []
         for changes in sorted(unit_changes, key=_unit_sorting_map):
 
             changes = validation.validate(
@@ -884,31 +1202,161 @@ class Network(object):
                 mandatory=[],
                 optional=UNIT_CHANGES_OPTIONAL,
             )
+            # Checked even if the changes don't select any layer
+            if changes['change_type'] not in CHANGE_TYPES:
+                raise ParameterError(
+                    f"Unrecognized ``change_type`` in unit changes: "
+                    f"{changes['change_type']}"
+                )
 
             # Iterate on layers
             layer_names = changes.get('layers', [])
             if layer_names is None:
                 layers = self._get_layers()
             else:
+                unknown = set(layer_names) - set(self.layers)
+                if unknown:
+                    raise ParameterError(
+                        f"Unknown layers in unit changes: {sorted(unknown)}"
+                    )
                 layers = [self.layers[layer_name] for layer_name in layer_names]
 
             for layer in layers:
 
-                layer.set_state(
+                plans += layer.compile_state(
                     nest_params=changes['nest_params'],
                     population_name=changes['population_name'],
                     change_type=changes['change_type'],
                     from_array=changes['from_array'],
                     input_dir=input_dir,
                 )
+        return plans
+
+    def apply_unit_changes(self, plans):
+        """Apply the unit changes returned by :meth:`compile_unit_changes`."""
+        for plan in plans:
+            self.layers[plan.layer_name].apply_state(plan)
+
+    def get_state(self):
+        """Return the dynamic state of the network's units and plastic synapses.
+
+        The state of each population is queried with a single ``GetStatus``
+        call. Only the numerical parameters that can be set again are kept.
+        The weights of the connections of each plastic NEST synapse model used
+        by the projections (whose NEST defaults contain one of
+        ``PLASTIC_SYNAPSE_KEYS``) are queried with a single
+        ``GetConnections`` and ``GetStatus`` call. Projections recorded by a
+        weight recorder use their own synapse model.
+
+        Returns:
+            dict: Dictionary of the form::
+
+                {
+                    'units': {
+                        (<layer_name>, <population_name>): {
+                            <param>: <array>,
+                        },
+                    },
+                    'synapses': {
+                        <synapse_model>: {
+                            'sources': <array>,
+                            'targets': <array>,
+                            'weight': <array>,
+                        },
+                    },
+                }
+        """
+        import nest
+
+        units = {}
+        for layer in self._get_layers():
+            for population_name in layer.population_names:
+                gids = layer.gids(population=population_name)
+                statuses = nest.GetStatus(gids)
+                units[(layer.name, population_name)] = {
+                    key: np.array([status[key] for status in statuses])
+                    for key, value in statuses[0].items()
+                    if key not in READONLY_UNIT_STATUS_KEYS
+                    and isinstance(value, (bool, int, float))
+                }
+        synapses = {}
+        for synapse_model in _plastic_synapse_models(
+            self.projections, nest.GetDefaults
+        ):
+            conns = self.connections(synapse_model=synapse_model)
+            if not conns:
+                continue
+            sources, targets, weights = zip(
+                *nest.GetStatus(conns, ["source", "target", "weight"])
+            )
+            synapses[synapse_model] = {
+                "sources": np.array(sources),
+                "targets": np.array(targets),
+                "weight": np.array(weights),
+            }
+        return {"units": units, "synapses": synapses}
+
+    def restore_state(self, state):
+        """Restore the dynamic state returned by :meth:`get_state`.
+
+        Each unit parameter is set for a whole population with a single
+        ``SetStatus`` call. Parameters that NEST refuses to set are skipped
+        with a warning.
+        Synapse weights are set in bulk for each synapse model, after
+        checking that the network's connections match the saved ones.
+
+        Raises:
+            ValueError: If the connections of a synapse model don't match.
+        """
+        import nest
+
+        for (layer_name, population_name), params in state["units"].items():
+            gids = self.layers[layer_name].gids(population=population_name)
+            log.info("Restoring the state of %s, %s", layer_name, population_name)
+            for key, values in params.items():
+                try:
+                    nest.SetStatus(gids, key, values.tolist())
+                except Exception as error:  # pylint: disable=broad-except
+                    log.warning(
+                        "Not restoring parameter `%s` of %s, %s: %s",
+                        key,
+                        layer_name,
+                        population_name,
+                        error,
+                    )
+        for synapse_model, saved in state["synapses"].items():
+            conns = self.connections(synapse_model=synapse_model)
+            sources, targets = (
+                np.array(values) for values in zip(
+                    *nest.GetStatus(conns, ["source", "target"])
+                )
+            ) if conns else (np.array([]), np.array([]))
+            if not (
+                np.array_equal(sources, saved["sources"])
+                and np.array_equal(targets, saved["targets"])
+            ):
+                raise ValueError(
+                    f"Can't restore the weights of synapse model "
+                    f"`{synapse_model}`: the connections differ from the saved "
+                    f"ones."
+                )
+            log.info("Restoring the weights of %s synapses", synapse_model)
+            nest.SetStatus(conns, "weight", saved["weight"].tolist())
 
     def save_metadata(self, output_dir):
         """Save network metadata.
 
             - Save recorder metadata
+
+        Returns:
+            dict: ``{<metadata_path>: <metadata_dict>}`` dictionary for all
+                the recorders.
         """
         # Save recorder metadata
-        self._recorder_call('save_metadata', output_dir)
+        return dict(
+            recorder.save_metadata(output_dir)
+            for recorder in self.get_recorders()
+        )
 
     @staticmethod
     def print_network_size():
@@ -931,6 +1379,74 @@ class Network(object):
         return all_pops
 
 
+def _is_plastic(defaults):
+    """Return whether a synapse model is plastic, from its NEST defaults.
+
+    A synapse model is considered plastic if its defaults (as returned by
+    ``nest.GetDefaults``) contain one of ``PLASTIC_SYNAPSE_KEYS``.
+    """
+    return any(key in defaults for key in PLASTIC_SYNAPSE_KEYS)
+
+
+def _overlapping_projections(projection, projections):
+    """Return the other projections whose connections overlap a projection's.
+
+    Connections are selected by source and target gids and by NEST synapse
+    model, so the connections of projections between the same layers with the
+    same NEST synapse model can't be told apart unless their populations
+    differ. A population of ``None`` stands for all the layer's populations.
+
+    Args:
+        projection (BaseProjection): Projection.
+        projections (list): All the network's projections.
+
+    Returns:
+        list: Projections other than ``projection`` that may share some of its
+        connections.
+    """
+
+    def overlap(population, other_population):
+        return (
+            population is None
+            or other_population is None
+            or population == other_population
+        )
+
+    return [
+        other
+        for other in projections
+        if other is not projection
+        and other.nest_synapse_model == projection.nest_synapse_model
+        and other.source.name == projection.source.name
+        and other.target.name == projection.target.name
+        and overlap(other.source_population, projection.source_population)
+        and overlap(other.target_population, projection.target_population)
+    ]
+
+
+def _plastic_synapse_models(projections, get_defaults):
+    """Return the plastic NEST synapse models used by some projections.
+
+    Projections recorded by a weight recorder use their own copy of their
+    synapse model (see ``BaseProjection._connect_projection_recorder``).
+
+    Args:
+        projections (list): Projection objects.
+        get_defaults (callable): Returns the NEST defaults of a synapse model
+            (eg ``nest.GetDefaults``).
+
+    Returns:
+        list[str]: Sorted names of the synapse models.
+    """
+    return sorted(
+        synapse_model
+        for synapse_model in {
+            projection.nest_synapse_model for projection in projections
+        }
+        if _is_plastic(get_defaults(synapse_model))
+    )
+
+
 def _unit_sorting_map(unit_change):
     """Map by (layer, population, proportion, params_items for sorting."""
     return (unit_change.get('layers', 'None'),
@@ -940,6 +1456,142 @@ def _unit_sorting_map(unit_change):
 
 
 def _synapse_sorting_map(synapse_change):
-    """Map by (synapse_model, params_items) for sorting."""
-    return (synapse_change['synapse_model'],
-            sorted(synapse_change['params'].items()))
+    """Map by (synapse_model, projection, params) for sorting."""
+    return (str(synapse_change.get('synapse_model')),
+            str(synapse_change.get('projection')),
+            sorted(synapse_change.get('params', {}).keys()))
+
+
+def _compile_synapse_changes(synapse_changes, input_dir, get_projection=None):
+    """Validate synapse changes and load their arrays.
+
+    Refer to :meth:`Network.compile_synapse_changes`.
+
+    Args:
+        get_projection (callable | None): Called with the projection name of
+            changes selecting connections by projection (to check that it
+            exists). If None, such changes are invalid.
+    """
+    SYNAPSE_CHANGES_OPTIONAL = {
+        'synapse_model': None,
+        'projection': None,
+        'change_type': 'constant',
+        'from_array': False,
+    }
+
+    if synapse_changes is None:
+        synapse_changes = []
+    if input_dir is None:
+        input_dir = Path('./')
+
+    plans = []
+    for changes in sorted(synapse_changes, key=_synapse_sorting_map):
+
+        changes = validation.validate(
+            'Synapse changes dictionary',
+            changes,
+            mandatory=['params'],
+            optional=SYNAPSE_CHANGES_OPTIONAL,
+        )
+        if (changes['synapse_model'] is None) == \
+                (changes['projection'] is None):
+            raise ParameterError(
+                "Synapse changes should specify exactly one of "
+                f"`synapse_model` and `projection`: {changes}"
+            )
+        if changes['projection'] is not None:
+            if get_projection is None:
+                raise ParameterError(
+                    "Selecting synapse changes by projection requires a "
+                    f"network (see `Network.set_state`): {changes}"
+                )
+            get_projection(changes['projection'])
+        if changes['change_type'] not in CHANGE_TYPES:
+            raise ParameterError(
+                f"Unrecognized ``change_type`` in synapse changes: "
+                f"{changes['change_type']}"
+            )
+
+        params = {}
+        for param_name, param_change in changes['params'].items():
+            if changes['from_array'] and not isinstance(
+                param_change, np.ndarray
+            ):
+                path = Path(input_dir)/Path(param_change)
+                if not path.exists():
+                    raise FileNotFoundError(
+                        f"Could not load array from file at {path}"
+                    )
+                param_change = np.load(path)
+            if changes['from_array']:
+                param_change = np.ravel(param_change)
+            params[param_name] = param_change
+
+        plans.append(
+            SynapseChangePlan(
+                changes['synapse_model'], changes['projection'], params,
+                changes['change_type'], changes['from_array'],
+            )
+        )
+    return plans
+
+
+def _apply_synapse_change(plan, conns):
+    """Apply a ``SynapseChangePlan`` to some connections.
+
+    Refer to :meth:`Network.apply_synapse_changes`.
+    """
+    import nest
+
+    log.info(
+        "Changing status for %s connections (%s). Applying '%s' "
+        "change, params=%s",
+        len(conns),
+        plan.projection or plan.synapse_model,
+        plan.change_type,
+        list(plan.params),
+    )
+    if not conns or not plan.params:
+        return
+    if plan.change_type == 'constant' and not plan.from_array:
+        nest.SetStatus(conns, dict(plan.params))
+        return
+    for param_name, param_change in plan.params.items():
+        if plan.from_array and len(param_change) != len(conns):
+            raise ValueError(
+                f"Array for parameter `{param_name}` has "
+                f"{len(param_change)} values but there are "
+                f"{len(conns)} connections "
+                f"({plan.projection or plan.synapse_model})"
+            )
+        if plan.change_type == 'constant':
+            values = param_change
+        else:
+            values = _changed_values(
+                nest.GetStatus(conns, param_name), param_change,
+                plan.change_type,
+            )
+        nest.SetStatus(conns, param_name, np.asarray(values).tolist())
+
+
+def _changed_values(current, param_change, change_type):
+    """Return the values of a parameter after a synapse change.
+
+    Args:
+        current (array-like): Current values of the parameter.
+        param_change (float | np.ndarray): Value(s) of the change.
+        change_type (str): ``'multiplicative'`` or ``'additive'``.
+
+    Raises:
+        ValueError: If the parameter's values aren't floats.
+    """
+    current = np.array(current)
+    if not np.issubdtype(current.dtype, np.floating):
+        raise ValueError(
+            "Can't set state multiplicatively or additively "
+            "for non-float parameter(s). Expecting "
+            "``change_type='constant'``."
+        )
+    if change_type == 'multiplicative':
+        return current * param_change
+    return current + param_change
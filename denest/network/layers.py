@@ -6,6 +6,7 @@
 
 import itertools
 import logging
+from collections import namedtuple
 from pathlib import Path
 
 import numpy as np
@@ -16,6 +17,52 @@ from .utils import flatten, if_created, if_not_created
 
 log = logging.getLogger(__name__)
 
+CHANGE_TYPES = ["constant", "multiplicative", "additive"]
+
+# State changes of a population resolved by `AbstractLayer.compile_state`.
+# ``params`` maps parameter names to a single value or, if ``from_array`` is
+# true, to a list of values aligned with ``gids``.
+UnitChangePlan = namedtuple(
+    "UnitChangePlan",
+    ["layer_name", "population_name", "gids", "params", "change_type",
+     "from_array"],
+)
+
+
+def _combine_values(current_values, values, change_type):
+    """Multiply or add values to the current values of a parameter."""
+    if not all(isinstance(v, float) for v in current_values):
+        raise ValueError(
+            "Can't set state multiplicatively or additively for non-float"
+            " parameter(s). Expecting ``change_type='constant'``."
+        )
+    if change_type == "multiplicative":
+        return [v * change for v, change in zip(current_values, values)]
+    if change_type == "additive":
+        return [v + change for v, change in zip(current_values, values)]
+    raise ValueError(f"Unrecognized ``change_type``: {change_type}")
+
+
+def _unit_statuses(plan, get_status):
+    """Return the status dictionary of each unit of a ``from_array`` plan.
+
+    Args:
+        plan (UnitChangePlan): Plan compiled with ``from_array=True``.
+        get_status (callable): Called as ``get_status(gids, param_name)`` to
+            query the current values of a parameter if the change is
+            multiplicative or additive (eg ``nest.GetStatus``).
+    """
+    values = dict(plan.params)
+    if plan.change_type != "constant":
+        for param_name, param_values in values.items():
+            values[param_name] = _combine_values(
+                get_status(plan.gids, param_name), param_values, plan.change_type
+            )
+    return [
+        {param_name: values[param_name][i] for param_name in values}
+        for i in range(len(plan.gids))
+    ]
+
 
 class AbstractLayer(NestObject):
     """Abstract base class for a layer.
@@ -149,10 +196,56 @@ class AbstractLayer(NestObject):
     @if_created
     def set_state(self, nest_params=None, population_name=None,
                   change_type='constant', from_array=False, input_dir=None):
-        """Set the state of some of the layer's populations."""
+        """Set the state of some of the layer's populations.
+
+        Refer to :meth:`compile_state` for a description of the arguments.
+        """
+        for plan in self.compile_state(
+            nest_params=nest_params,
+            population_name=population_name,
+            change_type=change_type,
+            from_array=from_array,
+            input_dir=input_dir,
+        ):
+            self.apply_state(plan)
+
+    @if_created
+    def compile_state(self, nest_params=None, population_name=None,
+                      change_type='constant', from_array=False, input_dir=None):
+        """Resolve changes of the state of some of the layer's populations.
+
+        Input arrays are loaded and checked, and their values are mapped to
+        the populations' GIDs, so that the changes can later be applied with
+        :meth:`apply_state` without further validation.
+
+        Args:
+            nest_params (dict): ``{<param_name>: <param_change>}`` dictionary.
+            population_name (str | None): Name of the population of which we
+                change the state. All the layer's populations if None.
+            change_type (str): 'constant', 'multiplicative' or 'additive'.
+            from_array (bool): If true, ``param_change`` values are arrays or
+                relative paths from ``input_dir`` to arrays of the same shape
+                as the population.
+            input_dir (str | Path | None): Directory in which the arrays are
+                loaded from.
+
+        Returns:
+            list[UnitChangePlan]: One plan per population.
 
+        Raises:
+            ParameterError: If ``change_type`` is unrecognized.
+            FileNotFoundError: If an array file is missing.
+            ValueError: If an array doesn't have the population's shape.
+        """
+        if change_type not in CHANGE_TYPES:
+            raise ParameterError(
+                f"Unrecognized ``change_type`` in unit changes: {change_type}. "
+                f"Expecting one of {CHANGE_TYPES}"
+            )
         if input_dir is None:
             input_dir = Path('./')
+        if nest_params is None:
+            nest_params = {}
 
         # Iterate on populations
         if population_name is None:
@@ -160,21 +253,27 @@ class AbstractLayer(NestObject):
         else:
             population_names = [population_name]
 
+        plans = []
         for population_name in population_names:
             population_shape = self.population_shape[population_name]
+            gids = self.gids(population=population_name)
 
-            # For all the considered parameters, unfold the `param_change` value
-            # into an array to map to the population
-            param_arrays = {}
+            # For all the considered parameters, map the array of values to
+            # the population's units
+            params = {}
             for param_name, param_change in nest_params.items():
 
-                # Get array of values the same shape as the population
+                if not from_array:
+                    # Same value applied to all the units in the pop
+                    params[param_name] = param_change
+                    continue
+
                 # Option 1: map from numpy array directly provided
-                if from_array and isinstance(param_change, (np.ndarray)):
+                if isinstance(param_change, (np.ndarray)):
                     values_array = param_change
                     from_file = False
                 # Option 2: map from numpy array loaded from file
-                elif from_array:
+                else:
                     path = Path(input_dir)/Path(param_change)
                     if not path.exists():
                         raise FileNotFoundError(
@@ -182,15 +281,6 @@ class AbstractLayer(NestObject):
                         )
                     values_array = np.load(path)
                     from_file = True
-                # Option 3: Same value applied to all the units in the pop
-                else:
-                    # This does not work to make an array of lists
-                    # values_array = np.full(population_shape, param_change)
-                    # This can make array of lists
-                    values_array = np.frompyfunc(
-                        lambda: param_change, 0, 1)(
-                            np.empty(population_shape, dtype=object)
-                    )
 
                 # Provided array has correct dimension
                 if not values_array.shape == population_shape:
@@ -203,25 +293,38 @@ class AbstractLayer(NestObject):
                         f', got shape `{values_array.shape}`'
                     )
 
-                log.info(
-                    f"Layer='{self.name}', pop='{population_name}': Applying "
-                    f"'{change_type}' change, param='{param_name}', "
-                    f"{'from array' if from_array else 'from single value'}')"
+                params[param_name] = [
+                    values_array[self._population_locations[gid]]
+                    for gid in gids
+                ]
+
+            plans.append(
+                UnitChangePlan(
+                    self.name, population_name, gids, params, change_type,
+                    from_array,
                 )
+            )
+        return plans
 
-                param_arrays[param_name] = values_array
+    def apply_state(self, plan):
+        """Apply the state changes compiled by :meth:`compile_state`.
 
-            # Set all the parameters at once for each unit in the population
-            for gid, idx in [(gid, self._population_locations[gid])
-                             for gid in self.gids(population=population_name)]:
-                self.set_unit_state(
-                    (gid,),
-                    {
-                        param_name: param_arrays[param_name][idx]
-                        for param_name in param_arrays.keys()
-                    },
-                    change_type=change_type
-                )
+        The changes of each population are applied with a single
+        ``SetStatus`` call.
+        """
+        import nest
+
+        log.info(
+            f"Layer='{self.name}', pop='{plan.population_name}': Applying "
+            f"'{plan.change_type}' change, params={list(plan.params)}, "
+            f"{'from array' if plan.from_array else 'from single value'}')"
+        )
+        if not plan.params:
+            return
+        if not plan.from_array:
+            self.set_unit_state(plan.gids, plan.params, plan.change_type)
+            return
+        nest.SetStatus(plan.gids, _unit_statuses(plan, nest.GetStatus))
 
     @staticmethod
     def set_unit_state(gids, params, change_type="constant"):
@@ -245,10 +348,9 @@ class AbstractLayer(NestObject):
         """
         import nest
 
-        CHANGE_TYPES = ["constant", "multiplicative", "additive"]
         if change_type not in CHANGE_TYPES:
             raise ValueError(
-                '``change_type`` param should be one of {CHANGE_TYPES}'
+                f'``change_type`` param should be one of {CHANGE_TYPES}'
             )
 
         if change_type == "constant":
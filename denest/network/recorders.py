@@ -5,6 +5,9 @@
 """PopulationRecorder and ProjectionRecorder objects."""
 
 import logging
+from pathlib import Path
+
+import numpy as np
 
 from ..base_object import NestObject
 from ..io import save
@@ -17,6 +20,15 @@ log = logging.getLogger(__name__)
 # parameters are set in `populations.yml` rather than `recorders.yml`
 NON_NEST_PARAMS = {}
 
+# Keys of the NEST ``events`` dictionary for each raw data column. Other
+# columns (eg recorded variables of multimeters) have the same name as their
+# ``events`` key.
+EVENTS_KEYS = {"gid": "senders", "time": "times"}
+# dtype of harvested raw data columns. Other columns are saved as float64.
+HARVEST_DTYPES = {"gid": "int64"}
+# Allowed values of the ``shared`` population recorder parameter.
+SHARED_RECORDER_SCOPES = (None, "layer", "network")
+
 
 class BaseRecorder(NestObject):
     """Base class for all recorder classes. Represent nodes (not models).
@@ -38,6 +50,9 @@ class BaseRecorder(NestObject):
         self._record_to = None  # eg ['memory', 'file']
         self._withtime = None
         self._label = None  # Only affects raw data filenames.
+        # Whether events are recorded to memory and harvested by deNEST
+        self._harvest = False
+        self._n_harvested = 0  # Number of events harvested so far
 
     @property
     def model(self):
@@ -71,11 +86,15 @@ class BaseRecorder(NestObject):
         log.info(f"  Setting status for recorder %s: %s", str(self), nest_params)
         nest.SetStatus(self.gid, nest_params)
 
+    def device_label(self):
+        """Return the NEST ``label`` of the recorder node."""
+        return self.__str__()
+
     def set_label(self):
-        """Set self._label and node's NEST ``label`` from self.__str__."""
+        """Set self._label and node's NEST ``label`` from self.device_label."""
         import nest
 
-        self._label = self.__str__()
+        self._label = self.device_label()
         # Don't use self.set_status to avoid verbose
         # self.set_status({'label': self._label})
         nest.SetStatus(self.gid, {"label": self._label})
@@ -84,7 +103,7 @@ class BaseRecorder(NestObject):
         """Return column names of raw data files for pandas loading."""
         raise NotImplementedError
 
-    def raw_data_filenames(self):
+    def raw_data_filenames(self, local=False):
         """Return filenames of raw data files saved by NEST.
 
         From NEST documentation::
@@ -98,37 +117,148 @@ class BaseRecorder(NestObject):
         NB: We don't use the recorder's `filenames` key, since it is created
         only after the first `Simulate` call.
 
-        NB: There is one file per virtual process. The virtual processes are
-        numeroted from 0 and formatted with the same number of digits as that of
-        the number of virtual processes.
+        NB: There is one file per virtual process, across all MPI processes.
+        The virtual processes are numeroted from 0 and formatted with the same
+        number of digits as that of the total number of virtual processes.
+
+        Keyword Args:
+            local (bool): If true, return only the files written by this MPI
+                process.
         """
         import nest
 
+        if self._harvest:
+            return self.harvest_filenames(local=local)
         if "file" not in self._record_to:
             return []
         assert self._label is not None  # Check that the label has been set
         prefix = nest.GetKernelStatus("data_prefix") + self._label + f"-{self.gid[0]}-"
         extension = nest.GetStatus(self.gid, "file_extension")[0]
-        n_vp = nest.GetKernelStatus("local_num_threads")
-        # TODO: CHeck the formatting for 3 digits number of threads
-        assert n_vp <= 100
+        n_vp = nest.GetKernelStatus("total_num_virtual_procs")
         n_digits = len(str(n_vp))
-        return [prefix + f"{str(vp).zfill(n_digits)}.{extension}" for vp in range(n_vp)]
+        vps = range(n_vp)
+        if local:
+            # Virtual processes are assigned to MPI processes round-robin
+            rank, n_processes = nest.Rank(), nest.NumProcesses()
+            vps = [vp for vp in vps if vp % n_processes == rank]
+        return [prefix + f"{str(vp).zfill(n_digits)}.{extension}" for vp in vps]
+
+    def harvest_filenames(self, local=False):
+        """Return filenames of the binary files of harvested data.
+
+        Harvested data is saved in columnar format, with one file per column.
+        Filenames follow NEST's convention and are of the form
+        `data_prefix(label)-gid-colname.bin`. In MPI simulations, each process
+        harvests its own events, and filenames are of the form
+        `data_prefix(label)-gid-rank-colname.bin`.
+
+        Keyword Args:
+            local (bool): If true, return only the files written by this MPI
+                process.
+        """
+        import nest
+
+        assert self._label is not None  # Check that the label has been set
+        prefix = nest.GetKernelStatus("data_prefix") + self._label + f"-{self.gid[0]}-"
+        n_processes = nest.NumProcesses()
+        if n_processes == 1:
+            return [prefix + f"{colname}.bin" for colname in self.raw_data_colnames()]
+        ranks = [nest.Rank()] if local else range(n_processes)
+        return [
+            prefix + f"{rank}-{colname}.bin"
+            for rank in ranks
+            for colname in self.raw_data_colnames()
+        ]
+
+    def harvest_dtypes(self):
+        """Return the dtype of each harvested raw data column."""
+        return [
+            HARVEST_DTYPES.get(colname, "float64")
+            for colname in self.raw_data_colnames()
+        ]
+
+    @if_created
+    def harvest(self):
+        """Append the events recorded in memory to the binary data files.
+
+        Events are pulled from NEST with a single ``GetStatus`` call and
+        appended column-wise to the files returned by
+        :meth:`harvest_filenames`. The recorder's ``n_events`` is then reset,
+        which clears the events from memory.
+
+        Does nothing if the recorder is not in harvest mode.
+
+        Returns:
+            int: Number of harvested events.
+        """
+        import nest
+
+        if not self._harvest or not self.owns_device:
+            return 0
+        events = nest.GetStatus(self.gid, "events")[0]
+        n_events = len(events["senders"])
+        if not n_events:
+            return 0
+        data_path = Path(nest.GetKernelStatus("data_path"))
+        for colname, dtype, filename in zip(
+            self.raw_data_colnames(),
+            self.harvest_dtypes(),
+            self.harvest_filenames(local=True),
+        ):
+            values = np.asarray(events[EVENTS_KEYS.get(colname, colname)], dtype=dtype)
+            with open(data_path / filename, "ab") as f:
+                values.tofile(f)
+        nest.SetStatus(self.gid, {"n_events": 0})
+        self._n_harvested += n_events
+        return n_events
+
+    @property
+    def n_harvested(self):
+        """Number of events harvested so far (see :meth:`harvest`)."""
+        return self._n_harvested
+
+    @property
+    def owns_device(self):
+        """Whether the recorder node is owned (created) by this object."""
+        return True
 
     @if_created
     def get_base_metadata_dict(self):
         """Return metadata dict common to all recorder types."""
-        return {
+        metadata = {
             "type": self._type,
             "label": self._label,
             "colnames": self.raw_data_colnames(),
             "filenames": self.raw_data_filenames(),
         }
-
-    def save_metadata(self):
-        """Save metadata for recorder."""
+        if self._harvest:
+            metadata.update({
+                "format": "binary",
+                "dtypes": self.harvest_dtypes(),
+            })
+        return metadata
+
+    def get_metadata_dict(self):
+        """Return the recorder's metadata dict."""
         raise NotImplementedError
 
+    def metadata_path(self, output_dir):
+        """Return the path to the recorder's metadata file."""
+        return save.output_path(
+            output_dir, "recorders_metadata", self.__str__()
+        ).with_suffix(".yml")
+
+    def save_metadata(self, output_dir):
+        """Save recorder metadata.
+
+        Returns:
+            tuple: ``(<metadata_path>, <metadata_dict>)``
+        """
+        metadata_path = self.metadata_path(output_dir)
+        metadata = self.get_metadata_dict()
+        save.save_as_yaml(metadata_path, metadata)
+        return metadata_path, metadata
+
 
 class PopulationRecorder(BaseRecorder):
     """Represent a recorder node. Connects to a single population.
@@ -147,13 +277,25 @@ class PopulationRecorder(BaseRecorder):
             network parameters. (eg: 'multimeter' or 'modified_multimeter')
         layer (Layer): Layer object
         population_name (str): Name of population to connect to.
+
+    Keyword Args:
+        harvest (bool): If true, the recorder records to memory only and the
+            recorded events are regularly appended by deNEST to binary
+            columnar files (see :meth:`BaseRecorder.harvest`). This
+            overrides the ``record_to`` NEST parameter. (default ``False``)
+
+    PopulationRecorder objects may share a single recorder node in NEST (see
+    :meth:`PopulationRecorder.share_device`). The raw data of a shared node
+    contains the events of all the populations it is connected to, and is
+    demultiplexed by GID during loading.
     """
 
     POP_RECORDER_TYPES = ["multimeter", "spike_detector"]
 
-    def __init__(self, model, layer, population_name):
+    def __init__(self, model, layer, population_name, harvest=False):
         """Initialize PopulationRecorder object."""
         super().__init__(model)
+        self._harvest = harvest
         self.layer = layer
         self._population_name = population_name  # Name of recorded population
         self._layer_name = self.layer.name  # Name of recorded pop's layer
@@ -183,10 +325,48 @@ class PopulationRecorder(BaseRecorder):
         # are updated after creation
         self._record_from = None  # list of variables for mm, or ['spikes']
         self._interval = None  # Sampling interval. Ignored for spike_detector.
+        # PopulationRecorder creating the shared recorder node and label of
+        # the shared node. None if the node is not shared.
+        self._device_owner = None
+        self._device_label = None
 
     def __str__(self):
         return self.model + "_" + self._layer_name + "_" + self._population_name
 
+    def share_device(self, owner, label):
+        """Share a recorder node with other population recorders.
+
+        Args:
+            owner (PopulationRecorder): Recorder that creates the shared node.
+                Must be created before the other recorders sharing its node.
+            label (str): NEST ``label`` of the shared node.
+        """
+        if self._created:
+            raise ValueError("Can't share the node of a created recorder.")
+        if owner.model != self.model or owner._harvest != self._harvest:
+            raise ValueError(
+                "Recorders sharing a node should have the same model and "
+                "harvest mode."
+            )
+        self._device_owner = owner
+        self._device_label = label
+
+    @property
+    def shared(self):
+        """Whether the recorder node is shared with other populations."""
+        return self._device_owner is not None
+
+    @property
+    def owns_device(self):
+        """Whether the recorder node is owned (created) by this object."""
+        return self._device_owner is None or self._device_owner is self
+
+    def device_label(self):
+        """Return the NEST ``label`` of the recorder node."""
+        if self.shared:
+            return self._device_label
+        return self.__str__()
+
     @property
     @if_created
     def gids(self):
@@ -220,8 +400,16 @@ class PopulationRecorder(BaseRecorder):
         """
         import nest
 
-        # Create node
-        self._gid = nest.Create(self.model, params={})
+        # Create node, or use the shared node
+        if self.owns_device:
+            self._gid = nest.Create(self.model, params={})
+            if self._harvest:
+                nest.SetStatus(self.gid, {"record_to": ["memory"]})
+        else:
+            assert self._device_owner._created, (
+                "Shared recorder node should be created by its owner first"
+            )
+            self._gid = self._device_owner.gid
         # Save population and layer-wide attributes
         self._gids = self.layer.gids(population=self.population_name)
         self._locations = {
@@ -264,12 +452,13 @@ class PopulationRecorder(BaseRecorder):
                 "record_from": self._record_from,
             }
         )
+        if self.shared:
+            metadata_dict["shared"] = True
         return metadata_dict
 
-    def save_metadata(self, output_dir):
-        """Save population recorder metadata."""
-        metadata_path = save.output_path(output_dir, "recorders_metadata", self._label)
-        save.save_as_yaml(metadata_path, self.get_population_recorder_metadata_dict())
+    def get_metadata_dict(self):
+        """Return the recorder's metadata dict."""
+        return self.get_population_recorder_metadata_dict()
 
     def raw_data_colnames(self):
         """Return list of labels for columns in raw data saved by NEST."""
@@ -363,7 +552,6 @@ class ProjectionRecorder(BaseRecorder):
             # TODO
             return None
 
-    def save_metadata(self, output_dir):
-        """Save recorder metadata."""
-        metadata_path = save.output_path(output_dir, "recorders_metadata", self._label)
-        save.save_as_yaml(metadata_path, self.get_projection_recorder_metadata_dict())
+    def get_metadata_dict(self):
+        """Return the recorder's metadata dict."""
+        return self.get_projection_recorder_metadata_dict()
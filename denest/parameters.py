@@ -4,12 +4,24 @@
 
 """Provide the ``ParamsTree`` class."""
 
-from collections import ChainMap, UserDict
+import hashlib
+import json
+from collections import ChainMap, UserDict, namedtuple
 from collections.abc import Mapping
+from copy import deepcopy
 from pprint import pformat
 
+import numpy as np
 import yaml
 
+from .utils.parse_cache import parse_yaml
+
+# Use the libyaml bindings when available
+try:
+    from yaml import CDumper as Dumper
+except ImportError:
+    from yaml import Dumper
+
 _MAX_LINES = 30
 
 
@@ -19,23 +31,218 @@ class InvalidTreeError(ValueError):
     pass
 
 
+class DuplicateLeafError(InvalidTreeError):
+    """Raised when leaves that should have unique names don't."""
+
+    pass
+
+
+def _canonical(value):
+    """Return a canonical, type-tagged encoding of a value for ``fingerprint``.
+
+    Values are encoded as JSON-serializable ``[type, content]`` pairs, so that
+    values of different types (eg ``1`` and ``"1"``) are encoded differently.
+    Mappings and sets are sorted by the encoding of their keys and items, which
+    may have different types. Lists and tuples are both encoded as lists.
+    Numpy arrays and scalars are encoded by dtype, shape and a digest of their
+    content (``str`` abbreviates large arrays). Other objects are encoded by
+    type and ``repr``.
+
+    Raises:
+        TypeError: For objects with the default ``repr``, which depends on the
+            object's memory address.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (np.ndarray, np.generic)):
+        array = np.ascontiguousarray(value)
+        if array.dtype.hasobject:
+            # The bytes of object arrays are pointers
+            content = _canonical(array.tolist())
+        else:
+            content = hashlib.sha256(array.tobytes()).hexdigest()
+        return ["ndarray", array.dtype.str, list(array.shape), content]
+    # `bool` is a subclass of `int`
+    for type_ in (bool, int, float, str):
+        if isinstance(value, type_):
+            return [type_.__name__, type_(value)]
+    if isinstance(value, bytes):
+        return ["bytes", value.hex()]
+    if isinstance(value, Mapping):
+        return ["dict", _sorted_encodings([key, value[key]] for key in value)]
+    if isinstance(value, (set, frozenset)):
+        return ["set", _sorted_encodings(value)]
+    if isinstance(value, (list, tuple)):
+        return ["list", [_canonical(item) for item in value]]
+    if type(value).__repr__ is object.__repr__:
+        raise TypeError(
+            f"Can't fingerprint value `{value!r}` of type `{type(value)}`: its "
+            "representation isn't reproducible"
+        )
+    type_ = type(value)
+    return ["object", f"{type_.__module__}.{type_.__qualname__}", repr(value)]
+
+
+def _sorted_encodings(values):
+    """Return the canonical encodings of values, in canonical order."""
+    return sorted(
+        (_canonical(value) for value in values),
+        key=lambda encoding: json.dumps(encoding, separators=(",", ":")),
+    )
+
+
+# Index of the descendants of a node (see `ParamsTree.find`). `paths` maps
+# paths to descendants, `leaves` is the list of leaves and `leaf_paths` maps
+# leaf names to the paths of the leaves with that name.
+_TreeIndex = namedtuple("_TreeIndex", ["paths", "leaves", "leaf_paths"])
+
+
+class _TrackedDict(dict):
+    """Dictionary that counts the mutations of all its instances.
+
+    Used for the data and children of ``ParamsTree`` nodes. Every mutation
+    increments the class's ``version`` counter, which invalidates the views
+    cached by the trees. Mutations of the values themselves (eg appending to
+    a list) are not tracked.
+
+    The data dictionaries of a node may be shared by the nodes of copied or
+    merged trees. They are then copied before being mutated through a tree
+    (see ``DeepChainMap``).
+    """
+
+    version = 0
+    # Number of tree nodes sharing this dictionary (see `ParamsTree.copy`).
+    # Nodes that are garbage collected aren't discounted, so a dictionary may
+    # be copied once unnecessarily.
+    _owners = 0
+
+    def _mutated(self):
+        _TrackedDict.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._mutated()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._mutated()
+
+    def clear(self):
+        super().clear()
+        self._mutated()
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._mutated()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._mutated()
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._mutated()
+        return value
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._mutated()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
 class DeepChainMap(ChainMap):
-    """Variant of ChainMap that allows direct updates to inner scopes."""
+    """Variant of ChainMap that allows direct updates to inner scopes.
+
+    Lookups use a flattened copy of the maps, which is cached until the data
+    of some tree is mutated (see ``_TrackedDict``).
+
+    Keyword Args:
+        owner (ParamsTree | None): Node whose inherited data is represented.
+            The maps are then the data of the node and of its ancestors, and
+            maps shared with other trees are copied before being updated.
+    """
+
+    def __init__(self, *maps, owner=None):
+        super().__init__(*maps)
+        self._owner = owner
+        self._flat = None
+        self._flat_version = None
+
+    def flat(self):
+        """Return the flattened (cached) dictionary of the maps."""
+        if self._flat is None or self._flat_version != _TrackedDict.version:
+            flat = {}
+            for mapping in reversed(self.maps):
+                flat.update(mapping)
+            self._flat = flat
+            self._flat_version = _TrackedDict.version
+        return self._flat
+
+    def _writable(self, index):
+        """Return a map, copying it first if it's shared with other trees."""
+        mapping = self.maps[index]
+        if self._owner is None or getattr(mapping, "_owners", 0) <= 1:
+            return mapping
+        # pylint: disable=protected-access
+        node = self._owner if index == 0 else self._owner._ancestors[index - 1]
+        return node._unshare(mapping)
+
+    def __deepcopy__(self, memo):
+        # Don't copy the owner's tree
+        return type(self)(*(deepcopy(mapping, memo) for mapping in self.maps))
+
+    def __getitem__(self, key):
+        try:
+            return self.flat()[key]
+        except KeyError:
+            return self.__missing__(key)
+
+    def get(self, key, default=None):
+        return self.flat().get(key, default)
+
+    def __contains__(self, key):
+        return key in self.flat()
+
+    def __iter__(self):
+        return iter(self.flat())
+
+    def __len__(self):
+        return len(self.flat())
 
     def __setitem__(self, key, value):
-        for mapping in self.maps:
+        for index, mapping in enumerate(self.maps):
             if key in mapping:
-                mapping[key] = value
+                self._writable(index)[key] = value
                 return
-        self.maps[0][key] = value
+        self._writable(0)[key] = value
 
     def __delitem__(self, key):
-        for mapping in self.maps:
+        for index, mapping in enumerate(self.maps):
             if key in mapping:
-                del mapping[key]
+                del self._writable(index)[key]
                 return
         raise KeyError(key)
 
+    def pop(self, key, *args):
+        if key in self.maps[0]:
+            return self._writable(0).pop(key)
+        if args:
+            return args[0]
+        raise KeyError(f"Key not found in the first mapping: {key!r}")
+
+    def popitem(self):
+        if not self.maps[0]:
+            raise KeyError("No keys found in the first mapping.")
+        return self._writable(0).popitem()
+
+    def clear(self):
+        self._writable(0).clear()
+
 
 class ParamsTree(UserDict):
     """A tree of nodes that inherit and override ancestors' data.
@@ -68,10 +275,6 @@ class ParamsTree(UserDict):
     DATA_KEYS = ["params", "nest_params"]
 
     def __init__(self, mapping=None, parent=None, name=None, validate=True):
-        # Parent
-        self._parent = parent
-        # Name
-        self._name = name
         # Validate mapping
         if mapping is None:
             # No data & no children
@@ -80,29 +283,134 @@ class ParamsTree(UserDict):
             mapping = self.validate(mapping)
         # Data internal to this node. Keys are those specified by DATA_KEYS.
         # Each data key contains an empty dictionary by default.
-        self._data = {key: mapping.get(key, {}) for key in self.DATA_KEYS}
-        # Accessible data (inherits from parents)
-        super().__init__(self._data)
-        self.data = {
-            key: DeepChainMap(
-                self.data[key],
-                *(ancestor.node_data[key] for ancestor in self.ancestors()),
-            )
-            for key in self.DATA_KEYS
-        }
-        # Children
-        self._children = {
-            key: ParamsTree(value, parent=self, name=key)
+        self._init_node(
+            {key: _TrackedDict(mapping.get(key, {})) for key in self.DATA_KEYS},
+            parent,
+            name,
+        )
+        # Children. The whole mapping was validated already
+        self._children = _TrackedDict({
+            key: ParamsTree(value, parent=self, name=key, validate=False)
             for key, value in mapping.items()
             if key not in self.DATA_KEYS
-        }
+        })
+
+    def _init_node(self, data, parent, name):
+        """Initialize a node's data and inherited data, but not its children.
+
+        Args:
+            data (dict): ``{<data_key>: <_TrackedDict>}`` dictionary.
+            parent (ParamsTree | None): Parent node.
+            name (str | None): Name of the node.
+        """
+        # Parent
+        self._parent = parent
+        # Name
+        self._name = name
+        # Ancestors, resolved once from the parent's
+        self._ancestors = (
+            () if parent is None else (parent,) + parent._ancestors
+        )
+        self._data = data
+        for mapping in data.values():
+            mapping._owners += 1  # pylint: disable=protected-access
+        # Accessible data (inherits from parents), built on first access
+        self._views = None
+        # Index of the descendants, built on first access
+        self._index = None
+        self._index_version = None
+        # Memoized fingerprint
+        self._fingerprint = None
+        self._fingerprint_version = None
+
+    @property
+    def data(self):
+        """Accessible data (inherits from parents). ``UserDict`` storage."""
+        if self._views is None:
+            # The parent's chain of maps is reused rather than walking up the
+            # tree
+            parent = self._parent
+            self._views = {
+                key: DeepChainMap(
+                    self._data[key],
+                    *(() if parent is None else parent.data[key].maps),
+                    owner=self,
+                )
+                for key in self.DATA_KEYS
+            }
+        return self._views
+
+    def __getattr__(self, name):
         # Syntactic sugar to allow data keys to be accessed as attributes
-        for data_key, value in self.data.items():
-            setattr(self, data_key, value)
+        if name in self.DATA_KEYS:
+            return self.data[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
+    @classmethod
+    def _shared_node(cls, data, parent=None, name=None, children=None):
+        """Return a node sharing existing data dictionaries (no validation).
+
+        Args:
+            data (dict): ``{<data_key>: <_TrackedDict>}`` dictionary. The
+                dictionaries are shared with the nodes already using them.
+
+        Keyword Args:
+            children (callable | None): Called with the new node and
+                returning its children dictionary.
+        """
+        node = cls.__new__(cls)
+        node._init_node(data, parent, name)  # pylint: disable=protected-access
+        node._children = _TrackedDict(  # pylint: disable=protected-access
+            {} if children is None else children(node)
+        )
+        return node
+
+    def _share(self, parent=None, name=None):
+        """Return a copy of this subtree sharing the nodes' data."""
+        return self._shared_node(
+            dict(self._data),
+            parent=parent,
+            name=name,
+            children=lambda node: {
+                child_name: child._share(parent=node, name=child_name)
+                for child_name, child in self._children.items()
+            },
+        )
+
+    def _unshare(self, mapping):
+        """Replace one of the node's data dictionaries by a private copy.
+
+        The inherited data of the node and its descendants is updated.
+
+        Returns:
+            _TrackedDict: The copy.
+        """
+        data_key = next(
+            key for key, value in self._data.items() if value is mapping
+        )
+        copy = _TrackedDict(mapping)
+        copy._owners = 1  # pylint: disable=protected-access
+        mapping._owners -= 1  # pylint: disable=protected-access
+        self._data[data_key] = copy
+        # Descendants' views are only built after their ancestors'
+        depth = len(self._ancestors)
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            if node._views is not None:
+                node._views[data_key].maps[len(node._ancestors) - depth] = copy
+                nodes.extend(node.children.values())
+        return copy
 
     @property
     def node_data(self):
         """The data associated with this node (not inherited from parents)."""
+        # The dictionaries may be mutated: stop sharing them with other trees
+        for mapping in list(self._data.values()):
+            if mapping._owners > 1:  # pylint: disable=protected-access
+                self._unshare(mapping)
         return self._data
 
     def __eq__(self, other):
@@ -111,7 +419,8 @@ class ParamsTree(UserDict):
         Note that parents can differ. We compare node's own data rather than
         inherited data.
         """
-        return self.node_data == other.node_data and self.children == other.children
+        # pylint: disable=protected-access
+        return self._data == other._data and self.children == other.children
 
     @property
     def parent(self):
@@ -133,14 +442,62 @@ class ParamsTree(UserDict):
 
         Doesn't include self. More recent ancestors appear earlier in the list.
         """
-        ancestors = []
-        node = self
-        while True:
-            if node.parent is None:
-                break
-            ancestors.append(node.parent)
-            node = node.parent
-        return ancestors
+        return list(self._ancestors)
+
+    def _get_index(self):
+        """Return the index of the descendants, rebuilt after mutations."""
+        if self._index is None or self._index_version != _TrackedDict.version:
+            paths, leaves, leaf_paths = {}, [], {}
+
+            def visit(node, prefix):
+                for name, child in node.children.items():
+                    path = f"{prefix}{name}"
+                    paths[path] = child
+                    if child.children:
+                        visit(child, path + "/")
+                    else:
+                        leaves.append(child)
+                        leaf_paths.setdefault(name, []).append(path)
+
+            visit(self, "")
+            self._index = _TreeIndex(paths, leaves, leaf_paths)
+            self._index_version = _TrackedDict.version
+        return self._index
+
+    def find(self, path):
+        """Return the descendant at a path.
+
+        Args:
+            path (str): ``'/'``-separated names of the nodes from this node's
+                child to the descendant, eg ``'network/layers/l1'``.
+
+        Raises:
+            KeyError: If there is no descendant at the path.
+        """
+        path = str(path).strip("/")
+        if not path:
+            return self
+        try:
+            return self._get_index().paths[path]
+        except KeyError:
+            raise KeyError(f"No node at path `{path}` in tree `{self.name}`")
+
+    def leaf(self, name):
+        """Return the leaf with a given name.
+
+        Raises:
+            KeyError: If there is no leaf with that name.
+            DuplicateLeafError: If there is more than one leaf with that name.
+        """
+        index = self._get_index()
+        paths = index.leaf_paths.get(name)
+        if paths is None:
+            raise KeyError(f"No leaf named `{name}` in tree `{self.name}`")
+        if len(paths) > 1:
+            raise DuplicateLeafError(
+                f"Multiple leaves named `{name}` in tree `{self.name}`: {paths}"
+            )
+        return index.paths[paths[0]]
 
     def leaves(self, root=True):
         """Return a list of leaf nodes of the tree.
@@ -148,23 +505,71 @@ class ParamsTree(UserDict):
         Traversal order is not defined. If root is False and there is not
         children, returns an empty list
         """
-        leaves = []
-        # Recursive case: not a leaf
-        for child in self.children.values():
-            leaves.extend(child.leaves(root=True))
-        # Base case: leaf
-        if not leaves and root:
-            leaves.append(self)
-        return leaves
-
-    def named_leaves(self, root=True):
+        if not self.children:
+            return [self] if root else []
+        return list(self._get_index().leaves)
+
+    def named_leaves(self, root=True, unique=False):
         """Return list of ``(<name>, <node>)`` tuples for all the leaves.
 
         Traversal order is not defined. If root is False and there is not
         children, returns an empty list
+
+        Keyword Args:
+            unique (bool): If true, check that leaves have unique names.
+
+        Raises:
+            DuplicateLeafError: If ``unique`` is true and leaves have the
+                same name.
         """
+        if unique and self.children:
+            duplicates = {
+                name: paths
+                for name, paths in self._get_index().leaf_paths.items()
+                if len(paths) > 1
+            }
+            if duplicates:
+                raise DuplicateLeafError(
+                    f"Leaves of tree `{self.name}` have duplicate names "
+                    f"(name: paths):\n{pformat(duplicates)}"
+                )
         return [(leaf.name, leaf) for leaf in self.leaves(root=root)]
 
+    def fingerprint(self):
+        """Return a hash of the node's inherited data and of its children.
+
+        The fingerprint depends on the data accessible from the node
+        (including inherited data), and on the names and fingerprints of its
+        children. It doesn't depend on the order of keys or on the node's own
+        name. It is memoized until the data of some tree is mutated (see
+        ``_TrackedDict``).
+
+        Returns:
+            str: Hexadecimal sha256 digest.
+
+        Raises:
+            TypeError: If the data contains objects whose representation isn't
+                reproducible (see ``_canonical``).
+        """
+        if (
+            self._fingerprint is None
+            or self._fingerprint_version != _TrackedDict.version
+        ):
+            content = {
+                "data": {key: self.data[key].flat() for key in self.DATA_KEYS},
+                "children": {
+                    str(name): child.fingerprint()
+                    for name, child in self.children.items()
+                },
+            }
+            self._fingerprint = hashlib.sha256(
+                json.dumps(_canonical(content), separators=(",", ":")).encode(
+                    "utf-8"
+                )
+            ).hexdigest()
+            self._fingerprint_version = _TrackedDict.version
+        return self._fingerprint
+
     @classmethod
     def merge(cls, *trees, parent=None, name=None):
         """Merge trees into a new tree. Earlier trees take precedence.
@@ -176,35 +581,62 @@ class ParamsTree(UserDict):
 
         Equivalent nodes' data is merged horizontally before hierarchical
         inheritance.
+
+        Subtrees and data that come from a single tree are shared with that
+        tree until either is mutated (see :meth:`copy`).
         """
-        # Merge node's own data
-        data = {
-            key: dict(ChainMap(*(tree.node_data[key] for tree in trees)))
-            for key in cls.DATA_KEYS
-        }
+        # pylint: disable=protected-access
+        if len(trees) == 1:
+            return trees[0]._share(parent=parent, name=name)
+        # Merge node's own data. Share it if a single tree has data
+        data = {}
+        for key in cls.DATA_KEYS:
+            maps = [tree._data[key] for tree in trees if tree._data[key]]
+            if len(maps) == 1:
+                data[key] = maps[0]
+            else:
+                merged_data = {}
+                for mapping in reversed(maps):
+                    merged_data.update(mapping)
+                data[key] = _TrackedDict(merged_data)
         # Initialize tree with node data and no children
-        merged = cls(mapping=data, parent=parent, name=name)
+        merged = cls._shared_node(data, parent=parent, name=name)
         # Merge children recursively, passing parent so that children inherit
         # merged node's data
         children = set.union(*(set(tree.children) for tree in trees))
-        merged._children = {
+        merged._children = _TrackedDict({
             name: cls.merge(
                 *(tree.children[name] for tree in trees if name in tree.children),
                 parent=merged,
                 name=name,
             )
             for name in children
-        }
+        })
         return merged
 
-    def copy(self):
-        """Copy this ``ParamsTree``."""
-        return ParamsTree(self.asdict())
+    def copy(self, parent=None, name=None):
+        """Copy this ``ParamsTree``.
+
+        The copy's nodes share the original nodes' data until the data of
+        either tree is mutated (copy-on-write), so copying doesn't depend on
+        the amount of data.
+
+        Keyword Args:
+            parent (ParamsTree | None): Parent of the copy, from which it
+                inherits data. The copy isn't added to the parent's children.
+            name (str | None): Name of the copy.
+        """
+        return self._share(parent=parent, name=name)
+
+    def __copy__(self):
+        # The default implementation copies the instance's `__dict__`, which
+        # bypasses the `data` property of `UserDict`
+        return self.copy()
 
     def asdict(self):
         """Convert this ``ParamsTree`` to a nested dictionary."""
         return {
-            **{key: dict(value) for key, value in self.node_data.items()},
+            **{key: dict(value) for key, value in self._data.items()},
             **{name: child.asdict() for name, child in self.children.items()},
         }
 
@@ -228,13 +660,18 @@ class ParamsTree(UserDict):
     @classmethod
     def read(cls, path):
         """Load a YAML representation of a tree from disk."""
-        with open(path, "rt") as f:
-            return cls(yaml.load(f, Loader=yaml.SafeLoader))
+        return cls(parse_yaml(path))
 
     def write(self, path):
         """Write a YAML representation of a tree to disk."""
         with open(path, "wt") as f:
-            yaml.dump(self.asdict(), f, default_flow_style=False, sort_keys=False)
+            yaml.dump(
+                self.asdict(),
+                f,
+                Dumper=Dumper,
+                default_flow_style=False,
+                sort_keys=False,
+            )
         return path
 
     def validate(self, mapping, path=None):
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pool.py
+
+"""Run simulations in a pool of long-lived worker processes."""
+
+import logging
+import multiprocessing
+import os
+import time
+
+from .utils.misc import default_n_workers, run_job
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Information about the current worker process, set by `_init_worker`
+_WORKER = {}
+
+
+class SimulationPool:
+    """Pool of worker processes running simulations.
+
+    Importing NEST and installing extension modules is done once per worker,
+    when the pool is started, rather than once per simulation. Each worker
+    then runs simulations one after the other, resetting the NEST kernel
+    before each of them (see :meth:`Simulation.init_kernel`). This is useful
+    to run many short simulations.
+
+    Jobs are ``(tree, output_dir)`` tuples submitted with :meth:`submit` or
+    :meth:`map`. Each job returns a dictionary with the following keys:
+        ``output_dir`` (str)
+            Output directory of the simulation.
+        ``status`` (str)
+            ``'completed'`` or ``'failed'``.
+        ``error`` (str | None)
+            Error message of failed jobs.
+        ``worker`` (int)
+            PID of the worker process.
+        ``init_time`` (float)
+            Time (s) spent initializing the worker process (importing NEST
+            and installing extension modules). Shared by all the jobs run by
+            the worker.
+        ``wait_time`` (float)
+            Time (s) between the job's submission and its start.
+        ``setup_time`` (float)
+            Time (s) spent building the simulation (resetting the kernel,
+            creating the network and saving metadata).
+        ``run_time`` (float)
+            Time (s) spent running the simulation.
+        ``total_time`` (float)
+            Time (s) spent in the worker.
+
+    Workers are started with the ``spawn`` method. Use the pool as a context
+    manager, or call :meth:`close` when done.
+
+    Examples:
+        >>> with SimulationPool(4, extension_modules=['mymodule']) as pool:
+        ...     results = pool.map(
+        ...         [(tree, f'output/{i}') for i, tree in enumerate(trees)]
+        ...     )
+
+    Keyword Args:
+        n_workers (int | None): Number of worker processes. If unspecified,
+            chosen so that ``n_workers * threads_per_worker`` doesn't exceed
+            the number of CPUs.
+        threads_per_worker (int | None): If not None, the
+            ``local_num_threads`` NEST kernel parameter of each simulation
+            is set to this value.
+        extension_modules (list[str]): NEST extension modules installed in
+            each worker when it starts.
+    """
+
+    def __init__(self, n_workers=None, threads_per_worker=None,
+                 extension_modules=()):
+        if n_workers is None:
+            n_workers = default_n_workers(threads_per_worker)
+        self.n_workers = n_workers
+        self.threads_per_worker = threads_per_worker
+        log.info("Starting pool of %s simulation workers", n_workers)
+        start_time = time.time()
+        context = multiprocessing.get_context("spawn")
+        self._pool = context.Pool(
+            n_workers,
+            initializer=_init_worker,
+            initargs=(list(extension_modules),),
+        )
+        log.info("Started pool in %.3f s", time.time() - start_time)
+
+    def submit(self, tree, output_dir, input_dir=None):
+        """Submit a simulation.
+
+        Args:
+            tree (tree-like): Full parameter tree of the simulation.
+            output_dir (str): Output directory of the simulation.
+
+        Keyword Args:
+            input_dir (str | None): Passed to :class:`Simulation`.
+
+        Returns:
+            multiprocessing.pool.AsyncResult: Result of the job. ``get()``
+                returns the job's timings dictionary.
+        """
+        return self._pool.apply_async(
+            _run_job, (self._job(tree, output_dir, input_dir),)
+        )
+
+    def map(self, jobs, input_dir=None):
+        """Run simulations and return their results in order.
+
+        Args:
+            jobs (list[tuple]): List of ``(tree, output_dir)`` tuples.
+
+        Keyword Args:
+            input_dir (str | None): Passed to :class:`Simulation`.
+
+        Returns:
+            list[dict]: Timings dictionary of each job.
+        """
+        results = self._pool.map(
+            _run_job,
+            [self._job(tree, output_dir, input_dir) for tree, output_dir in jobs],
+            chunksize=1,
+        )
+        for result in results:
+            if result["status"] == "failed":
+                log.error(
+                    "Simulation in %s failed: %s",
+                    result["output_dir"],
+                    result["error"],
+                )
+        return results
+
+    def _job(self, tree, output_dir, input_dir):
+        """Return the picklable arguments of a job."""
+        from .parameters import ParamsTree
+
+        if isinstance(tree, ParamsTree):
+            tree = tree.asdict()
+        return (
+            tree,
+            str(output_dir),
+            input_dir,
+            self.threads_per_worker,
+            time.time(),
+        )
+
+    def close(self):
+        """Wait for the submitted jobs and stop the workers."""
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _init_worker(extension_modules):
+    """Import NEST and install extension modules in a worker process."""
+    start_time = time.time()
+    import nest  # pylint: disable=unused-import
+
+    from .simulation import Simulation
+
+    for module in extension_modules:
+        Simulation.install_module(module)
+    _WORKER["init_time"] = time.time() - start_time
+    log.info(
+        "Worker %s initialized in %.3f s", os.getpid(), _WORKER["init_time"]
+    )
+
+
+def _run_job(job):
+    """Run a simulation in a worker process."""
+    from .parameters import ParamsTree
+    from .simulation import Simulation
+
+    tree, output_dir, input_dir, threads, submit_time = job
+
+    def run_simulation(result):
+        start_time = time.time()
+        simulation_tree = ParamsTree(tree)
+        if threads is not None:
+            simulation_tree = ParamsTree.merge(
+                ParamsTree(
+                    {"kernel": {"nest_params": {"local_num_threads": threads}}}
+                ),
+                simulation_tree,
+            )
+        simulation = Simulation(
+            simulation_tree, input_dir=input_dir, output_dir=output_dir
+        )
+        result["setup_time"] = time.time() - start_time
+        run_start_time = time.time()
+        simulation.run()
+        result["run_time"] = time.time() - run_start_time
+
+    return run_job(
+        run_simulation,
+        {
+            "output_dir": output_dir,
+            "worker": os.getpid(),
+            "init_time": _WORKER.get("init_time"),
+            "wait_time": time.time() - submit_time,
+            "setup_time": None,
+            "run_time": None,
+        },
+        "total_time",
+    )
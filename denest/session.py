@@ -6,10 +6,13 @@
 
 import logging
 import time
+from fnmatch import fnmatch
 from pprint import pformat
 
 from .base_object import ParamObject
-from .utils.misc import pretty_time
+from .io.save import output_path, save_as_yaml
+from .utils import validation
+from .utils.misc import peak_rss, pretty_time
 from .utils.validation import ParameterError
 
 # pylint:disable=missing-docstring
@@ -29,10 +32,15 @@ class Session(ParamObject):
                     (mandatory)
                 - ``reset_network`` (bool): If true, ``nest.ResetNetwork()`` is
                     called during session initialization (default ``False``)
-                - ``record`` (bool): If false, the ``start_time`` field of
-                    recorder nodes in NEST is set to the end time of the
-                    session, so that no data is recorded during the session
-                    (default ``True``)
+                - ``record`` (bool | list[str]): If false, the ``start_time``
+                    field of recorder nodes in NEST is set to the end time of
+                    the session, so that no data is recorded during the
+                    session. If a list of ``fnmatch`` patterns, only the
+                    recorders whose name (eg
+                    ``'spike_detector_l1_l1_exc'``) matches one of the
+                    patterns record data during the session. Recorder nodes
+                    shared across populations are inactivated only if none
+                    of their recorders match. (default ``True``)
                 - ``shift_origin`` (bool): If True, the ``origin`` flag of the
                     stimulation devices of all the network's ``InputLayer``
                     layers is set to the start of the session during
@@ -43,9 +51,40 @@ class Session(ParamObject):
                     Passed to ``Network.set_state``.
                 - ``synapse_changes`` (list): List describing the changes
                     applied to certain synapses before the start of the session.
-                    Passed to ``Network.set_state``. Refer to that
-                    method for a description of how ``synapse_changes`` is
-                    formatted and interpreted. No changes happen if empty.
+                    Passed to ``Network.set_state``. Refer to
+                    ``Network.compile_synapse_changes`` for a description of
+                    how ``synapse_changes`` is formatted and interpreted. No
+                    changes happen if empty. (default [])
+                - ``chunk_size`` (float | None): If not None, the session is
+                    run in consecutive chunks of ``chunk_size`` ms (the last
+                    chunk may be shorter) using ``nest.Prepare``, ``nest.Run``
+                    and ``nest.Cleanup``. Should be a multiple of the kernel's
+                    resolution. Recorders in harvest mode are harvested and
+                    hooks are called after each chunk. (default ``None``)
+                - ``stop_conditions`` (list): List of conditions on the
+                    population rates under which the session is aborted
+                    early. Each condition is a dictionary of the form::
+
+                        {
+                            'layers': <layers_list>,
+                            'populations': <populations_list>,
+                            'above': <rate>,
+                            'below': <rate>,
+                            'duration': <duration>,
+                        }
+
+                    The condition is met if the mean rate (in Hz) of the
+                    populations of interest over the last ``duration`` ms of
+                    the session is strictly above ``above`` or lower than or
+                    equal to ``below``. ``layers`` and ``populations`` are
+                    None (all layers/populations) or lists of names, and
+                    ``above`` and ``below`` are optional. Only populations
+                    recorded by a spike detector are considered, and
+                    conditions can't select populations whose spike detector
+                    is shared with other populations.
+                    Conditions are evaluated by the simulation's
+                    :class:`denest.monitor.RateMonitor` after each chunk, so
+                    they require ``chunk_size`` to stop the session early.
                     (default [])
 
     Keyword Args:
@@ -53,6 +92,8 @@ class Session(ParamObject):
             running.
         input_dir (str): Path to the directory in which input files are searched
             for for each session.
+        resolution (float): Resolution of the kernel in ms. Used to validate
+            the ``chunk_size`` parameter.
     """
 
     # Validation of `params`
@@ -64,9 +105,20 @@ class Session(ParamObject):
         "shift_origin": False,
         "unit_changes": [],
         "synapse_changes": [],
+        "chunk_size": None,
+        "stop_conditions": [],
+    }
+    # Validation of the items of the `stop_conditions` param
+    MANDATORY_STOP_CONDITION_PARAMS = ["duration"]
+    OPTIONAL_STOP_CONDITION_PARAMS = {
+        "layers": None,
+        "populations": None,
+        "above": None,
+        "below": None,
     }
 
-    def __init__(self, name, params, start_time=None, input_dir=None):
+    def __init__(self, name, params, start_time=None, input_dir=None,
+                 resolution=None):
         log.info('Creating session "%s"', name)
         # Sets self.name / self.params  and validates params
         super().__init__(name, params)
@@ -83,6 +135,71 @@ class Session(ParamObject):
                 f"Parameter `simulation_time` of session {name} should be" f" positive."
             )
         self._end = self._start + self._simulation_time
+        self._chunk_size = self.params["chunk_size"]
+        # Number of time steps in a chunk
+        self._chunk_steps = None
+        if self._chunk_size is not None:
+            if resolution is None:
+                import nest
+
+                resolution = nest.GetKernelStatus("resolution")
+            self._chunk_steps = _n_steps(self._chunk_size, resolution)
+            if self._chunk_steps is None or not self._chunk_steps > 0:
+                raise ParameterError(
+                    f"Parameter `chunk_size` of session {name} should be a "
+                    f"strictly positive multiple of the kernel's resolution "
+                    f"({resolution} ms)."
+                )
+        self._resolution = resolution
+        self._stop_conditions = [
+            self._validate_stop_condition(condition)
+            for condition in self.params["stop_conditions"]
+        ]
+        # Reason for which the session was aborted, if it was
+        self._abort_reason = None
+        record = self.params["record"]
+        if not (
+            isinstance(record, bool)
+            or (
+                isinstance(record, (list, tuple))
+                and all(isinstance(pattern, str) for pattern in record)
+            )
+        ):
+            raise ParameterError(
+                f"Parameter `record` of session {name} should be a boolean or "
+                f"a list of recorder name patterns."
+            )
+        # Gids of the recorder nodes inactivated during the session
+        self._inactivated_gids = []
+        # Resolved unit and synapse changes (see `Session.compile`)
+        self._unit_changes_plan = None
+        self._synapse_changes_plan = None
+        self.compile_time = None
+        self.apply_time = None
+        # Performance metrics, set after the session was run
+        self.metrics = None
+        # Real time spent in each phase of the current run
+        self._phase_times = None
+
+    def _validate_stop_condition(self, condition):
+        condition = validation.validate(
+            f"{self.name}: stop condition",
+            dict(condition),
+            param_type="params",
+            mandatory=self.MANDATORY_STOP_CONDITION_PARAMS,
+            optional=self.OPTIONAL_STOP_CONDITION_PARAMS,
+        )
+        if condition["above"] is None and condition["below"] is None:
+            raise ParameterError(
+                f"Stop condition of session {self.name} should specify at "
+                f"least one of the `above` and `below` rates: {condition}"
+            )
+        if not condition["duration"] > 0:
+            raise ParameterError(
+                f"Stop condition of session {self.name} should have a "
+                f"strictly positive `duration`: {condition}"
+            )
+        return condition
 
     @property
     def end(self):
@@ -94,11 +211,84 @@ class Session(ParamObject):
         """Return kernel time at session's start."""
         return self._start
 
+    @property
+    def stop_conditions(self):
+        """Return the list of validated stop conditions."""
+        return self._stop_conditions
+
+    @property
+    def inactivated_gids(self):
+        """Return the gids of the recorder nodes inactivated for the session."""
+        return self._inactivated_gids
+
+    @property
+    def aborted(self):
+        """Whether the session was aborted."""
+        return self._abort_reason is not None
+
+    @property
+    def abort_reason(self):
+        """Return the reason for which the session was aborted, or None."""
+        return self._abort_reason
+
+    def abort(self, reason):
+        """Abort the session after the current chunk.
+
+        Should be called from a hook. The session's end time is then the
+        kernel time at which it was stopped.
+        """
+        if not self.aborted:
+            log.warning("Aborting session '%s': %s", self.name, reason)
+            self._abort_reason = reason
+
+    def shift(self, offset):
+        """Shift the start and end times of a session that wasn't run."""
+        self._start += offset
+        self._end += offset
+
     def __repr__(self):
         return "{classname}({name}, {params})".format(
             classname=type(self).__name__, name=self.name, params=pformat(self.params)
         )
 
+    def compile(self, network, plan=None):
+        """Validate and resolve the session's unit and synapse changes.
+
+        Input arrays are loaded and mapped to the network's units once, so
+        that invalid changes are detected before any session is run. Refer to
+        :meth:`Network.compile_unit_changes` and
+        :meth:`Network.compile_synapse_changes`.
+
+        Args:
+            network (Network): ``Network`` object.
+
+        Keyword Args:
+            plan (tuple | None): Plan compiled by another session with the
+                same parameters. Reused if not None.
+
+        Returns:
+            tuple: The session's ``(<unit_changes_plan>,
+                <synapse_changes_plan>)`` plan.
+        """
+        if plan is not None:
+            self._unit_changes_plan, self._synapse_changes_plan = plan
+            self.compile_time = 0.0
+            return plan
+        start_time = time.time()
+        self._unit_changes_plan = network.compile_unit_changes(
+            self.params["unit_changes"], input_dir=self.input_dir
+        )
+        self._synapse_changes_plan = network.compile_synapse_changes(
+            self.params["synapse_changes"], input_dir=self.input_dir
+        )
+        self.compile_time = time.time() - start_time
+        log.info(
+            "Compiled unit and synapse changes of session '%s' in %.3f s",
+            self.name,
+            self.compile_time,
+        )
+        return self._unit_changes_plan, self._synapse_changes_plan
+
     def initialize(self, network):
         """Initialize session.
 
@@ -106,21 +296,24 @@ class Session(ParamObject):
             2. Inactivate recorders (`record` parameter)
             3. Shift stimulator devices 'origin' flag to start of session
                 (`shift_origin` parameter)
-            4. Change network's dynamic variables by calling the
-                `Network.set_state` function (`unit_changes` and
-                `synapse_changes` parameter)
+            4. Change network's dynamic variables by applying the compiled
+                `unit_changes` and `synapse_changes` (see `Session.compile`).
+                The changes are compiled first if necessary.
 
         Args:
             self (Session): ``Session`` object
             network (Network): ``Network`` object.
         """
+        if self._unit_changes_plan is None:
+            self.compile(network)
+
         # Reset network
         if self.params["reset_network"]:
             self.reset()
 
         # Inactivate all the recorders and projection_recorders for
         # `self._simulation_time`
-        if not self.params["record"]:
+        if self.params["record"] is not True:
             self.inactivate_recorders(network)
 
         # Inactivate all the recorders and projection_recorders for
@@ -129,10 +322,14 @@ class Session(ParamObject):
             self.shift_stimulator_origin(network)
 
         # Change dynamic variables
-        network.set_state(
-            unit_changes=self.params["unit_changes"],
-            synapse_changes=self.params['synapse_changes'],
-            input_dir=self.input_dir,
+        start_time = time.time()
+        network.apply_unit_changes(self._unit_changes_plan)
+        network.apply_synapse_changes(self._synapse_changes_plan)
+        self.apply_time = time.time() - start_time
+        log.info(
+            "Applied unit and synapse changes of session '%s' in %.3f s",
+            self.name,
+            self.apply_time,
         )
 
     @staticmethod
@@ -165,28 +362,66 @@ class Session(ParamObject):
         # Set origin
         nest.SetStatus(stim_gids, {'origin': self.start})
 
+    def recorders_to_inactivate(self, network):
+        """Return the gids of the recorder nodes inactivated by `record`."""
+        record = self.params["record"]
+        if record is True:
+            return []
+        recorders = list(network.get_recorders())
+        if record is False:
+            active = set()
+        else:
+            active = {
+                recorder.gid[0]
+                for recorder in recorders
+                if any(fnmatch(str(recorder), pattern) for pattern in record)
+            }
+        return sorted(
+            {recorder.gid[0] for recorder in recorders} - active
+        )
+
     def inactivate_recorders(self, network):
-        """Set 'start' of all (projection_)recorders at the end of session.
+        """Set 'start' of (projection_)recorders at the end of session.
+
+        The recorders are selected from the `record` parameter. All the
+        recorder nodes are changed with a single ``SetStatus`` call.
 
         Args:
             self (Session): ``Session`` object
             network (Network): ``Network`` object.
         """
+        gids = self.recorders_to_inactivate(network)
+        self._inactivated_gids = gids
+        if not gids:
+            return
+        log.info(
+            "Inactivating %s recorder nodes for session %s", len(gids), self.name
+        )
+        # Set start time in the future
+        self._set_recorders_start(gids, float(self.end))
+
+    def reactivate_recorders(self):
+        """Set 'start' of the inactivated recorders at the end of session.
+
+        Called after the session is aborted, so that the recorders
+        inactivated for the session don't stay inactive during the next
+        sessions.
+        """
+        if self._inactivated_gids:
+            self._set_recorders_start(self._inactivated_gids, float(self.end))
+
+    @staticmethod
+    def _set_recorders_start(gids, start):
+        """Set the 'start' of recorder nodes with a single ``SetStatus`` call."""
+        import nest
+
         # TODO: We need to do this differently if we start playing with the
         # `origin` flag of recorders, eg to repeat experiments. Hence the
         # safeguard:
-        import nest
+        assert all(origin == 0.0 for origin in nest.GetStatus(gids, "origin"))
+        nest.SetStatus(gids, {"start": start})
 
-        for recorder in network.get_recorders():
-            assert nest.GetStatus(recorder.gid, "origin")[0] == 0.0
-        log.debug("Inactivating all recorders for session %s", self.name)
-        # Set start time in the future
-        network._recorder_call(
-            "set_status",
-            {"start": nest.GetKernelStatus("time") + self._simulation_time},
-        )
-
-    def run(self, network):
+    def run(self, network, hooks=None):
         """Initialize and run session.
 
         Session initialization consists in the following steps:
@@ -194,26 +429,51 @@ class Session(ParamObject):
             2. Inactivate recorders (`record` parameter)
             3. Shift stimulator devices 'origin' flag to start of session
                 (`shift_origin` parameter)
-            4. Change network's dynamic variables by calling the
-                `Network.set_state` function (`unit_changes` and
-                `synapse_changes` parameter)
+            4. Change network's dynamic variables by applying the compiled
+                `unit_changes` (see `Session.compile`)
 
         After initialization, the simulation is run for `self.simulation_time`
-        msec
+        msec, possibly in chunks of `chunk_size` msec. After the whole session
+        or after each chunk:
+            1. The events recorded by recorders in harvest mode are appended
+                to their data files (`Network.harvest_recorders`)
+            2. The hooks are called in order.
+        Hooks may abort the session (`Session.abort`), in which case the
+        remaining chunks are not run and the session ends early.
 
         Args:
             self (Session): ``Session`` object
             network (Network): ``Network`` object.
+
+        Keyword Args:
+            hooks (list | None): List of callables called as
+                ``hook(session, network)`` after the session or after each of
+                its chunks.
         """
         import nest
 
+        if hooks is None:
+            hooks = []
         assert self.start == int(nest.GetKernelStatus("time"))
+        self._phase_times = {"simulate": 0.0, "io": 0.0, "hooks": 0.0}
+        n_spikes_before = network.count_recorded_spikes()
+        raw_data_size_before = network.raw_data_size()
         log.info("Initializing session...")
+        start_real_time = time.time()
         self.initialize(network)
+        initialize_time = time.time() - start_real_time
         log.info("Finished initializing session\n")
         log.info("Running session '%s' for %s ms", self.name, self.simulation_time)
         start_real_time = time.time()
-        nest.Simulate(self.simulation_time)
+        if self._chunk_size is None:
+            self._simulate(nest.Simulate, self.simulation_time)
+            self._end_chunk(network, hooks)
+        else:
+            self._run_chunks(network, hooks)
+        if self.aborted:
+            self._end = int(nest.GetKernelStatus("time"))
+            log.info("Session '%s' aborted at %s ms", self.name, self._end)
+            self.reactivate_recorders()
         log.info("Finished running session")
         log.info(
             "Session '%s' virtual running time: %s ms", self.name, self.simulation_time
@@ -224,12 +484,136 @@ class Session(ParamObject):
             pretty_time(start_real_time),
         )
         assert self.end == int(nest.GetKernelStatus("time"))
+        virtual_time = self.end - self.start
+        self.metrics = {
+            "compile_time": self.compile_time,
+            "apply_time": self.apply_time,
+            "initialize_time": initialize_time,
+            "simulate_time": self._phase_times["simulate"],
+            "io_time": self._phase_times["io"],
+            "hooks_time": self._phase_times["hooks"],
+            "run_time": time.time() - start_real_time,
+            "virtual_time": virtual_time,
+            "real_time_factor": (
+                self._phase_times["simulate"] / (virtual_time / 1000.0)
+                if virtual_time else None
+            ),
+            "n_spikes": network.count_recorded_spikes() - n_spikes_before,
+            "bytes_written": network.raw_data_size() - raw_data_size_before,
+            "peak_rss": peak_rss(),
+            "num_connections": nest.GetKernelStatus("num_connections"),
+        }
+        log.info("Session '%s' metrics: %s", self.name, self.metrics)
+
+    def _simulate(self, function, duration):
+        """Call ``nest.Simulate`` or ``nest.Run`` and time it."""
+        start_real_time = time.time()
+        function(duration)
+        self._phase_times["simulate"] += time.time() - start_real_time
+
+    def _run_chunks(self, network, hooks):
+        """Run the session in chunks of `chunk_size` msec."""
+        import nest
+
+        log.info("Running session in chunks of %s ms", self._chunk_size)
+        nest.Prepare()
+        try:
+            self._run_chunk_loop(nest.Run, network, hooks)
+        finally:
+            nest.Cleanup()
+
+    def _run_chunk_loop(self, run, network, hooks):
+        """Run the chunks with ``run`` until the end or an abort."""
+        for i, chunk_time in enumerate(self.chunk_durations()):
+            if self.aborted:
+                break
+            self._simulate(run, chunk_time)
+            log.debug("Session '%s': ran chunk %s", self.name, i + 1)
+            self._end_chunk(network, hooks)
+
+    def chunk_durations(self):
+        """Return the durations (ms) of the chunks in which the session is run.
+
+        The chunks are counted in time steps, so that the durations add up to
+        the session's duration. Returns ``[simulation_time]`` if the
+        ``chunk_size`` parameter is None.
+        """
+        if self._chunk_size is None:
+            return [self.simulation_time]
+        n_steps = round(self.simulation_time / self._resolution)
+        return [
+            self._chunk_size
+            if n_steps - step >= self._chunk_steps
+            else (n_steps - step) * self._resolution
+            for step in range(0, n_steps, self._chunk_steps)
+        ]
+
+    def _end_chunk(self, network, hooks):
+        """Harvest recorders and call hooks after running a chunk."""
+        # Pull the events recorded in memory by harvested recorders
+        start_real_time = time.time()
+        n_harvested = network.harvest_recorders()
+        if n_harvested:
+            log.info("Harvested %s recorded events", n_harvested)
+        self._phase_times["io"] += time.time() - start_real_time
+        start_real_time = time.time()
+        for hook in hooks:
+            hook(self, network)
+        self._phase_times["hooks"] += time.time() - start_real_time
 
-    # TODO
     def save_metadata(self, output_dir):
-        """Save session metadata."""
-        pass
+        """Save session metadata.
+
+        The metadata contains the session's times and, once the session was
+        run, its performance metrics:
+            - ``compile_time``, ``apply_time``: Real time (s) spent compiling
+                and applying the unit and synapse changes (see
+                `Session.compile`).
+            - ``initialize_time``, ``simulate_time``, ``io_time``,
+                ``hooks_time``: Real time (s) spent initializing the session,
+                in NEST's ``Simulate`` or ``Run`` calls, harvesting recorders
+                and running hooks.
+            - ``run_time``: Total real time (s) spent running the session,
+                after initialization.
+            - ``virtual_time``: Duration of the session (ms).
+            - ``real_time_factor``: ``simulate_time`` divided by the virtual
+                time in seconds.
+            - ``n_spikes``: Number of spikes recorded by spike detectors.
+            - ``bytes_written``: Size of the raw data written by recorders.
+            - ``peak_rss``: Peak resident set size of the process (bytes).
+            - ``num_connections``: Number of connections in the network.
+
+        Refer to :func:`denest.io.load.load_session_metadata` to load the
+        metadata of all the sessions as a table.
+        """
+        metadata = {
+            "name": self.name,
+            "start": float(self.start),
+            "end": float(self.end),
+            "simulation_time": self.simulation_time,
+            "chunk_size": self._chunk_size,
+            "aborted": self.aborted,
+        }
+        if self.aborted:
+            metadata["abort_reason"] = self.abort_reason
+        if self.metrics is not None:
+            metadata["metrics"] = {
+                key: (value if value is None else float(value))
+                for key, value in self.metrics.items()
+            }
+        save_as_yaml(output_path(output_dir, "session_metadata", self.name), metadata)
 
     @property
     def simulation_time(self):
         return self._simulation_time
+
+
+def _n_steps(duration, resolution):
+    """Return the number of time steps in a duration, or None.
+
+    Returns None if the duration isn't a multiple of the resolution.
+    """
+    n_steps = round(duration / resolution)
+    if abs(n_steps * resolution - duration) > 1e-9 * max(1.0, abs(duration)):
+        return None
+    return n_steps
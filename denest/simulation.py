@@ -5,8 +5,17 @@
 """Provides the ``Simulation`` class."""
 
 import logging
+import tempfile
+import time
+from pathlib import Path
 
+from .io.checkpoint import load_checkpoint, save_checkpoint
+from .io.catalog import (merge_catalogs, update_file_sizes, update_sessions,
+                         write_catalog)
+from .io.load import metadata_paths
+from .io.partition import partition_by_session
 from .io.save import make_output_dir, output_path, output_subdir, save_as_yaml
+from .monitor import RateMonitor
 from .network import Network
 from .parameters import ParamsTree
 from .session import Session
@@ -39,6 +48,28 @@ class Simulation(object):
                       should be the name of session models defined in the
                       ``session_models`` parameter subtree. (Default:
                       ``[]``)
+                    ``partition_sessions`` (bool)
+                      If true, the recorders' output is split by session
+                      after the simulation is run. See
+                      :meth:`Simulation.partition_output`. (Default:
+                      ``False``)
+                    ``monitor_rates`` (bool)
+                      If true, the firing rate of each population recorded
+                      by a spike detector is computed after each session or
+                      session chunk and saved in the output directory. See
+                      :class:`denest.monitor.RateMonitor`. (Default:
+                      ``False``). The monitor is always used if some
+                      sessions have stop conditions.
+                    ``on_abort`` (str)
+                      What to do after a session is aborted by one of its
+                      stop conditions. If ``'stop'``, the remaining sessions
+                      are skipped. If ``'continue'``, the remaining sessions
+                      are run, starting at the end of the aborted session.
+                      (Default: ``'stop'``)
+                    ``checkpoint`` (bool)
+                      If true, a checkpoint is saved in the ``checkpoint``
+                      subdirectory of the output directory after each session.
+                      See :meth:`Simulation.checkpoint`. (Default: ``False``)
             ``kernel`` (:class:`ParamsTree`)
                 Used for NEST kernel initialization. Refer to
                 :meth:`Simulation.init_kernel` for a description of kernel
@@ -70,6 +101,10 @@ class Simulation(object):
         "sessions": [],
         "input_dir": "input",
         "output_dir": "output",
+        "partition_sessions": False,
+        "monitor_rates": False,
+        "on_abort": "stop",
+        "checkpoint": False,
     }
 
     def __init__(self, tree=None, input_dir=None, output_dir=None):
@@ -144,9 +179,24 @@ class Simulation(object):
             self.tree.children['simulation'].params['input_dir'] \
                 = str(input_dir)
         self.input_dir = self.sim_params["input_dir"]
+        if self.sim_params["on_abort"] not in ["stop", "continue"]:
+            raise validation.ParameterError(
+                "The `on_abort` simulation parameter should be 'stop' or "
+                "'continue'."
+            )
+
+        # Choose the number of threads (before initializing the kernel)
+        self.autotune_results = None
+        if self.tree.children['kernel'].params.get('autotune_threads'):
+            self.autotune(
+                self.tree.children['kernel'], self.tree.children['network']
+            )
 
         # Initialize kernel (should be after getting output dirs)
         self.init_kernel(self.tree.children['kernel'])
+        # Rank of this process in MPI simulations, where each process saves
+        # its own catalog shard. None otherwise.
+        self._catalog_rank = self._mpi_rank()
 
         # Create session models
         self.session_models = None
@@ -161,20 +211,62 @@ class Simulation(object):
         self.network = None
         self.create_network(self.tree.children["network"])
 
+        # Callables run after each session or session chunk
+        self.hooks = []
+        self.rate_monitor = None
+
+        # Compile sessions, save metadata and initialize sessions' status
+        self._prepare_run()
+
+    def _prepare_run(self):
+        """Prepare running the sessions once the network is created.
+
+        - Compile the sessions (see :meth:`compile_sessions`)
+        - Save simulation metadata, clearing the output directory
+        - Set up the rate monitor
+        - Initialize the sessions' status
+        """
+        # Resolve the sessions' unit changes before running anything
+        self.compile_sessions()
+
         # Save simulation metadata
         self.save_metadata(clear_output_dir=True)
 
+        # Monitor population rates (after the output directory is cleared)
+        if self.rate_monitor is not None:
+            self.hooks.remove(self.rate_monitor)
+            self.rate_monitor = None
+        if self.sim_params["monitor_rates"] or any(
+            session.stop_conditions for session in self.sessions
+        ):
+            self.rate_monitor = RateMonitor(self.network, self.output_dir)
+            self.rate_monitor.validate_stop_conditions(
+                self.sessions, self.network
+            )
+            self.add_hook(self.rate_monitor)
+        # Status of each session: 'pending', 'completed', 'aborted' or
+        # 'skipped'
+        self.session_status = {
+            session.name: {"status": "pending"} for session in self.sessions
+        }
+        # Index of the first session run by this object and of the next
+        # session to run. Both are non-zero for resumed simulations.
+        self._first_session = 0
+        self._next_session = 0
+        # Whether the remaining sessions are skipped after an aborted session
+        self._stopped = False
+        # Virtual time elapsed before the kernel's time origin, for resumed
+        # simulations
+        self.time_offset = 0.0
+
     def _update_tree_child(self, child_name, tree):
         """Add a child to ``self.tree``"""
         # Convert to ParamsTree and specify parent tree to preserve inheritance
         if not isinstance(tree, ParamsTree):
             child_tree = ParamsTree(tree, parent=self.tree, name=child_name)
         else:
-            child_tree = ParamsTree(
-                tree.asdict(),
-                parent=self.tree,
-                name=child_name
-            )
+            # The copy shares the tree's data until either is modified
+            child_tree = tree.copy(parent=self.tree, name=child_name)
         # Add as child
         self.tree.children[child_name] = child_tree
 
@@ -199,16 +291,26 @@ class Simulation(object):
         - Save deNEST git hash
         - Save sessions metadata (:meth:`Session.save_metadata`)
         - Save session times (start and end kernel time for each session)
+        - Save the thread benchmark, if any (:meth:`autotune`)
         - Save network metadata (:meth:`Network.save_metadata`)
+        - Save the output catalog (:func:`denest.io.catalog.write_catalog`),
+          or the catalog shard of this process in MPI simulations
 
         Keyword Args:
             clear_output_dir (bool): If true, delete the contents of the
-                output directory.
+                output directory. In MPI simulations, the first process clears
+                the directory before any process saves metadata.
         """
         log.info("Saving simulation metadata...")
         # Initialize output dir (create and clear)
         log.info("Creating output directory: %s", self.output_dir)
-        make_output_dir(self.output_dir, clear_output_dir=clear_output_dir)
+        make_output_dir(
+            self.output_dir,
+            clear_output_dir=clear_output_dir and not self._catalog_rank,
+        )
+        # Don't let other processes write files that are then deleted
+        if clear_output_dir and self._catalog_rank is not None:
+            self._mpi_barrier()
         # Save params tree
         self.tree.write(output_path(self.output_dir, "tree"))
         # Drop version information
@@ -218,23 +320,328 @@ class Simulation(object):
             session.save_metadata(self.output_dir)
         # Save session times
         save_as_yaml(output_path(self.output_dir, "session_times"), self.session_times)
+        # Save the benchmark of the number of threads
+        if self.autotune_results is not None:
+            save_as_yaml(
+                output_path(self.output_dir, "autotune"), self.autotune_results
+            )
         # Save network metadata
-        self.network.save_metadata(self.output_dir)
+        recorders_metadata = self.network.save_metadata(self.output_dir)
+        # Save catalog of recorders, files and sessions. In MPI simulations,
+        # each process saves a shard listing the files it writes.
+        if self._catalog_rank is None:
+            write_catalog(self.output_dir, recorders_metadata, self.session_times)
+        else:
+            write_catalog(
+                self.output_dir,
+                recorders_metadata,
+                self.session_times,
+                rank=self._catalog_rank,
+                local_filenames=self.network.local_raw_data_filenames(
+                    self.output_dir
+                ),
+            )
         log.info("Finished saving simulation metadata")
 
     def run(self):
         """Run simulation.
 
         Run sessions in the order specified by the ``'sessions'`` simulation
-        parameter.
+        parameter, calling the hooks registered with :meth:`add_hook` after
+        each session or session chunk. After a session is aborted by one of
+        its stop conditions, the remaining sessions are skipped or run
+        earlier depending on the ``'on_abort'`` simulation parameter, and the
+        session times and status are saved (see :meth:`save_session_status`).
+        If the ``'partition_sessions'`` simulation parameter is true, the
+        recorders' output is then split by session.
+
+        In MPI simulations, the processes are synchronized once all sessions
+        are run. The first process then merges the catalog shards and
+        partitions the output, and the other processes return.
         """
-        # Get list of recorders
-        log.info("Running %s sessions...", len(self.sessions))
-        for session in self.sessions:
+        log.info(
+            "Running %s sessions...", len(self.sessions) - self._next_session
+        )
+        self._run_sessions()
+        log.info("Finished running simulation")
+        self.save_session_status()
+        if self.rate_monitor is not None:
+            log.info(
+                "Rate monitor overhead: %.3f s over %s calls",
+                self.rate_monitor.overhead,
+                self.rate_monitor.n_calls,
+            )
+        rank = self._mpi_rank()
+        if rank is not None:
+            # Wait until all MPI processes are done writing their data and
+            # catalog shard. The shared output files are then only modified
+            # by the first process.
+            self._mpi_barrier()
+            if rank != 0:
+                return
+            if self._catalog_rank is not None:
+                merge_catalogs(self.output_dir)
+                self._catalog_rank = None
+        if self.sim_params["partition_sessions"]:
+            self.partition_output()
+        # Record the size of the data files in the catalog
+        update_file_sizes(self.output_dir)
+
+    def _run_sessions(self):
+        """Run the remaining sessions and set their status.
+
+        The sessions following an aborted session are skipped if the
+        ``'on_abort'`` simulation parameter is ``'stop'``. Otherwise they are
+        shifted so that they start at the end of the previous session.
+        """
+        # Shift of the sessions' times following aborted sessions
+        offset = 0
+        for session in self.sessions[self._next_session:]:
+            self._next_session += 1
+            if self._stopped:
+                log.info("Skipping session '%s'", session.name)
+                self.session_status[session.name] = {"status": "skipped"}
+                continue
+            if offset:
+                session.shift(offset)
+            planned_end = session.end
             log.info("Running session: '%s'...", session.name)
-            session.run(self.network)
+            session.run(self.network, hooks=self.hooks)
+            session.save_metadata(self.output_dir)
             log.info("Done running session '%s'", session.name)
-        log.info("Finished running simulation")
+            if session.aborted:
+                self.session_status[session.name] = {
+                    "status": "aborted",
+                    "reason": session.abort_reason,
+                }
+                offset += session.end - planned_end
+                self._stopped = self.sim_params["on_abort"] == "stop"
+            else:
+                self.session_status[session.name] = {"status": "completed"}
+            if self.sim_params["checkpoint"]:
+                self.checkpoint(output_subdir(self.output_dir, "checkpoint"))
+
+    def save_session_status(self):
+        """Save the sessions' status and update the session times.
+
+        The status of each session is saved in a separate file. If sessions
+        were aborted or skipped, the session times are updated so that they
+        only contain the sessions that were run, with their actual start and
+        end times. The session times of resumed simulations only contain the
+        sessions run after resuming.
+        """
+        save_as_yaml(
+            output_path(self.output_dir, "session_status"), self.session_status
+        )
+        session_times = {
+            session.name: (session.start, session.end)
+            for session in self.sessions[self._first_session:]
+            if self.session_status[session.name]["status"] != "skipped"
+        }
+        if session_times != self.session_times:
+            self.session_times = session_times
+            save_as_yaml(
+                output_path(self.output_dir, "session_times"), self.session_times
+            )
+            update_sessions(
+                self.output_dir, self.session_times, rank=self._catalog_rank
+            )
+
+    def checkpoint(self, path):
+        """Save a checkpoint from which the simulation can be resumed.
+
+        Should be called between sessions. The checkpoint contains the
+        parameter tree, the kernel time, the index of the next session, the
+        sessions' status and the dynamic state of the network (see
+        :meth:`Network.get_state`). Refer to :mod:`denest.io.checkpoint`.
+
+        Args:
+            path (str or Path): Checkpoint directory. Any previous checkpoint
+                in this directory is replaced.
+        """
+        import nest
+
+        kernel_time = nest.GetKernelStatus("time")
+        info = {
+            "time": kernel_time,
+            "time_offset": self.time_offset + kernel_time,
+            "next_session": self._next_session,
+            "sessions": [session.name for session in self.sessions],
+            "session_status": self.session_status,
+            "stopped": self._stopped,
+        }
+        log.info(
+            "Saving checkpoint before session %s at %s", self._next_session, path
+        )
+        save_checkpoint(path, self.tree, info, self.network.get_state())
+
+    @classmethod
+    def resume(cls, path, input_dir=None, output_dir=None):
+        """Rebuild a simulation from a checkpoint.
+
+        The network is rebuilt and created from the checkpoint's parameter
+        tree, its dynamic state is restored, and :meth:`run` then runs the
+        sessions following the checkpoint.
+
+        The NEST kernel's time can't be set to the time of the checkpoint, so
+        the resumed sessions start at kernel time 0. The virtual time elapsed
+        before the checkpoint is saved as ``time_offset`` in the ``resume``
+        output file, and should be added to the times in the resumed
+        simulation's output. The kernel's random number generators are
+        reseeded rather than restored.
+
+        Args:
+            path (str or Path): Checkpoint directory.
+
+        Keyword Args:
+            input_dir, output_dir (str | None): Passed to :class:`Simulation`.
+                The output directory is cleared when the simulation is
+                built, so it should be a new directory, to preserve the output
+                of the sessions run before the checkpoint.
+
+        Returns:
+            Simulation: The resumed simulation.
+
+        Raises:
+            ValueError: If the output directory contains files other than the
+                checkpoint's.
+        """
+        tree_path, info, state = load_checkpoint(path)
+        log.info("Resuming simulation from checkpoint at %s", path)
+        tree = ParamsTree.read(tree_path)
+        if output_dir is None:
+            output_dir = tree.children["simulation"].params.get(
+                "output_dir", cls.OPTIONAL_SIM_PARAMS["output_dir"]
+            )
+        _check_resume_output_dir(output_dir, path)
+        simulation = cls(tree, input_dir=input_dir, output_dir=output_dir)
+        simulation.restore(info, state, checkpoint_path=path)
+        return simulation
+
+    def restore(self, info, state, checkpoint_path=None):
+        """Restore the state saved in a checkpoint. See :meth:`resume`."""
+        if info["sessions"] != [session.name for session in self.sessions]:
+            raise ValueError(
+                "Can't restore checkpoint: the sessions differ from the "
+                "checkpoint's sessions."
+            )
+        self.network.restore_state(state)
+        self._first_session = self._next_session = info["next_session"]
+        self._stopped = info["stopped"]
+        self.time_offset = info["time_offset"]
+        self.session_status.update(info["session_status"])
+        # Resumed sessions start at the kernel's current time
+        remaining = self.sessions[self._next_session:]
+        if remaining:
+            offset = -remaining[0].start
+            for session in remaining:
+                session.shift(offset)
+        self.session_times = {
+            session.name: (session.start, session.end) for session in remaining
+        }
+        save_as_yaml(output_path(self.output_dir, "session_times"), self.session_times)
+        update_sessions(
+            self.output_dir, self.session_times, rank=self._catalog_rank
+        )
+        save_as_yaml(
+            output_path(self.output_dir, "resume"),
+            {
+                "checkpoint": str(checkpoint_path),
+                "next_session": self._next_session,
+                "time_offset": self.time_offset,
+            },
+        )
+
+    def fork_replica(self, output_dir, sessions=None, session_models=None,
+                     nest_seed=None):
+        """Prepare this simulation to run a new session plan.
+
+        Meant to be called in a child process forked after the network was
+        created (see :func:`denest.sweep.fork_sweep`), so that the network
+        doesn't need to be created again. The output directory, the
+        kernel's ``data_path`` and seeds, the session models and the
+        sessions are replaced, and the sessions are compiled. The simulation
+        can then be run with :meth:`run`.
+
+        Args:
+            output_dir (str): New output directory. Cleared.
+
+        Keyword Args:
+            sessions (list[str] | None): Order in which the session models
+                are run. The current order if None.
+            session_models (tree-like | None): Overrides merged onto the
+                ``session_models`` tree.
+            nest_seed (int | None): New ``nest_seed`` kernel parameter. The
+                current seed is kept if None.
+
+        Raises:
+            ValueError: If some sessions were already run.
+        """
+        if self._next_session:
+            raise ValueError(
+                "Can't fork a replica of a simulation that already ran "
+                "sessions."
+            )
+        self.sim_params["output_dir"] = output_dir
+        self.tree.children["simulation"].params["output_dir"] = str(output_dir)
+        self.output_dir = output_dir
+        if nest_seed is None:
+            nest_seed = self.tree.children["kernel"].params.get("nest_seed", 1)
+        self.tree.children["kernel"].params["nest_seed"] = nest_seed
+        self._set_data_path_and_seeds(nest_seed)
+        if session_models is not None:
+            if not isinstance(session_models, ParamsTree):
+                session_models = ParamsTree(session_models)
+            self.build_session_models(
+                ParamsTree.merge(
+                    session_models, self.tree.children["session_models"]
+                )
+            )
+        if sessions is None:
+            sessions = self.sim_params["sessions"]
+        self.sim_params["sessions"] = sessions
+        self.build_sessions(sessions)
+        self._prepare_run()
+
+    def add_hook(self, hook):
+        """Register a callable run after each session or session chunk.
+
+        Hooks are called in the order in which they were added, as
+        ``hook(session, network)``, after the events of the recorders in
+        harvest mode were harvested. Refer to :meth:`Session.run`.
+        """
+        self.hooks.append(hook)
+
+    def partition_output(self):
+        """Split the recorders' output into one partition per session.
+
+        Refer to :func:`denest.io.partition.partition_by_session`.
+        """
+        log.info("Partitioning recorder output by session...")
+        # Shared recorder nodes are partitioned once
+        partitioned = {}
+        for metadata_path in metadata_paths(self.output_dir):
+            partition_by_session(
+                metadata_path, self.session_times, partitioned=partitioned
+            )
+        log.info("Finished partitioning recorder output by session")
+
+    def compile_sessions(self):
+        """Compile the unit and synapse changes of all sessions.
+
+        See :meth:`Session.compile`.
+
+        Sessions of the same session model share a single plan.
+        """
+        log.info("Compiling sessions...")
+        plans = {}
+        for session_model, session in zip(
+            self.tree.children['simulation'].params['sessions'], self.sessions
+        ):
+            plans[session_model] = session.compile(
+                self.network, plan=plans.get(session_model)
+            )
+        log.info("Finished compiling sessions")
 
     def build_sessions(self, sessions_order):
         """Build a list of sessions.
@@ -251,6 +658,7 @@ class Simulation(object):
         # Create session objects
         self.sessions = []
         session_start_time = nest.GetKernelStatus('time')
+        resolution = nest.GetKernelStatus('resolution')
         for i, session_model in enumerate(sessions_order):
             self.sessions.append(
                 Session(
@@ -258,6 +666,7 @@ class Simulation(object):
                     dict(self.session_models[session_model].params),
                     start_time=session_start_time,
                     input_dir=self.input_dir,
+                    resolution=resolution,
                 )
             )
             # start of next session = end of current session
@@ -278,7 +687,9 @@ class Simulation(object):
         session_model_nodes = {
             session_name: session_node
             for session_name, session_node
-            in self.tree.children['session_models'].named_leaves(root=False)
+            in self.tree.children['session_models'].named_leaves(
+                root=False, unique=True
+            )
         }
         # Validate session_model nodes: no nest_params
         for name, node in session_model_nodes.items():
@@ -309,6 +720,14 @@ class Simulation(object):
                         List of modules to install. (Default: ``[]``)
                     ``nest_seed``: (int)
                         Used to set NEST kernel's RNG seed. (Default: ``1``)
+                    ``autotune_threads``: (list(int) | None)
+                        If not None, the ``local_num_threads`` NEST
+                        parameter is chosen among these values by
+                        benchmarking the network. See
+                        :meth:`Simulation.autotune`. (Default: ``None``)
+                    ``autotune_time``: (float)
+                        Duration (ms) of the benchmark simulations.
+                        (Default: ``100.0``)
                 NEST parameters (``nest_params`` field) are passed to
                 ``nest.SetKernelStatus``. The following nest parameters are
                 reserved: ``[data_path, 'grng_seed', 'rng_seed']``. The NEST
@@ -317,17 +736,52 @@ class Simulation(object):
         """
         import nest
 
+        # Add to Simulation.tree
+        self._update_tree_child('kernel', kernel_tree)
+        kernel_tree = self.tree.children["kernel"]
+
+        params, nest_params = self._validate_kernel_tree(kernel_tree)
+
+        log.info("Initializing NEST kernel and seeds...")
+        log.info("  Resetting NEST kernel...")
+        nest.ResetKernel()
+
+        log.info("  Setting NEST kernel status...")
+        log.info("    Calling `nest.SetKernelStatus(%s)`", nest_params)
+        nest.SetKernelStatus(nest_params)
+        # Set data path and seed. Do that after after first SetKernelStatus
+        # call in case total_num_virtual_procs has changed
+        self._set_data_path_and_seeds(params["nest_seed"])
+        log.info("  Finished setting NEST kernel status")
+
+        # Install extension modules
+        log.info("  Installing external modules...")
+        for module in params["extension_modules"]:
+            self.install_module(module)
+        log.info("  Finished installing external modules")
+
+        log.info("Finished initializing kernel")
+
+    @staticmethod
+    def _validate_kernel_tree(kernel_tree):
+        """Validate the "kernel" parameter tree (see :meth:`init_kernel`).
+
+        Returns:
+            tuple: The validated ``params`` (with defaults) and
+                ``nest_params``.
+
+        Raises:
+            ParameterError: If the tree is invalid.
+        """
         MANDATORY_PARAMS = []
         OPTIONAL_PARAMS = {
             "extension_modules": [],
             "nest_seed": 1,
+            "autotune_threads": None,
+            "autotune_time": 100.0,
         }
         RESERVED_NEST_PARAMS = ["data_path", "msd", "grng_seed", "rng_seed"]
 
-        # Add to Simulation.tree
-        self._update_tree_child('kernel', kernel_tree)
-        kernel_tree = self.tree.children["kernel"]
-
         # Validate "kernel" subtree
         validation.validate_children(
             kernel_tree, mandatory_children=[], optional_children=[]
@@ -346,20 +800,130 @@ class Simulation(object):
             param_type="nest_params",
             reserved=RESERVED_NEST_PARAMS,
         )
+        thread_counts = params["autotune_threads"]
+        if thread_counts is not None and (
+            isinstance(thread_counts, (str, int))
+            or not thread_counts
+            or not all(
+                isinstance(n, int) and not isinstance(n, bool) and n > 0
+                for n in thread_counts
+            )
+        ):
+            raise validation.ParameterError(
+                "The `autotune_threads` kernel parameter should be a list of "
+                f"positive numbers of threads (got {thread_counts})"
+            )
+        return params, nest_params
+
+    def autotune(self, kernel_tree, network_tree):
+        """Choose the number of threads by benchmarking the network.
+
+        For each number of threads in the ``autotune_threads`` kernel
+        parameter, the kernel is reset, the network is created and simulated
+        for ``autotune_time`` ms, with output in a temporary directory. The
+        ``local_num_threads`` NEST kernel parameter is then set to the
+        fastest number of threads in ``kernel_tree``, and ``autotune_threads``
+        is unset, so that the saved parameter tree rebuilds the same
+        configuration (and seeds, which depend on the number of virtual
+        processes) without benchmarking again. The measured times are saved
+        in the ``autotune`` output file.
+
+        In MPI simulations, all the processes run the benchmark (NEST's
+        simulations are collective) but the number of threads is chosen from
+        the times measured by the first process, which are broadcast to the
+        other processes with ``mpi4py`` so that they all use the same
+        configuration.
+
+        Args:
+            kernel_tree (ParamsTree): "kernel" parameter tree. Modified.
+            network_tree (ParamsTree): "network" parameter tree.
+
+        Raises:
+            ParameterError: If the kernel tree is invalid (checked before
+                benchmarking), or in MPI simulations, if ``mpi4py`` isn't
+                installed.
+        """
+        params, _ = self._validate_kernel_tree(kernel_tree)
+        rank = self._mpi_rank()
+        if rank is not None and not _has_mpi4py():
+            raise validation.ParameterError(
+                "The `autotune_threads` kernel parameter requires `mpi4py` in "
+                "MPI simulations."
+            )
+        thread_counts = params["autotune_threads"]
+        duration = float(params["autotune_time"])
+        log.info(
+            "Benchmarking %s ms of simulation with %s threads...",
+            duration,
+            thread_counts,
+        )
+        with tempfile.TemporaryDirectory() as data_path:
+            curve = [
+                self._benchmark(
+                    kernel_tree, network_tree, n_threads, duration, data_path
+                )
+                for n_threads in thread_counts
+            ]
+        if rank is not None:
+            curve = self._mpi_broadcast(curve)
+        best = min(curve, key=lambda point: point["simulate_time"])
+        log.info("Using %s threads", best["local_num_threads"])
+        kernel_tree.nest_params["local_num_threads"] = best["local_num_threads"]
+        kernel_tree.params["autotune_threads"] = None
+        self.autotune_results = {
+            "autotune_time": duration,
+            "local_num_threads": best["local_num_threads"],
+            "total_num_virtual_procs": best["total_num_virtual_procs"],
+            "curve": curve,
+        }
+
+    def _benchmark(self, kernel_tree, network_tree, n_threads, duration,
+                   data_path):
+        """Create and simulate the network with a number of threads.
+
+        Returns:
+            dict: The number of threads and virtual processes, and the real
+                time spent creating and simulating the network.
+        """
+        import nest
 
-        log.info("Initializing NEST kernel and seeds...")
-        log.info("  Resetting NEST kernel...")
         nest.ResetKernel()
+        nest.SetKernelStatus(
+            {
+                **dict(kernel_tree.nest_params),
+                "local_num_threads": n_threads,
+                "data_path": data_path,
+            }
+        )
+        for module in kernel_tree.params.get("extension_modules", []):
+            self.install_module(module)
+        start_time = time.time()
+        Network(network_tree).create()
+        create_time = time.time() - start_time
+        start_time = time.time()
+        nest.Simulate(duration)
+        simulate_time = time.time() - start_time
+        log.info(
+            "  %s threads: created in %.3f s, simulated in %.3f s",
+            n_threads,
+            create_time,
+            simulate_time,
+        )
+        return {
+            "local_num_threads": n_threads,
+            "total_num_virtual_procs": nest.GetKernelStatus(
+                "total_num_virtual_procs"
+            ),
+            "create_time": create_time,
+            "simulate_time": simulate_time,
+        }
+
+    def _set_data_path_and_seeds(self, msd):
+        """Set the kernel's ``data_path`` and seed its random generators."""
+        import nest
 
-        log.info("  Setting NEST kernel status...")
-        log.info("    Calling `nest.SetKernelStatus(%s)`", nest_params)
-        nest.SetKernelStatus(nest_params)
-        # Set data path:
         data_path = output_subdir(self.output_dir, "raw_data", create_dir=True)
-        # Set seed. Do that after after first SetKernelStatus call in case
-        # total_num_virtual_procs has changed
         n_vp = nest.GetKernelStatus(["total_num_virtual_procs"])[0]
-        msd = params["nest_seed"]
         kernel_params = {
             "data_path": str(data_path),
             "grng_seed": msd + n_vp,
@@ -367,19 +931,42 @@ class Simulation(object):
         }
         log.info("    Calling `nest.SetKernelStatus(%s)", kernel_params)
         nest.SetKernelStatus(kernel_params)
-        log.info("  Finished setting NEST kernel status")
 
-        # Install extension modules
-        log.info("  Installing external modules...")
-        for module in params["extension_modules"]:
-            self.install_module(module)
-        log.info("  Finished installing external modules")
+    @staticmethod
+    def _mpi_rank():
+        """Return the rank of this MPI process, or None without MPI."""
+        import nest
 
-        log.info("Finished initializing kernel")
+        if nest.NumProcesses() == 1:
+            return None
+        return nest.Rank()
+
+    @staticmethod
+    def _mpi_barrier():
+        """Wait until all MPI processes reach this point.
+
+        Uses ``mpi4py`` if it is installed, and NEST's ``SyncProcesses``
+        otherwise.
+        """
+        try:
+            from mpi4py import MPI
+        except ImportError:
+            import nest
+
+            nest.sr("SyncProcesses")
+        else:
+            MPI.COMM_WORLD.Barrier()
+
+    @staticmethod
+    def _mpi_broadcast(obj):
+        """Return the object of the first MPI process, using ``mpi4py``."""
+        from mpi4py import MPI
+
+        return MPI.COMM_WORLD.bcast(obj, root=0)
 
     def total_time(self):
         """Return the total duration of all sessions."""
-        return self.sessions[-1].end - self.sessions[0].start
+        return self.sessions[-1].end - self.sessions[self._first_session].start
 
     @staticmethod
     def install_module(module_name):
@@ -416,3 +1003,33 @@ class Simulation(object):
     def _make_session_name(name, index):
         """Return a formatted session name comprising the session index."""
         return str(index).zfill(2) + "_" + name
+
+
+def _check_resume_output_dir(output_dir, checkpoint_path):
+    """Refuse to resume a simulation into an output directory with data.
+
+    Raises:
+        ValueError: If ``output_dir`` contains files that are not in the
+            checkpoint directory.
+    """
+    checkpoint_path = Path(checkpoint_path).resolve()
+    output_dir = Path(output_dir)
+    if not output_dir.is_dir():
+        return
+    for path in output_dir.resolve().rglob("*"):
+        if path.is_file() and checkpoint_path not in path.parents:
+            raise ValueError(
+                f"Can't resume the simulation into {output_dir}: the output "
+                f"directory contains the output of the sessions run before "
+                f"the checkpoint, which would be deleted. Use a new output "
+                f"directory."
+            )
+
+
+def _has_mpi4py():
+    """Return whether ``mpi4py`` can be imported."""
+    try:
+        import mpi4py  # pylint: disable=unused-import
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# sweep.py
+
+"""Run parameter sweeps in pools of worker processes."""
+
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+
+import pandas as pd
+from tqdm import tqdm
+
+from .utils.misc import default_n_workers, run_job
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+SUMMARY_FILENAME = "sweep_summary.tsv"
+
+# Simulation replicated by a process forked by `fork_sweep`, set by
+# `_init_replica`
+_REPLICA = {}
+
+
+def sweep(path, overrides_list, n_workers=None, threads_per_worker=None,
+          output_dir="sweep", input_dir=None, cache=False, cache_dir=None):
+    """Run a simulation for each point of a parameter sweep.
+
+    Each point is run with :func:`denest.run` in its own worker process, and
+    saved in its own output directory (``<output_dir>/<point_index>``).
+    Workers are started with the ``spawn`` method and run a single point each,
+    so that every simulation gets a fresh NEST kernel.
+
+    The ``local_num_threads`` NEST kernel parameter of each point is set to
+    ``threads_per_worker``, and takes precedence over the point's overrides.
+    If unspecified, ``n_workers`` and ``threads_per_worker`` are chosen so
+    that ``n_workers * threads_per_worker`` doesn't exceed the number of
+    CPUs.
+
+    A summary table with the status, error and timing of each point is saved
+    in ``<output_dir>/sweep_summary.tsv``.
+
+    Args:
+        path (str): The filepath of a parameter file specifying the simulation.
+        overrides_list (list[tree-like]): Override tree of each point of the
+            sweep. Passed to :func:`denest.run`.
+
+    Keyword Args:
+        n_workers (int | None): Number of worker processes.
+        threads_per_worker (int | None): Number of NEST threads per worker.
+        output_dir (str): Directory containing the output of each point.
+        input_dir (str | None): Passed to :func:`denest.run`.
+        cache (bool): Passed to :func:`denest.run`. Points that are already
+            complete are skipped (``'cached'`` status).
+        cache_dir (str | None): Passed to :func:`denest.run`.
+
+    Returns:
+        pd.DataFrame: The summary table, indexed by point.
+    """
+    n_cpus = os.cpu_count() or 1
+    if n_workers is None:
+        n_workers = default_n_workers(threads_per_worker)
+    if threads_per_worker is None:
+        threads_per_worker = max(1, n_cpus // n_workers)
+    if n_workers * threads_per_worker > n_cpus:
+        log.warning(
+            "Sweep uses %s workers x %s threads on %s CPUs",
+            n_workers,
+            threads_per_worker,
+            n_cpus,
+        )
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_digits = len(str(max(len(overrides_list) - 1, 0)))
+    jobs = [
+        (
+            i,
+            str(path),
+            overrides,
+            str(output_dir / str(i).zfill(n_digits)),
+            input_dir,
+            threads_per_worker,
+            cache,
+            cache_dir,
+        )
+        for i, overrides in enumerate(overrides_list)
+    ]
+    log.info(
+        "Running sweep of %s points with %s workers x %s threads",
+        len(jobs),
+        n_workers,
+        threads_per_worker,
+    )
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(n_workers, maxtasksperchild=1) as pool:
+        for result in tqdm(
+            pool.imap_unordered(_run_point, jobs), total=len(jobs), desc="Sweep"
+        ):
+            if result["status"] == "failed":
+                log.error("Sweep point %s failed: %s", result["point"], result["error"])
+            results.append(result)
+    return _save_summary(results, output_dir)
+
+
+def fork_sweep(simulation, plans, n_workers=None, output_dir="sweep"):
+    """Run session plans in processes forked from a created simulation.
+
+    The network of ``simulation`` is created only once. A child process is
+    then forked for each plan, which inherits the parent's NEST kernel (and
+    created network) copy-on-write. Each child runs its plan with
+    :meth:`Simulation.fork_replica` and :meth:`Simulation.run`, and saves
+    its output in its own output directory (``<output_dir>/<plan_index>``).
+    Children only see the parent's state at the time they are forked, so
+    ``simulation`` should not have run any session.
+
+    Forking is only supported on POSIX systems. NEST's OpenMP threads don't
+    survive a fork, so the parent simulation must use a single thread
+    (``local_num_threads`` NEST kernel parameter).
+
+    Each plan is a dictionary with the following optional keys:
+        ``sessions`` (list[str])
+            Order in which the session models are run. (Default: the
+            parent's order)
+        ``session_models`` (tree-like)
+            Overrides merged onto the parent's session models tree, eg to
+            change the ``unit_changes`` or inputs of the sessions.
+        ``nest_seed`` (int)
+            NEST seed of the replica. (Default: the parent's
+            ``nest_seed`` + 1 + the plan's index, so that replicas are
+            independent)
+
+    A summary table with the status, error and timing of each plan is saved
+    in ``<output_dir>/sweep_summary.tsv``.
+
+    Args:
+        simulation (Simulation): A simulation whose network is created.
+        plans (list[dict]): Session plan run by each replica.
+
+    Keyword Args:
+        n_workers (int | None): Maximum number of replicas running at the
+            same time. Defaults to the number of CPUs.
+        output_dir (str): Directory containing the output of each replica.
+
+    Returns:
+        pd.DataFrame: The summary table, indexed by plan.
+
+    Raises:
+        ValueError: If the simulation uses more than one thread.
+    """
+    import nest
+
+    threads = nest.GetKernelStatus("local_num_threads")
+    if threads > 1:
+        raise ValueError(
+            f"Can't fork a simulation that uses {threads} threads: NEST's "
+            f"threads don't survive a fork. Set the `local_num_threads` "
+            f"kernel parameter to 1."
+        )
+    if n_workers is None:
+        n_workers = default_n_workers()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_digits = len(str(max(len(plans) - 1, 0)))
+    seed = simulation.tree.children["kernel"].params.get("nest_seed", 1)
+    jobs = [
+        (
+            i,
+            str(output_dir / str(i).zfill(n_digits)),
+            plan.get("sessions"),
+            plan.get("session_models"),
+            plan.get("nest_seed", seed + 1 + i),
+        )
+        for i, plan in enumerate(plans)
+    ]
+    log.info(
+        "Running %s replicas of simulation with %s workers", len(jobs), n_workers
+    )
+    results = []
+    context = multiprocessing.get_context("fork")
+    # The simulation is inherited by the forked workers rather than pickled
+    with context.Pool(
+        n_workers,
+        initializer=_init_replica,
+        initargs=(simulation,),
+        maxtasksperchild=1,
+    ) as pool:
+        for result in tqdm(
+            pool.imap_unordered(_run_replica, jobs),
+            total=len(jobs),
+            desc="Replicas",
+        ):
+            if result["status"] == "failed":
+                log.error("Replica %s failed: %s", result["point"], result["error"])
+            results.append(result)
+    return _save_summary(results, output_dir)
+
+
+def _save_summary(results, output_dir):
+    """Save and return the summary table of a sweep."""
+    summary = pd.DataFrame(results).set_index("point").sort_index()
+    summary.to_csv(output_dir / SUMMARY_FILENAME, sep="\t")
+    log.info(
+        "Finished sweep: %s/%s points completed. Summary saved at %s",
+        (summary["status"] == "completed").sum(),
+        len(summary),
+        output_dir / SUMMARY_FILENAME,
+    )
+    return summary
+
+
+def _simulation_status(simulation):
+    """Return the summary fields of a simulation that was run."""
+    return {
+        "virtual_time": simulation.total_time(),
+        "n_aborted_sessions": sum(
+            status["status"] == "aborted"
+            for status in simulation.session_status.values()
+        ),
+    }
+
+
+def _init_replica(simulation):
+    """Set the simulation replicated by a process forked by `fork_sweep`."""
+    _REPLICA["simulation"] = simulation
+
+
+def _run_replica(job):
+    """Run a session plan in a process forked by `fork_sweep`."""
+    index, output_dir, sessions, session_models, nest_seed = job
+
+    def run_replica(result):
+        simulation = _REPLICA["simulation"]
+        simulation.fork_replica(
+            output_dir,
+            sessions=sessions,
+            session_models=session_models,
+            nest_seed=nest_seed,
+        )
+        simulation.run()
+        result.update(_simulation_status(simulation))
+
+    return run_job(run_replica, _point_fields(index, output_dir), "real_time")
+
+
+def _run_point(job):
+    """Run a single point of a sweep in a worker process."""
+    from . import run
+
+    index, path, overrides, output_dir, input_dir, threads, cache, cache_dir = job
+    threads_override = (
+        {} if threads is None
+        else {"kernel": {"nest_params": {"local_num_threads": threads}}}
+    )
+
+    def run_point(result):
+        simulation = run(
+            path,
+            threads_override,
+            overrides,
+            output_dir=output_dir,
+            input_dir=input_dir,
+            cache=cache,
+            cache_dir=cache_dir,
+        )
+        if simulation is None:
+            result["status"] = "cached"
+        else:
+            result.update(_simulation_status(simulation))
+
+    return run_job(run_point, _point_fields(index, output_dir), "real_time")
+
+
+def _point_fields(index, output_dir):
+    """Return the initial fields of the result of a sweep point."""
+    return {
+        "point": index,
+        "output_dir": output_dir,
+        "n_aborted_sessions": None,
+        "virtual_time": None,
+    }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# utils/cache.py
+
+"""Content-addressed cache of simulation outputs.
+
+A simulation is identified by a fingerprint computed from:
+    - its full parameter tree (see :meth:`ParamsTree.fingerprint`), except
+      for the input and output directories,
+    - the content of the input arrays loaded from files (``from_array`` unit
+      and synapse changes),
+    - the deNEST and NEST versions (see :func:`misc.version_info`).
+
+The fingerprint is saved in the output directory once the simulation is
+complete, and serves as a completed-run marker.
+"""
+
+import hashlib
+import logging
+import os
+from collections.abc import Mapping
+from pathlib import Path
+
+from ..io import save
+from ..parameters import ParamsTree
+from . import misc
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Simulation parameters that don't affect the simulation's results
+EXCLUDED_SIM_PARAMS = ["input_dir", "output_dir"]
+
+
+def simulation_fingerprint(tree, input_dir):
+    """Return the fingerprint of a simulation.
+
+    Args:
+        tree (ParamsTree): Full simulation parameter tree.
+        input_dir (str or Path): Directory in which the input arrays are
+            searched for.
+
+    Returns:
+        str: Hexadecimal sha256 digest.
+    """
+    simulation = tree.children.get("simulation")
+    if simulation is not None and any(
+        key in simulation.params for key in EXCLUDED_SIM_PARAMS
+    ):
+        # The copy shares the tree's data until it's modified
+        tree = tree.copy()
+        for key in EXCLUDED_SIM_PARAMS:
+            tree.children["simulation"].params.pop(key, None)
+    digest = hashlib.sha256()
+    digest.update(tree.fingerprint().encode("utf-8"))
+    for relative_path in sorted(set(input_array_paths(tree))):
+        digest.update(relative_path.encode("utf-8"))
+        digest.update(file_digest(Path(input_dir, relative_path)).encode("utf-8"))
+    digest.update(misc.version_info().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def input_array_paths(mapping):
+    """Yield the paths of the input arrays referenced in a tree-like mapping.
+
+    Input arrays are referenced in the ``nest_params`` of ``unit_changes``
+    items and in the ``params`` of ``synapse_changes`` items for which
+    ``from_array`` is true. ``mapping`` may be a ``ParamsTree``.
+    """
+    if isinstance(mapping, Mapping):
+        if mapping.get("from_array"):
+            for key in ["nest_params", "params"]:
+                if isinstance(mapping.get(key), Mapping):
+                    for value in mapping[key].values():
+                        if isinstance(value, (str, Path)):
+                            yield str(value)
+        for value in mapping.values():
+            yield from input_array_paths(value)
+        # The values of trees are their data, not their children
+        if isinstance(mapping, ParamsTree):
+            for child in mapping.children.values():
+                yield from input_array_paths(child)
+    elif isinstance(mapping, (list, tuple)):
+        for value in mapping:
+            yield from input_array_paths(value)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the sha256 digest of a file's content, or of its absence."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return "missing"
+    return digest.hexdigest()
+
+
+def is_complete(output_dir, fingerprint):
+    """Return True if an output directory contains a completed simulation."""
+    path = Path(
+        save.output_subdir(output_dir, "fingerprint", create_dir=False),
+        save.output_filename("fingerprint"),
+    )
+    try:
+        return path.read_text().strip() == fingerprint
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
+def mark_complete(output_dir, fingerprint):
+    """Save the fingerprint of a completed simulation in its output directory."""
+    save.output_path(output_dir, "fingerprint").write_text(fingerprint + "\n")
+
+
+def link_output(cache_dir, fingerprint, output_dir):
+    """Record a completed simulation's output directory in a cache directory.
+
+    The cache directory contains a symbolic link to the output directory of
+    each completed simulation, named after its fingerprint.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    link = cache_dir / fingerprint
+    tmp_link = cache_dir / (fingerprint + f".{os.getpid()}.tmp")
+    tmp_link.symlink_to(Path(output_dir).resolve(), target_is_directory=True)
+    os.replace(tmp_link, link)
+
+
+def cached_output(cache_dir, fingerprint):
+    """Return the path to the cached output of a simulation, or None."""
+    path = Path(cache_dir, fingerprint)
+    if is_complete(path, fingerprint):
+        return path.resolve()
+    return None
@@ -5,11 +5,18 @@
 
 # pylint:=missing-docstring
 
+import logging
+import os
+import resource
+import sys
 import time
+import traceback
 from pathlib import Path
 
 from ..io import save
 
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
 
 def pretty_time(start_time):
     minutes, seconds = divmod(time.time() - start_time, 60)
@@ -17,16 +24,72 @@ def pretty_time(start_time):
     return "%dh:%02dm:%02ds" % (hours, minutes, seconds)
 
 
-def drop_versions(output_dir):
+def peak_rss():
+    """Return the peak resident set size of the process in bytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ``ru_maxrss`` is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        return max_rss
+    return max_rss * 1024
+
+
+def default_n_workers(threads_per_worker=None):
+    """Return the number of worker processes that fit on the CPUs.
+
+    Workers use ``threads_per_worker`` threads each (1 if None).
+    """
+    return max(1, (os.cpu_count() or 1) // (threads_per_worker or 1))
+
+
+def run_job(function, fields, time_key):
+    """Run a job in a worker process and return its result.
+
+    Exceptions raised by the job are logged and recorded in the result rather
+    than raised.
+
+    Args:
+        function (callable): Job, called with the result dictionary, which it
+            may update.
+        fields (dict): Initial fields of the result.
+        time_key (str): Key of the time (s) spent running the job.
+
+    Returns:
+        dict: ``fields`` with the following additional keys:
+            ``status`` (str)
+                ``'completed'`` (unless set otherwise by the job) or
+                ``'failed'``.
+            ``error`` (str | None)
+                Error message of failed jobs.
+            ``<time_key>`` (float)
+                Time (s) spent running the job.
+    """
+    result = {**fields, "status": "completed", "error": None}
+    start_time = time.time()
+    try:
+        function(result)
+    except Exception as error:  # pylint: disable=broad-except
+        log.debug(traceback.format_exc())
+        result["status"] = "failed"
+        result["error"] = f"{type(error).__name__}: {error}"
+    result[time_key] = time.time() - start_time
+    return result
+
+
+def version_info():
+    """Return the deNEST and NEST versions."""
     from ..__about__ import __version__
     import nest
 
+    return (
+        f'denest={__version__}\n'
+        f'{nest.version()}\n'
+    )
+
+
+def drop_versions(output_dir):
     path = Path(
         save.output_subdir(output_dir, "versions"),
         save.output_filename("versions")
     )
     with path.open("w") as f:
-        f.write(
-            f'denest={__version__}\n'
-            f'{nest.version()}\n'
-        )
+        f.write(version_info())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# utils/parse_cache.py
+
+"""Optional cache of parsed YAML parameter files.
+
+Parsing YAML is slow compared to loading a pickle, and the same parameter
+files are typically parsed by every run of a sweep. When a cache directory is
+set, parsed files are pickled in it, keyed on the file's resolved path,
+modification time and size. A file that is modified is therefore parsed
+again.
+
+The cache is disabled by default. It is enabled by passing a cache directory
+to :func:`load` (eg with the ``parse_cache_dir`` argument of
+:func:`denest.load_trees`) or by setting the ``DENEST_PARSE_CACHE_DIR``
+environment variable.
+
+Cache entries are loaded with an unpickler that only accepts the types
+produced by YAML's safe loader, so that loading an entry can't run arbitrary
+code. The cache is only an optimization: errors reading or writing it are
+logged and the file is parsed instead.
+"""
+
+import datetime
+import hashlib
+import io
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import yaml
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Use the libyaml bindings when available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+ENV_VARIABLE = "DENEST_PARSE_CACHE_DIR"
+
+# Classes that may appear in pickled entries, besides the builtin containers
+# and scalars (produced by YAML's `timestamp` tag)
+SAFE_CLASSES = {
+    ("datetime", "date"): datetime.date,
+    ("datetime", "datetime"): datetime.datetime,
+    ("datetime", "timedelta"): datetime.timedelta,
+    ("datetime", "timezone"): datetime.timezone,
+}
+
+
+def default_cache_dir():
+    """Return the cache directory set in the environment, or None."""
+    return os.environ.get(ENV_VARIABLE) or None
+
+
+def parse_yaml(path):
+    """Parse a YAML file."""
+    with open(path, "rt") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def cache_key(path):
+    """Return the cache key of a file, from its path, mtime and size."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return hashlib.sha256(
+        f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}".encode("utf-8")
+    ).hexdigest()
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    """Unpickler refusing the classes that YAML's safe loader doesn't use."""
+
+    def find_class(self, module, name):
+        if (module, name) in SAFE_CLASSES:
+            return SAFE_CLASSES[(module, name)]
+        raise pickle.UnpicklingError(f"Forbidden class: {module}.{name}")
+
+
+def safe_loads(data):
+    """Unpickle data containing only the types produced by YAML's safe loader.
+
+    Raises:
+        pickle.UnpicklingError: If the data references another class.
+    """
+    return _SafeUnpickler(io.BytesIO(data)).load()
+
+
+def load(path, cache_dir=None):
+    """Return the parsed content of a YAML file, using the cache if enabled.
+
+    Args:
+        path (str or Path): Path to the YAML file.
+
+    Keyword Args:
+        cache_dir (str or Path | None): Cache directory. Defaults to
+            :func:`default_cache_dir`. If None, the cache isn't used.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    if cache_dir is None:
+        return parse_yaml(path)
+    cache_path = Path(cache_dir, cache_key(path) + ".pickle")
+    try:
+        content = safe_loads(cache_path.read_bytes())
+        log.debug("Loaded %s from parse cache %s", path, cache_path)
+        return content
+    except FileNotFoundError:
+        pass
+    except Exception as error:  # pylint: disable=broad-except
+        log.warning("Ignoring invalid parse cache entry %s: %s", cache_path, error)
+    content = parse_yaml(path)
+    _write(cache_path, content)
+    return content
+
+
+def _write(cache_path, content):
+    """Atomically write a cache entry. Errors are logged."""
+    tmp_path = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temporary file, since threads may write the same entry
+        with tempfile.NamedTemporaryFile(
+            dir=cache_path.parent, prefix=cache_path.name, suffix=".tmp",
+            delete=False,
+        ) as f:
+            tmp_path = Path(f.name)
+            pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as error:  # pylint: disable=broad-except
+        log.warning("Couldn't write parse cache entry %s: %s", cache_path, error)
+        if tmp_path is not None:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
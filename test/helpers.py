@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers.py
+
+"""Helpers shared by the tests of the worker processes of pools and sweeps."""
+
+# pylint: disable=missing-docstring
+
+import pytest
+
+import denest
+from denest import simulation as simulation_module
+
+
+class SimulationError(Exception):
+    pass
+
+
+@pytest.fixture
+def simulation_trees(monkeypatch):
+    """Record the trees of the simulations run by the jobs, which fail."""
+    trees = []
+
+    def simulation(tree, input_dir=None, output_dir=None):
+        trees.append(tree)
+        raise SimulationError("no NEST")
+
+    monkeypatch.setattr(simulation_module, "Simulation", simulation)
+    monkeypatch.setattr(denest, "Simulation", simulation)
+    return trees
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_cache.py
+
+"""Test the simulation output cache."""
+
+# pylint: disable=missing-docstring,invalid-name
+
+from denest.parameters import ParamsTree
+from denest.utils import cache
+
+
+def test_input_array_paths():
+    tree = {
+        "session_models": {
+            "params": {
+                "unit_changes": [
+                    {"from_array": True, "nest_params": {"V_m": "vm.npy"}},
+                    {"from_array": False, "nest_params": {"V_m": -70.0}},
+                ]
+            },
+            "child": {
+                "params": {
+                    "unit_changes": [
+                        {"from_array": True, "nest_params": {"E_L": "el.npy"}}
+                    ]
+                }
+            },
+        }
+    }
+    assert sorted(cache.input_array_paths(tree)) == ["el.npy", "vm.npy"]
+
+
+def test_input_array_paths_synapse_changes():
+    tree = {
+        "session_models": {
+            "params": {
+                "synapse_changes": [
+                    {
+                        "projection": "proj",
+                        "from_array": True,
+                        "params": {"weight": "weights.npy"},
+                    },
+                    {
+                        "synapse_model": "static_synapse",
+                        "params": {"weight": 2.0},
+                    },
+                ]
+            }
+        }
+    }
+    assert list(cache.input_array_paths(tree)) == ["weights.npy"]
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "array.npy"
+    assert cache.file_digest(path) == "missing"
+    path.write_bytes(b"abc")
+    digest = cache.file_digest(path, chunk_size=1)
+    assert digest == cache.file_digest(path)
+    path.write_bytes(b"abd")
+    assert cache.file_digest(path) != digest
+
+
+def test_complete_and_link(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    assert not cache.is_complete(output_dir, "abc")
+    cache.mark_complete(output_dir, "abc")
+    assert cache.is_complete(output_dir, "abc")
+    assert not cache.is_complete(output_dir, "abd")
+    cache_dir = tmp_path / "cache"
+    assert cache.cached_output(cache_dir, "abc") is None
+    cache.link_output(cache_dir, "abc", output_dir)
+    assert cache.cached_output(cache_dir, "abc") == output_dir.resolve()
+    assert cache.cached_output(cache_dir, "abd") is None
+
+
+def test_input_array_paths_tree():
+    unit_changes = [{"from_array": True, "nest_params": {"E_L": "el.npy"}}]
+    tree = ParamsTree(
+        {
+            "params": {
+                "unit_changes": [
+                    {"from_array": True, "nest_params": {"V_m": "vm.npy"}}
+                ]
+            },
+            "child": {"grandchild": {"params": {"unit_changes": unit_changes}}},
+        }
+    )
+    assert sorted(set(cache.input_array_paths(tree))) == ["el.npy", "vm.npy"]
+
+
+def test_simulation_fingerprint(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache.misc, "version_info", lambda: "versions")
+    tree = ParamsTree(
+        {
+            "simulation": {"params": {"output_dir": "a", "input_dir": "b"}},
+            "network": {"params": {"x": 1}},
+        }
+    )
+    fingerprint = cache.simulation_fingerprint(tree, tmp_path)
+    # The tree isn't modified
+    assert tree.children["simulation"].params["output_dir"] == "a"
+    tree.children["simulation"].params["output_dir"] = "c"
+    assert cache.simulation_fingerprint(tree, tmp_path) == fingerprint
+    tree.children["network"].params["x"] = 2
+    assert cache.simulation_fingerprint(tree, tmp_path) != fingerprint
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_layer_state.py
+
+"""Test the compilation of layer state changes, without NEST."""
+
+# pylint: disable=missing-docstring,invalid-name
+
+import numpy as np
+import pytest
+
+from denest.network.layers import (Layer, UnitChangePlan, _combine_values,
+                                   _unit_statuses)
+from denest.utils.validation import ParameterError
+
+POPULATIONS = {"exc": 2, "inh": 2}
+SHAPE = (2, 3)
+
+
+class StaticLayer(Layer):
+    """Layer whose GIDs are assigned without NEST."""
+
+    def __init__(self):
+        super().__init__(
+            "l", {"populations": POPULATIONS}, {"rows": SHAPE[0], "columns": SHAPE[1]}
+        )
+        self._gids = []
+        self._unit_populations = {}
+        gid = 1
+        for location in np.ndindex(*SHAPE):
+            for population, n_units in POPULATIONS.items():
+                for k in range(n_units):
+                    self._gids.append(gid)
+                    self._unit_populations[gid] = population
+                    self._population_locations[gid] = location + (k,)
+                    gid += 1
+        self._created = True
+
+    def gids(self, population=None, location=None, population_location=None):
+        return [
+            gid for gid in self._gids
+            if population is None or self._unit_populations[gid] == population
+        ]
+
+
+@pytest.fixture
+def layer():
+    return StaticLayer()
+
+
+def initial_state(layer):
+    return {
+        gid: {"V_m": -70.0 + gid, "tau_m": 10.0 * gid} for gid in layer.gids()
+    }
+
+
+def sequential_set_state(layer, state, nest_params, population_name,
+                         change_type):
+    """Reference: the former unit-by-unit ``set_state`` from arrays."""
+    population_names = (
+        layer.population_names if population_name is None else [population_name]
+    )
+    for population in population_names:
+        for gid in layer.gids(population=population):
+            index = layer._population_locations[gid]
+            for param_name, array in nest_params.items():
+                value = array[index]
+                if change_type == "multiplicative":
+                    value = state[gid][param_name] * value
+                elif change_type == "additive":
+                    value = state[gid][param_name] + value
+                state[gid][param_name] = value
+    return state
+
+
+def compiled_set_state(layer, state, nest_params, population_name, change_type,
+                       input_dir=None):
+    def get_status(gids, param_name):
+        return tuple(state[gid][param_name] for gid in gids)
+
+    for plan in layer.compile_state(
+        nest_params=nest_params,
+        population_name=population_name,
+        change_type=change_type,
+        from_array=True,
+        input_dir=input_dir,
+    ):
+        for gid, status in zip(plan.gids, _unit_statuses(plan, get_status)):
+            state[gid].update(status)
+    return state
+
+
+@pytest.mark.parametrize("change_type", ["constant", "multiplicative", "additive"])
+@pytest.mark.parametrize("population_name", [None, "exc", "inh"])
+def test_compiled_state_matches_sequential(layer, change_type, population_name):
+    rng = np.random.default_rng(0)
+    shape = SHAPE + (2,)
+    nest_params = {
+        "V_m": rng.uniform(-1, 1, size=shape),
+        "tau_m": rng.uniform(1, 2, size=shape),
+    }
+    expected = sequential_set_state(
+        layer, initial_state(layer), nest_params, population_name, change_type
+    )
+    actual = compiled_set_state(
+        layer, initial_state(layer), nest_params, population_name, change_type
+    )
+    assert actual == expected
+
+
+def test_compile_state_from_file(layer, tmp_path):
+    array = np.arange(12, dtype=float).reshape(SHAPE + (2,))
+    np.save(tmp_path / "tau_m.npy", array)
+    expected = sequential_set_state(
+        layer, initial_state(layer), {"tau_m": array}, "inh", "multiplicative"
+    )
+    actual = compiled_set_state(
+        layer,
+        initial_state(layer),
+        {"tau_m": "tau_m.npy"},
+        "inh",
+        "multiplicative",
+        input_dir=tmp_path,
+    )
+    assert actual == expected
+    # The units of other populations are unchanged
+    assert all(
+        actual[gid] == initial_state(layer)[gid] for gid in layer.gids("exc")
+    )
+
+
+def test_compile_state_single_value(layer):
+    plans = layer.compile_state(nest_params={"V_m": -60.0}, change_type="additive")
+    assert plans == [
+        UnitChangePlan(
+            "l", population, layer.gids(population), {"V_m": -60.0}, "additive",
+            False,
+        )
+        for population in layer.population_names
+    ]
+
+
+def test_compile_state_errors(layer, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        layer.compile_state(
+            nest_params={"V_m": "missing.npy"},
+            from_array=True,
+            input_dir=tmp_path,
+        )
+    with pytest.raises(ValueError, match="incorrect shape"):
+        layer.compile_state(
+            nest_params={"V_m": np.zeros(SHAPE + (1,))},
+            population_name="exc",
+            from_array=True,
+        )
+
+
+def test_combine_values():
+    assert _combine_values((1.0, 2.0), [3.0, 4.0], "multiplicative") == [3.0, 8.0]
+    assert _combine_values((1.0, 2.0), [3.0, 4.0], "additive") == [4.0, 6.0]
+    with pytest.raises(ValueError, match="non-float"):
+        _combine_values((1, 2.0), [3.0, 4.0], "additive")
+    with pytest.raises(ValueError, match="Unrecognized"):
+        _combine_values((1.0,), [3.0], "constant")
+
+
+def test_unit_statuses_constant():
+    plan = UnitChangePlan("l", "exc", [1, 2], {"V_m": [1.0, 2.0], "C_m": [3, 4]},
+                          "constant", True)
+    assert _unit_statuses(plan, None) == [
+        {"V_m": 1.0, "C_m": 3},
+        {"V_m": 2.0, "C_m": 4},
+    ]
+
+
+def test_compile_state_invalid_change_type(layer):
+    with pytest.raises(ParameterError, match="change_type"):
+        layer.compile_state(nest_params={"V_m": -60.0}, change_type="divisive")
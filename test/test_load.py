@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_load.py
+
+"""Test data loading functions."""
+
+# pylint: disable=missing-docstring,invalid-name,redefined-outer-name
+
+import numpy as np
+import pytest
+
+from denest.io import catalog, load, partition
+from denest.io.save import save_as_yaml
+
+POPULATION_SHAPE = (2, 2, 1)
+LOCATIONS = {
+    10: (0, 0, 0),
+    11: (0, 1, 0),
+    12: (1, 0, 0),
+    13: (1, 1, 0),
+}
+SPIKES = [
+    # One file per virtual process
+    [(10, 1.0), (11, 1.5), (10, 2.0), (13, 9.5)],
+    [(12, 0.5), (10, 1.2), (99, 3.0)],  # gid 99 is not in the population
+    [],
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    # Recorder data and metadata are saved in the "data" subdirectory
+    path = tmp_path / "data"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def spike_detector_metadata(data_dir):
+    filenames = []
+    for vp, spikes in enumerate(SPIKES):
+        filename = f"spike_detector_l1_l1_exc-1-{vp}.gdf"
+        with open(data_dir / filename, "w") as f:
+            f.writelines(f"{gid}\t{time}\t\n" for gid, time in spikes)
+        filenames.append(filename)
+    metadata_path = data_dir / "spike_detector_l1_l1_exc.yml"
+    save_as_yaml(
+        metadata_path,
+        {
+            "type": "spike_detector",
+            "colnames": ["gid", "time"],
+            "filenames": filenames,
+            "gids": list(LOCATIONS),
+            "locations": LOCATIONS,
+            "population_shape": POPULATION_SHAPE,
+        },
+    )
+    return metadata_path
+
+
+def test_load(spike_detector_metadata):
+    df = load.load(spike_detector_metadata)
+    assert len(df) == 7
+    assert list(df.columns) == ["gid", "time"]
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 1000])
+def test_load_spike_tensor(spike_detector_metadata, chunksize):
+    tensor = load.load_spike_tensor(
+        spike_detector_metadata, bin_size=1.0, chunksize=chunksize
+    )
+    assert tensor.shape == (10,) + POPULATION_SHAPE
+    expected = np.zeros(tensor.shape, dtype=int)
+    expected[0, 1, 0, 0] = 1  # gid 12 at 0.5
+    expected[1, 0, 0, 0] = 2  # gid 10 at 1.0 and 1.2
+    expected[1, 0, 1, 0] = 1  # gid 11 at 1.5
+    expected[2, 0, 0, 0] = 1  # gid 10 at 2.0
+    expected[9, 1, 1, 0] = 1  # gid 13 at 9.5
+    assert np.array_equal(tensor.todense(), expected)
+    assert tensor.counts.sum() == 6
+
+
+def test_load_spike_tensor_window(spike_detector_metadata):
+    tensor = load.load_spike_tensor(
+        spike_detector_metadata, bin_size=0.5, start=1.0, end=2.0
+    )
+    assert tensor.shape == (2,) + POPULATION_SHAPE
+    dense = tensor.todense()
+    assert dense[0, 0, 0, 0] == 2
+    assert dense[1, 0, 1, 0] == 1
+    assert dense.sum() == 3
+
+
+@pytest.mark.parametrize("end, n_bins", [(None, 0), (4.0, 4)])
+def test_load_spike_tensor_empty_locations(spike_detector_metadata, end, n_bins):
+    metadata = load.load_yaml(spike_detector_metadata)
+    metadata["locations"] = {}
+    save_as_yaml(spike_detector_metadata, metadata)
+    tensor = load.load_spike_tensor(spike_detector_metadata, end=end)
+    assert tensor.shape == (n_bins,) + POPULATION_SHAPE
+    assert tensor.counts.sum() == 0
+    assert tensor.todense().shape == (n_bins,) + POPULATION_SHAPE
+
+
+def test_load_spike_tensor_wrong_type(spike_detector_metadata):
+    metadata = load.load_yaml(spike_detector_metadata)
+    metadata["type"] = "multimeter"
+    save_as_yaml(spike_detector_metadata, metadata)
+    with pytest.raises(ValueError):
+        load.load_spike_tensor(spike_detector_metadata)
+
+
+@pytest.fixture
+def harvested_metadata(data_dir):
+    gids = np.array([10, 11, 10, 13, 12, 10, 99], dtype="int64")
+    times = np.array([1.0, 1.5, 2.0, 9.5, 0.5, 1.2, 3.0])
+    filenames = ["spike_detector-1-gid.bin", "spike_detector-1-time.bin"]
+    # Data is appended by chunks during the simulation
+    for column in [gids[:2], gids[2:]]:
+        with open(data_dir / filenames[0], "ab") as f:
+            column.tofile(f)
+    times.tofile(data_dir / filenames[1])
+    metadata_path = data_dir / "spike_detector.yml"
+    save_as_yaml(
+        metadata_path,
+        {
+            "type": "spike_detector",
+            "format": "binary",
+            "colnames": ["gid", "time"],
+            "dtypes": ["int64", "float64"],
+            "filenames": filenames,
+            "gids": list(LOCATIONS),
+            "locations": LOCATIONS,
+            "population_shape": POPULATION_SHAPE,
+        },
+    )
+    return metadata_path
+
+
+def test_load_binary(harvested_metadata):
+    df = load.load(harvested_metadata)
+    assert list(df["gid"]) == [10, 11, 10, 13, 12, 10, 99]
+    assert list(df["time"]) == [1.0, 1.5, 2.0, 9.5, 0.5, 1.2, 3.0]
+
+
+def test_load_spike_tensor_binary(spike_detector_metadata, harvested_metadata):
+    expected = load.load_spike_tensor(spike_detector_metadata).todense()
+    for chunksize in [1, 4, 1000]:
+        tensor = load.load_spike_tensor(harvested_metadata, chunksize=chunksize)
+        assert np.array_equal(tensor.todense(), expected)
+
+
+SESSION_TIMES = {"00_first": (0.0, 1.0), "01_second": (1.0, 10.0)}
+
+
+@pytest.mark.parametrize("chunksize", [1, 1000])
+def test_partition_by_session(spike_detector_metadata, harvested_metadata, chunksize):
+    for metadata_path in [spike_detector_metadata, harvested_metadata]:
+        save_as_yaml(metadata_path.parent.parent / "session_times", SESSION_TIMES)
+        unpartitioned = {
+            sessions: load.load(
+                metadata_path, sessions=sessions and list(sessions)
+            )
+            for sessions in [None, ("00_first",), ("01_second",)]
+        }
+        assert len(unpartitioned[None]) == 7
+        assert len(unpartitioned[("00_first",)]) == 2
+        assert len(unpartitioned[("01_second",)]) == 5
+        metadata = partition.partition_by_session(
+            metadata_path, SESSION_TIMES, chunksize=chunksize
+        )
+        assert set(metadata["session_filenames"]) == set(SESSION_TIMES)
+        for sessions, df in unpartitioned.items():
+            partitioned = load.load(metadata_path, sessions=sessions and list(sessions))
+            assert sorted(partitioned["time"]) == sorted(df["time"])
+            assert sorted(partitioned["gid"]) == sorted(df["gid"])
+        assert load.load_spike_tensor(metadata_path).counts.sum() == 6
+
+
+def test_partition_multiple_ranks(data_dir):
+    # One group of column files per MPI process
+    events = {
+        0: ([10, 11, 10], [0.5, 1.5, 2.0]),
+        1: ([12, 13], [0.2, 9.5]),
+        2: ([11], [3.0]),
+    }
+    filenames = []
+    for rank, (gids, times) in events.items():
+        for colname, values, dtype in [
+            ("gid", gids, "int64"), ("time", times, "float64")
+        ]:
+            filename = f"spike_detector-1-{rank}-{colname}.bin"
+            np.array(values, dtype=dtype).tofile(data_dir / filename)
+            filenames.append(filename)
+    metadata_path = data_dir / "spike_detector.yml"
+    save_as_yaml(
+        metadata_path,
+        {
+            "type": "spike_detector",
+            "format": "binary",
+            "colnames": ["gid", "time"],
+            "dtypes": ["int64", "float64"],
+            "filenames": filenames,
+            "gids": list(LOCATIONS),
+            "locations": LOCATIONS,
+            "population_shape": POPULATION_SHAPE,
+        },
+    )
+    save_as_yaml(data_dir.parent / "session_times", SESSION_TIMES)
+    metadata = partition.partition_by_session(
+        metadata_path, SESSION_TIMES, chunksize=2
+    )
+    assert metadata["session_filenames"]["00_first"] == [
+        "spike_detector-1-00_first-gid.bin",
+        "spike_detector-1-00_first-time.bin",
+    ]
+    assert not any((data_dir / filename).exists() for filename in filenames)
+    first = load.load(metadata_path, sessions=["00_first"])
+    assert sorted(zip(first["gid"], first["time"])) == [(10, 0.5), (12, 0.2)]
+    df = load.load(metadata_path)
+    assert sorted(df["time"]) == [0.2, 0.5, 1.5, 2.0, 3.0, 9.5]
+
+
+def test_catalog(tmp_path, spike_detector_metadata, harvested_metadata):
+    metadata_paths = [spike_detector_metadata, harvested_metadata]
+    expected = {path: load.load(path) for path in metadata_paths}
+    catalog.write_catalog(
+        tmp_path,
+        {path: load.load_yaml(path) for path in metadata_paths},
+        SESSION_TIMES,
+    )
+    assert load.metadata_paths(tmp_path) == sorted(metadata_paths)
+    assert catalog.load_catalog_sessions(tmp_path) == SESSION_TIMES
+    df = catalog.load_catalog(tmp_path).set_index("metadata_filename")
+    assert df.loc[harvested_metadata.name, "format"] == "binary"
+    assert df.loc[spike_detector_metadata.name, "n_files"] == 3
+    assert df["bytes"].sum() == sum(
+        path.stat().st_size for path in spike_detector_metadata.parent.iterdir()
+        if path.suffix in [".gdf", ".bin"]
+    )
+    # Loaders don't need the metadata files anymore
+    for path in metadata_paths:
+        path.unlink()
+        assert load.load(path).equals(expected[path])
+
+
+def test_merge_catalogs(tmp_path, spike_detector_metadata):
+    metadata = load.load_yaml(spike_detector_metadata)
+    expected = load.load(spike_detector_metadata)
+    # Virtual processes are assigned round-robin to 2 MPI processes
+    for rank in range(2):
+        catalog.write_catalog(
+            tmp_path,
+            {spike_detector_metadata: metadata},
+            SESSION_TIMES,
+            rank=rank,
+            local_filenames={
+                spike_detector_metadata.name: metadata["filenames"][rank::2]
+            },
+        )
+    assert not catalog.catalog_path(tmp_path).exists()
+    catalog.merge_catalogs(tmp_path)
+    assert catalog.load_catalog_sessions(tmp_path) == SESSION_TIMES
+    entry = catalog.catalog_entry(spike_detector_metadata)
+    assert entry["filenames"] == metadata["filenames"]
+    df = catalog.load_catalog(tmp_path)
+    assert list(df["n_files"]) == [3]
+    spike_detector_metadata.unlink()
+    assert load.load(spike_detector_metadata).equals(expected)
+
+
+def test_catalog_partition(tmp_path, harvested_metadata):
+    save_as_yaml(tmp_path / "session_times", SESSION_TIMES)
+    catalog.write_catalog(
+        tmp_path,
+        {harvested_metadata: load.load_yaml(harvested_metadata)},
+        SESSION_TIMES,
+    )
+    partition.partition_by_session(harvested_metadata, SESSION_TIMES)
+    entry = catalog.catalog_entry(harvested_metadata)
+    assert set(entry["session_filenames"]) == set(SESSION_TIMES)
+    assert len(load.load(harvested_metadata, sessions=["00_first"])) == 2
+
+
+@pytest.fixture
+def shared_metadata(harvested_metadata):
+    # Two populations recorded by the same node
+    metadata = load.load_yaml(harvested_metadata)
+    metadata["shared"] = True
+    other_metadata = dict(metadata, gids=[99], locations={99: (0, 0, 0)},
+                          population_shape=(1, 1, 1))
+    metadata_paths = [
+        harvested_metadata.with_name("spike_detector_l1_l1_exc.yml"),
+        harvested_metadata.with_name("spike_detector_l1_l1_inh.yml"),
+    ]
+    save_as_yaml(metadata_paths[0], metadata)
+    save_as_yaml(metadata_paths[1], other_metadata)
+    harvested_metadata.unlink()
+    return metadata_paths
+
+
+def test_load_shared(tmp_path, shared_metadata):
+    exc, inh = shared_metadata
+    assert list(load.load(exc)["gid"]) == [10, 11, 10, 13, 12, 10]
+    assert list(load.load(inh)["gid"]) == [99]
+    assert load.load_spike_tensor(exc).counts.sum() == 6
+    catalog.write_catalog(
+        tmp_path,
+        {path: load.load_yaml(path) for path in shared_metadata},
+        SESSION_TIMES,
+    )
+    assert catalog.catalog_entry(inh)["gids"] == [99]
+    partitioned = {}
+    for path in shared_metadata:
+        partition.partition_by_session(
+            path, SESSION_TIMES, partitioned=partitioned
+        )
+    assert len(partitioned) == 1
+    assert len(load.load(exc, sessions=["00_first"])) == 2
+    assert len(load.load(exc, sessions=["01_second"])) == 4
+    assert list(load.load(inh)["gid"]) == [99]
+
+
+def test_gid_mask():
+    senders = np.array([1, 5, 3, 8, 4])
+    assert list(load.gid_mask(senders, [3, 4, 5])) == [0, 1, 1, 0, 1]
+    assert list(load.gid_mask(senders, [1, 8])) == [1, 0, 0, 1, 0]
+    assert not load.gid_mask(senders, []).any()
+
+
+def test_checkpoint(tmp_path):
+    from denest import ParamsTree
+    from denest.io import checkpoint
+
+    tree = ParamsTree({"simulation": {"params": {"sessions": ["a", "b"]}}})
+    state = {
+        "units": {("l1", "l1_exc"): {"V_m": np.array([-70.0, -65.0])}},
+        "synapses": {},
+    }
+    info = {"time": 100.0, "next_session": 1}
+    with pytest.raises(FileNotFoundError):
+        checkpoint.load_checkpoint(tmp_path)
+    checkpoint.save_checkpoint(tmp_path, tree, info, state)
+    tree_path, loaded_info, loaded_state = checkpoint.load_checkpoint(tmp_path)
+    assert ParamsTree.read(tree_path) == tree
+    assert loaded_info == info
+    assert np.array_equal(
+        loaded_state["units"][("l1", "l1_exc")]["V_m"], [-70.0, -65.0]
+    )
+
+
+def test_load_session_metadata(tmp_path):
+    sessions_dir = tmp_path / "sessions"
+    sessions_dir.mkdir()
+    save_as_yaml(
+        sessions_dir / "01_second",
+        {"name": "01_second", "start": 1.0, "end": 10.0, "aborted": False},
+    )
+    save_as_yaml(
+        sessions_dir / "00_first",
+        {
+            "name": "00_first",
+            "start": 0.0,
+            "end": 1.0,
+            "aborted": False,
+            "metrics": {"simulate_time": 0.5, "n_spikes": 3.0},
+        },
+    )
+    df = load.load_session_metadata(tmp_path)
+    assert list(df.index) == ["00_first", "01_second"]
+    assert df.loc["00_first", "n_spikes"] == 3.0
+    assert np.isnan(df.loc["01_second", "simulate_time"])
+    assert load.load_session_metadata(tmp_path / "missing").empty
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_monitor.py
+
+"""Test the evaluation of stop conditions by the rate monitor."""
+
+# pylint: disable=missing-docstring,invalid-name
+
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from denest.monitor import RateMonitor, RateSample
+from denest.session import Session
+from denest.utils.validation import ParameterError
+
+
+class Recorder:
+    def __init__(self, layer_name, population_name, gid):
+        self.layer_name = layer_name
+        self.population_name = population_name
+        self.gid = (gid,)
+
+    def __str__(self):
+        return f"spike_detector_{self.layer_name}_{self.population_name}"
+
+
+def make_monitor(samples, n_units=(10, 30)):
+    """Return a monitor of two populations of layer `l`, without NEST."""
+    monitor = RateMonitor.__new__(RateMonitor)
+    monitor.recorders = [Recorder("l", "exc", 1), Recorder("l", "inh", 2)]
+    # Shared spike detector
+    monitor.ignored_recorders = [Recorder("l2", "exc", 3)]
+    monitor._n_units = np.array(n_units)
+    monitor._gids = np.array([1, 2])
+    monitor._rank = None
+    monitor.samples = deque(
+        (
+            RateSample(session, start, end, np.array(rates, dtype=float))
+            for session, start, end, rates in samples
+        ),
+        maxlen=100,
+    )
+    monitor._time = monitor.samples[-1].end if samples else 0.0
+    return monitor
+
+
+def condition(duration, above=None, below=None, populations=None,
+              layers=None):
+    return {
+        "layers": layers,
+        "populations": populations,
+        "above": above,
+        "below": below,
+        "duration": duration,
+    }
+
+
+class Network:
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def get_recorders(self):
+        yield from self.monitor.recorders + self.monitor.ignored_recorders
+
+
+def make_session(conditions, record=True, chunk_size=None):
+    return Session(
+        "s",
+        {
+            "simulation_time": 100,
+            "stop_conditions": conditions,
+            "record": record,
+            "chunk_size": chunk_size,
+        },
+        start_time=0,
+        resolution=0.1,
+    )
+
+
+def validate(monitor, session):
+    monitor.validate_stop_conditions([session], Network(monitor))
+
+
+SESSION = SimpleNamespace(name="s")
+
+
+def test_not_covered():
+    monitor = make_monitor([("s", 0, 10, [100, 100]), ("s", 10, 20, [100, 100])])
+    assert monitor.check_stop_condition(SESSION, condition(25, above=1)) is None
+    assert monitor.check_stop_condition(SESSION, condition(20, above=1))
+
+
+def test_other_sessions_ignored():
+    monitor = make_monitor([("t", 0, 50, [100, 100]), ("s", 50, 60, [0, 0])])
+    # The samples of the previous session don't count towards the duration
+    assert monitor.check_stop_condition(SESSION, condition(20, above=1)) is None
+    assert monitor.check_stop_condition(SESSION, condition(10, below=0))
+
+
+def test_time_weighted_window():
+    monitor = make_monitor(
+        [
+            ("s", 0, 100, [1000, 1000]),
+            ("s", 100, 130, [0, 0]),
+            ("s", 130, 140, [40, 0]),
+        ],
+        n_units=(10, 30),
+    )
+    # Last 40 ms: exc fires at 40 Hz during 10 ms, weighted by 10/40 units
+    # -> 40 * 10 / 40 * 10 / 40 = 2.5 Hz
+    assert monitor.check_stop_condition(SESSION, condition(40, above=2.5)) is None
+    assert "2.5 Hz above 2.4" in monitor.check_stop_condition(
+        SESSION, condition(40, above=2.4)
+    )
+    # The window ends with the first sample covering the duration, and isn't
+    # truncated: the 100 ms long sample is included entirely
+    reason = monitor.check_stop_condition(SESSION, condition(50, above=500))
+    # (100 * 1000 + 30 * 0 + 10 * 10) / 140 = 715 Hz
+    assert "715 Hz above 500 Hz over the last 140.0 ms" in reason
+    # Only the populations of interest
+    assert "10 Hz above" in monitor.check_stop_condition(
+        SESSION, condition(40, above=9, populations=["exc"])
+    )
+    assert monitor.check_stop_condition(
+        SESSION, condition(40, above=0, populations=["inh"])
+    ) is None
+
+
+@pytest.mark.parametrize(
+    "above, below, expected",
+    [
+        (5.0, None, None),  # `above` is strict
+        (4.9, None, "above"),
+        (None, 5.0, "below"),  # `below` is inclusive
+        (None, 4.9, None),
+        (4.9, 5.0, "above"),  # `above` is checked first
+        (6.0, 4.0, None),
+    ],
+)
+def test_threshold_direction(above, below, expected):
+    monitor = make_monitor([("s", 0, 10, [5, 5])])
+    reason = monitor.check_stop_condition(
+        SESSION, condition(10, above=above, below=below)
+    )
+    if expected is None:
+        assert reason is None
+    else:
+        assert f"5 Hz {expected}" in reason
+
+
+def test_validate_stop_conditions():
+    monitor = make_monitor([])
+    session = make_session([condition(10, above=1, populations=["other"])])
+    with pytest.raises(ParameterError, match="doesn't apply to any population"):
+        validate(monitor, session)
+
+
+@pytest.mark.parametrize(
+    "layers, populations, error",
+    [
+        (["l"], None, None),
+        (None, ["inh"], None),
+        # Populations recorded by shared spike detectors can't be monitored
+        (None, None, r"shared spike detectors.*\['spike_detector_l2_exc'\]"),
+        (["l", "l2"], ["exc"], "shared spike detectors"),
+        (["l2"], None, "shared spike detectors"),
+        (["l3"], None, "doesn't apply to any population"),
+    ],
+)
+def test_validate_shared_recorders(layers, populations, error):
+    monitor = make_monitor([])
+    session = make_session(
+        [condition(10, above=1, layers=layers, populations=populations)]
+    )
+    if error is None:
+        validate(monitor, session)
+    else:
+        with pytest.raises(ParameterError, match=error):
+            validate(monitor, session)
+
+
+@pytest.mark.parametrize(
+    "record, populations, error",
+    [
+        (True, ["exc", "inh"], False),
+        (["spike_detector_l_*"], ["exc", "inh"], False),
+        (["spike_detector_l_exc"], ["exc"], False),
+        # The inactivated detector of `inh` would read 0 Hz
+        (["spike_detector_l_exc"], ["inh"], True),
+        (["spike_detector_l_exc"], None, True),
+        (False, ["exc"], True),
+    ],
+)
+def test_validate_inactivated_recorders(record, populations, error):
+    monitor = make_monitor([])
+    session = make_session(
+        [condition(10, below=1, layers=["l"], populations=populations)],
+        record=record,
+    )
+    if not error:
+        validate(monitor, session)
+    else:
+        with pytest.raises(ParameterError, match="inactivated during the session"):
+            validate(monitor, session)
+
+
+
+def test_inactivated_rates_ignored():
+    # `inh` was inactivated during the session: its rate is NaN
+    monitor = make_monitor([("s", 0, 10, [5, np.nan])])
+    assert monitor.check_stop_condition(
+        SESSION, condition(10, below=5, populations=["exc"])
+    )
+    assert monitor.check_stop_condition(
+        SESSION, condition(10, below=4, populations=["exc"])
+    ) is None
+
+
+@pytest.mark.parametrize(
+    "chunk_size, duration, window",
+    [
+        (None, 100, 100),
+        (10, 100, 100),
+        (0.5, 30, 100),
+        # 121 chunks of 0.5 ms cover 60 ms, whatever the last chunk
+        (0.5, 60, 121),
+        # All the chunks of the session
+        (0.3, 100, 334),
+    ],
+)
+def test_window_covers_conditions(chunk_size, duration, window):
+    monitor = make_monitor([("s", 0, 10, [5, 5])])
+    session = make_session([condition(duration, above=1, layers=["l"])], chunk_size=chunk_size)
+    validate(monitor, session)
+    assert monitor.samples.maxlen == window
+    # Samples aren't lost
+    assert len(monitor.samples) == 1
+
+
+def test_window_condition_fires():
+    """A condition longer than the default window can be met."""
+    monitor = make_monitor([])
+    session = make_session([condition(80, above=1, layers=["l"])], chunk_size=0.5)
+    validate(monitor, session)
+    for start in np.arange(0, 80, 0.5):
+        monitor.samples.append(RateSample("s", start, start + 0.5, np.array([5, 5])))
+    assert "over the last 80.0 ms" in monitor.check_stop_condition(
+        session, condition(80, above=1, layers=["l"])
+    )
+
+
+def test_condition_longer_than_session():
+    monitor = make_monitor([])
+    session = make_session([condition(101, above=1, layers=["l"])])
+    with pytest.raises(ParameterError, match="longer than the session"):
+        validate(monitor, session)
+
+
+@pytest.mark.parametrize("rank, saved", [(None, True), (0, True), (1, False)])
+def test_save_first_process(tmp_path, rank, saved):
+    monitor = make_monitor([])
+    monitor._rank = rank
+    monitor.path = tmp_path / "rates.tsv"
+    monitor._save(RateSample("s", 0, 10, np.array([5.0, np.nan])))
+    assert monitor.path.exists() == saved
+    if saved:
+        assert monitor.path.read_text() == "s\t0\t10\t5\tnan\n"
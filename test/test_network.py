@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_network.py
+
+"""Test the parts of ``Network`` that don't use NEST."""
+
+# pylint: disable=missing-docstring,invalid-name
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from denest.network import (Network, SynapseChangePlan, _changed_values,
+                            _compile_synapse_changes, _is_plastic,
+                            _overlapping_projections,
+                            _plastic_synapse_models)
+from denest.utils.validation import ParameterError
+
+
+def get_projection(name):
+    if name != "proj":
+        raise ParameterError(f"Unknown projection: `{name}`")
+
+
+def test_compile_synapse_changes_defaults():
+    plans = _compile_synapse_changes(
+        [
+            {"synapse_model": "syn_b", "params": {"weight": 2.0}},
+            {"projection": "proj", "params": {"delay": 1.0}},
+            {"synapse_model": "syn_a", "params": {"weight": 1.0}},
+        ],
+        None,
+        get_projection=get_projection,
+    )
+    # Changes are sorted by synapse model and projection
+    assert plans == [
+        SynapseChangePlan(None, "proj", {"delay": 1.0}, "constant", False),
+        SynapseChangePlan("syn_a", None, {"weight": 1.0}, "constant", False),
+        SynapseChangePlan("syn_b", None, {"weight": 2.0}, "constant", False),
+    ]
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        # Missing params
+        {"synapse_model": "syn"},
+        # Unknown key
+        {"synapse_model": "syn", "params": {}, "unknown": 1},
+        # Neither or both selectors
+        {"params": {"weight": 1.0}},
+        {"synapse_model": "syn", "projection": "proj", "params": {}},
+        # Unknown projection
+        {"projection": "other", "params": {}},
+        # Unknown change type
+        {"synapse_model": "syn", "change_type": "divisive", "params": {}},
+    ],
+)
+def test_compile_synapse_changes_invalid(changes):
+    with pytest.raises(ParameterError):
+        _compile_synapse_changes([changes], None, get_projection=get_projection)
+
+
+def test_compile_synapse_changes_projection_without_network():
+    with pytest.raises(ParameterError):
+        _compile_synapse_changes([{"projection": "proj", "params": {}}], None)
+
+
+def test_compile_synapse_changes_from_array(tmp_path):
+    weights = np.arange(6.0).reshape(2, 3)
+    np.save(tmp_path / "weights.npy", weights)
+    changes = {
+        "projection": "proj",
+        "change_type": "multiplicative",
+        "from_array": True,
+        "params": {"weight": "weights.npy", "delay": np.ones((3, 1))},
+    }
+    [plan] = _compile_synapse_changes(
+        [changes], tmp_path, get_projection=get_projection
+    )
+    assert plan.change_type == "multiplicative"
+    assert plan.from_array
+    # Arrays are loaded and flattened
+    assert np.array_equal(plan.params["weight"], np.arange(6.0))
+    assert np.array_equal(plan.params["delay"], np.ones(3))
+    with pytest.raises(FileNotFoundError):
+        _compile_synapse_changes(
+            [changes], tmp_path / "missing", get_projection=get_projection
+        )
+
+
+def test_changed_values():
+    current = [1.0, 2.0, 3.0]
+    assert list(_changed_values(current, 2.0, "multiplicative")) == [2.0, 4.0, 6.0]
+    assert list(_changed_values(current, 2.0, "additive")) == [3.0, 4.0, 5.0]
+    array = np.array([0.0, 1.0, 2.0])
+    assert list(_changed_values(current, array, "multiplicative")) == [0.0, 2.0, 6.0]
+    with pytest.raises(ValueError):
+        _changed_values([1, 2], 2.0, "multiplicative")
+
+
+@pytest.mark.parametrize(
+    "defaults, expected",
+    [
+        ({"weight": 1.0, "delay": 1.0}, False),
+        ({"weight": 1.0, "delay": 1.0, "Kplus": 0.0, "tau_plus": 20.0}, True),
+        ({"weight": 1.0, "U": 0.5, "u": 0.5, "tau_rec": 800.0}, True),
+        # Plasticity isn't inferred from the model's name
+        ({"weight": 1.0, "synapse_model": "static_synapse_hom_w"}, False),
+    ],
+)
+def test_is_plastic(defaults, expected):
+    assert _is_plastic(defaults) == expected
+
+
+def test_plastic_synapse_models():
+    defaults = {
+        "static_synapse": {"weight": 1.0},
+        "stdp_synapse": {"weight": 1.0, "Kplus": 0.0, "tau_plus": 20.0},
+        # Copy of `stdp_synapse` used by a projection recorded by a weight
+        # recorder
+        "stdp_synapse-proj-l1-exc-l2-exc": {
+            "weight": 1.0, "Kplus": 0.0, "tau_plus": 20.0, "weight_recorder": 3,
+        },
+    }
+    projections = [
+        SimpleNamespace(nest_synapse_model=synapse_model)
+        for synapse_model in [
+            "stdp_synapse-proj-l1-exc-l2-exc",
+            "stdp_synapse",
+            "static_synapse",
+            "stdp_synapse",
+        ]
+    ]
+    assert _plastic_synapse_models(projections, defaults.__getitem__) == [
+        "stdp_synapse",
+        "stdp_synapse-proj-l1-exc-l2-exc",
+    ]
+
+
+def make_projection(name, source_population, target_population, synapse_model):
+    return SimpleNamespace(
+        name=name,
+        source=SimpleNamespace(name="l1"),
+        source_population=source_population,
+        target=SimpleNamespace(name="l2"),
+        target_population=target_population,
+        nest_synapse_model=synapse_model,
+    )
+
+
+def test_overlapping_projections():
+    projection = make_projection("proj_1", "exc", "exc", "stdp_synapse")
+    same_synapse_model = make_projection("proj_2", "exc", "exc", "stdp_synapse")
+    all_populations = make_projection("proj_3", None, "exc", "stdp_synapse")
+    other_population = make_projection("proj_4", "inh", "exc", "stdp_synapse")
+    other_synapse_model = make_projection("proj_5", "exc", "exc", "static_synapse")
+    projections = [
+        projection,
+        same_synapse_model,
+        all_populations,
+        other_population,
+        other_synapse_model,
+    ]
+    assert _overlapping_projections(projection, projections) == [
+        same_synapse_model,
+        all_populations,
+    ]
+    assert _overlapping_projections(other_population, projections) == [
+        all_populations
+    ]
+    assert _overlapping_projections(other_synapse_model, projections) == []
+
+
+@pytest.mark.parametrize("layers", [[], ["unknown"]])
+def test_compile_unit_changes_invalid_change_type(layers):
+    network = Network.__new__(Network)
+    network.layers = {}
+    with pytest.raises(ParameterError, match="change_type"):
+        network.compile_unit_changes(
+            [{"layers": layers, "change_type": "divisive", "nest_params": {}}]
+        )
@@ -12,7 +12,7 @@ from pathlib import Path
 
 import pytest
 
-from denest.parameters import ParamsTree
+from denest.parameters import DuplicateLeafError, ParamsTree
 
 assert len(ParamsTree.DATA_KEYS) == 2
 DATA_KEYS = ParamsTree.DATA_KEYS
@@ -150,6 +150,35 @@ def test_named_leaves(t):
     ]
 
 
+def test_find(t):
+    ccc2 = t.children["c2"].children["cc2"].children["ccc2"]
+    assert t.find("c2/cc2/ccc2") is ccc2
+    assert t.find("/c2/cc2/ccc2/") is ccc2
+    assert t.find("") is t
+    assert t.children["c2"].find("cc2/ccc2") is ccc2
+    assert t.leaf("ccc2") is ccc2
+    with pytest.raises(KeyError):
+        t.find("c2/ccc2")
+    with pytest.raises(KeyError):
+        t.leaf("c2")
+    # The index is rebuilt after mutations
+    t.children["c2"].children["cc2"].children["new"] = ParamsTree(
+        {}, parent=t.children["c2"].children["cc2"], name="new"
+    )
+    assert t.find("c2/cc2/new").name == "new"
+    assert ("new", t.leaf("new")) in t.named_leaves()
+
+
+def test_duplicate_leaves(t):
+    t.children["c3"].children["c1"] = ParamsTree({}, parent=t, name="c1")
+    assert len(t.named_leaves()) == 4
+    with pytest.raises(DuplicateLeafError):
+        t.leaf("c1")
+    with pytest.raises(DuplicateLeafError):
+        t.named_leaves(unique=True)
+    assert t.leaf("ccc2").name == "ccc2"
+
+
 def test_read_write(x, t):
     with tempfile.TemporaryDirectory() as tmp:
         path = Path(tmp) / "tree.yml"
@@ -255,3 +284,157 @@ def test_merge_access_traversal(merged):
 def test_merge_children(merged):
     assert set(merged.children.keys()) == set(["hi", 0, 1, 2])
 
+
+
+def test_inherited_data_mutation(t):
+    leaf = t.children["c2"].children["cc2"].children["ccc2"]
+    assert leaf[DK1]["b"] == "c2_b1"
+    assert "new" not in leaf[DK1]
+    # Mutations of ancestors' data are visible in cached views
+    t[DK1]["new"] = 0
+    t.children["c2"][DK1]["b"] = "c2_b1_new"
+    assert leaf[DK1]["new"] == 0
+    assert leaf[DK1]["b"] == "c2_b1_new"
+    del t[DK1]["new"]
+    assert "new" not in leaf[DK1]
+    # Updates through the view modify the scope that defines the key
+    leaf[DK1]["c0_1"] = "updated"
+    assert t[DK1]["c0_1"] == "updated"
+    assert len(leaf[DK1]) == len(set(leaf[DK1]))
+
+
+def test_copy_on_write(t):
+    original = t.asdict()
+    copy = t.copy()
+    assert copy == t
+    leaf = copy.children["c2"].children["cc2"].children["ccc2"]
+    # Mutations of the copy (including through inherited data) don't affect
+    # the original
+    copy[DK1]["new"] = 0
+    leaf[DK1]["c0_1"] = "updated"
+    del leaf[DK1]["b"]
+    assert leaf[DK1]["new"] == 0
+    assert copy[DK1]["c0_1"] == "updated"
+    assert t.asdict() == original
+    # Mutations of the original don't affect the copy
+    t.children["c1"][DK1]["a"] = "original"
+    assert copy.children["c1"][DK1]["a"] != "original"
+    # Merged trees share the data of their input trees
+    merged = ParamsTree.merge(t, ParamsTree({"c1": {DK1: {"a": "merged"}}}))
+    merged.children["c2"][DK1]["a"] = "merged"
+    merged_leaf = merged.children["c2"].children["cc2"].children["ccc2"]
+    merged_leaf[DK1]["c0_1"] = "merged"
+    assert merged[DK1]["c0_1"] == "merged"
+    assert t.children["c2"][DK1]["a"] == original["c2"][DK1]["a"]
+    assert t[DK1]["c0_1"] == original[DK1]["c0_1"]
+    assert merged.children["c1"][DK1]["a"] == "original"
+
+
+def test_load_trees_precedence(tmp_path):
+    from denest import load_trees
+
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"{i}.yml"
+        ParamsTree({DK1: {"x": i, f"x{i}": i}, "c": {DK1: {"y": i}}}).write(path)
+        paths.append(path.name)
+    (tmp_path / "tree_paths.yml").write_text("\n".join(f"- {p}" for p in paths))
+    tree = load_trees(
+        tmp_path / "tree_paths.yml",
+        {"c": {DK1: {"y": "override"}}},
+        parse_cache_dir=tmp_path / "cache",
+        n_threads=4,
+    )
+    assert tree[DK1]["x"] == 0
+    assert all(tree[DK1][f"x{i}"] == i for i in range(20))
+    assert tree.children["c"][DK1]["y"] == "override"
+
+
+def test_fingerprint(x, t):
+    fingerprint = t.fingerprint()
+    assert len(fingerprint) == 64
+    assert t.fingerprint() == fingerprint
+    # Independent of key order and of the node's name
+    reordered = dict(reversed(list(x.items())))
+    reordered[DK1] = dict(reversed(list(x[DK1].items())))
+    assert ParamsTree(reordered, name="other").fingerprint() == fingerprint
+    assert t.copy().fingerprint() == fingerprint
+    # Depends on inherited data
+    leaf = t.children["c2"].children["cc2"].children["ccc2"]
+    leaf_fingerprint = leaf.fingerprint()
+    t[DK1]["c0_1"] = "changed"
+    assert leaf.fingerprint() != leaf_fingerprint
+    assert t.fingerprint() != fingerprint
+    t[DK1]["c0_1"] = "1"
+    assert t.fingerprint() == fingerprint
+    # Depends on children
+    t.children["c3"].children["cc3"].children["new"] = ParamsTree(
+        {}, parent=t.children["c3"].children["cc3"], name="new"
+    )
+    assert t.fingerprint() != fingerprint
+
+
+def test_fingerprint_arrays():
+    import numpy as np
+
+    array = np.zeros(5000)
+    other = array.copy()
+    other[2500] = 1.0
+    assert str(array) == str(other)
+
+    def fingerprint(value):
+        return ParamsTree({DK1: {"x": value}}).fingerprint()
+
+    assert fingerprint(array) == fingerprint(array.copy())
+    assert fingerprint(array) != fingerprint(other)
+    # Same bytes, different dtype or shape
+    assert fingerprint(array) != fingerprint(array.view("int64"))
+    assert fingerprint(array) != fingerprint(array.reshape(50, 100))
+    # Non-contiguous arrays
+    assert fingerprint(other[::2]) == fingerprint(other[::2].copy())
+    assert fingerprint(np.int64(1)) != fingerprint("1")
+
+
+def test_fingerprint_types():
+    def fingerprint(value):
+        return ParamsTree({DK1: {"x": value}}).fingerprint()
+
+    # Values of different types
+    assert fingerprint(1) != fingerprint("1")
+    assert fingerprint(1) != fingerprint(True)
+    assert fingerprint(1) != fingerprint(1.0)
+    assert fingerprint({1: "a"}) != fingerprint({"1": "a"})
+    assert fingerprint(None) != fingerprint("None")
+    # Keys of different types
+    assert fingerprint({1: "a", "b": 2}) == fingerprint({"b": 2, 1: "a"})
+    assert fingerprint({1, "1"}) == fingerprint({"1", 1})
+    # Objects with a reproducible representation
+    assert fingerprint(range(3)) == fingerprint(range(3))
+    # Objects whose representation depends on their address
+    with pytest.raises(TypeError):
+        fingerprint(object())
+
+
+def test_copy_module(t):
+    import copy
+
+    for copied in (copy.copy(t), copy.deepcopy(t)):
+        assert copied == t
+        assert copied.fingerprint() == t.fingerprint()
+        copied[DK1]["c0_1"] = "changed"
+        assert t[DK1]["c0_1"] != "changed"
+
+
+def test_copy_parent(t):
+    parent = ParamsTree({DK1: {"inherited": 0, "c0_1": "parent"}}, name="parent")
+    child = t.copy(parent=parent, name="child")
+    assert child.parent is parent
+    assert child.name == "child"
+    assert child.node_data == t.node_data
+    assert child[DK1]["inherited"] == 0
+    assert child[DK1]["c0_1"] == t[DK1]["c0_1"]
+    leaf = child.children["c2"].children["cc2"].children["ccc2"]
+    assert leaf[DK1]["inherited"] == 0
+    # The data is shared until modified
+    child.children["c2"][DK1]["new"] = 1
+    assert "new" not in t.children["c2"][DK1]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_parse_cache.py
+
+"""Test the cache of parsed parameter files."""
+
+# pylint: disable=missing-docstring,invalid-name
+
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from denest.utils import parse_cache
+
+
+def test_load(tmp_path, monkeypatch):
+    path = tmp_path / "params.yml"
+    cache_dir = tmp_path / "cache"
+    path.write_text("a:\n  params:\n    x: 1\n")
+    assert parse_cache.load(path, cache_dir) == {"a": {"params": {"x": 1}}}
+    assert len(list(cache_dir.glob("*.pickle"))) == 1
+    # Cached files aren't parsed
+    monkeypatch.setattr(parse_cache, "parse_yaml", None)
+    assert parse_cache.load(path, cache_dir) == {"a": {"params": {"x": 1}}}
+    monkeypatch.undo()
+    # Modified files are parsed again
+    path.write_text("a:\n  params:\n    x: 22\n")
+    assert parse_cache.load(path, cache_dir) == {"a": {"params": {"x": 22}}}
+
+
+def test_invalid_entry(tmp_path):
+    path = tmp_path / "params.yml"
+    cache_dir = tmp_path / "cache"
+    path.write_text("x: 1\n")
+    cache_dir.mkdir()
+    (cache_dir / (parse_cache.cache_key(path) + ".pickle")).write_bytes(b"abc")
+    assert parse_cache.load(path, cache_dir) == {"x": 1}
+    # The entry was replaced
+    assert parse_cache.load(path, cache_dir) == {"x": 1}
+    assert not list(cache_dir.glob("*.tmp"))
+
+
+def test_unwritable_cache(tmp_path):
+    path = tmp_path / "params.yml"
+    path.write_text("x: 1\n")
+    cache_dir = tmp_path / "file"
+    cache_dir.write_text("")
+    assert parse_cache.load(path, cache_dir) == {"x": 1}
+
+
+def test_default_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv(parse_cache.ENV_VARIABLE, raising=False)
+    assert parse_cache.default_cache_dir() is None
+    monkeypatch.setenv(parse_cache.ENV_VARIABLE, "")
+    assert parse_cache.default_cache_dir() is None
+    monkeypatch.setenv(parse_cache.ENV_VARIABLE, str(tmp_path))
+    assert parse_cache.default_cache_dir() == str(tmp_path)
+    path = tmp_path / "params.yml"
+    path.write_text("x: 1\n")
+    assert parse_cache.load(path) == {"x": 1}
+    assert len(list(tmp_path.glob("*.pickle"))) == 1
+
+
+def test_disabled_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv(parse_cache.ENV_VARIABLE, raising=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    path = tmp_path / "params.yml"
+    path.write_text("x: 1\n")
+    assert parse_cache.load(path) == {"x": 1}
+    assert [p.name for p in tmp_path.rglob("*")] == ["params.yml"]
+
+
+def test_safe_loads(tmp_path):
+    content = parse_cache.parse_yaml(_write(
+        tmp_path, "a: 2020-01-01\nb: 2020-01-01 10:00:00+01:00\nc: !!set {x}\n"
+    ))
+    assert parse_cache.safe_loads(pickle.dumps(content)) == content
+    with pytest.raises(pickle.UnpicklingError):
+        parse_cache.safe_loads(pickle.dumps(Path("x")))
+
+
+def test_malicious_entry(tmp_path):
+    path = _write(tmp_path, "x: 1\n")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    entry = cache_dir / (parse_cache.cache_key(path) + ".pickle")
+    entry.write_bytes(pickle.dumps(_Exploit()))
+    assert parse_cache.load(path, cache_dir) == {"x": 1}
+
+
+def test_concurrent_writes(tmp_path):
+    path = _write(tmp_path, "x: 1\n")
+    cache_dir = tmp_path / "cache"
+    with ThreadPoolExecutor(8) as executor:
+        results = list(
+            executor.map(lambda _: parse_cache.load(path, cache_dir), range(32))
+        )
+    assert results == [{"x": 1}] * 32
+    assert [p.suffix for p in cache_dir.iterdir()] == [".pickle"]
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (os.system, ("echo unsafe",))
+
+
+def _write(directory, text):
+    path = directory / "params.yml"
+    path.write_text(text)
+    return path
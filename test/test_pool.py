@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_pool.py
+
+"""Test the parts of ``SimulationPool`` that don't use NEST."""
+
+# pylint: disable=missing-docstring,invalid-name,redefined-outer-name
+
+import time
+
+import pytest
+from helpers import simulation_trees  # pylint: disable=unused-import
+
+from denest import pool as pool_module
+from denest.parameters import ParamsTree
+from denest.pool import _WORKER, SimulationPool, _run_job
+
+TREE = {"kernel": {"nest_params": {"local_num_threads": 8, "resolution": 0.1}}}
+
+
+@pytest.mark.parametrize("threads, expected", [(2, 2), (None, 8)])
+def test_run_job_threads(simulation_trees, threads, expected):
+    _run_job((TREE, "output", None, threads, time.time()))
+    (tree,) = simulation_trees
+    # `threads_per_worker` takes precedence over the tree
+    assert tree.children["kernel"].nest_params["local_num_threads"] == expected
+    assert tree.children["kernel"].nest_params["resolution"] == 0.1
+
+
+def test_run_job_failed(simulation_trees):
+    submit_time = time.time() - 10
+    result = _run_job((TREE, "output", None, 1, submit_time))
+    assert len(simulation_trees) == 1
+    assert result.pop("wait_time") >= 10
+    assert result.pop("total_time") >= 0
+    assert result.pop("worker") > 0
+    assert result == {
+        "output_dir": "output",
+        "status": "failed",
+        "error": "SimulationError: no NEST",
+        "init_time": None,
+        "setup_time": None,
+        "run_time": None,
+    }
+
+
+def test_run_job_init_time(monkeypatch, simulation_trees):
+    monkeypatch.setitem(_WORKER, "init_time", 2.5)
+    result = _run_job((TREE, "output", None, 1, time.time()))
+    assert result["init_time"] == 2.5
+
+
+class Context:
+    """Multiprocessing context recording the pools it starts."""
+
+    def __init__(self):
+        self.pools = []
+
+    def Pool(self, n_workers, **kwargs):
+        self.pools.append((n_workers, kwargs))
+
+
+@pytest.mark.parametrize(
+    "n_workers, threads, expected", [(None, None, 8), (None, 3, 2), (3, 4, 3)]
+)
+def test_n_workers(monkeypatch, n_workers, threads, expected):
+    context = Context()
+    monkeypatch.setattr(pool_module.multiprocessing, "get_context", lambda _: context)
+    monkeypatch.setattr(pool_module.os, "cpu_count", lambda: 8)
+    pool = SimulationPool(n_workers, threads_per_worker=threads,
+                          extension_modules=["module"])
+    assert pool.n_workers == expected
+    assert context.pools == [
+        (
+            expected,
+            {"initializer": pool_module._init_worker, "initargs": (["module"],)},
+        )
+    ]
+
+
+def test_job(monkeypatch):
+    monkeypatch.setattr(
+        pool_module.multiprocessing, "get_context", lambda _: Context()
+    )
+    pool = SimulationPool(1, threads_per_worker=2)
+    tree, output_dir, input_dir, threads, submit_time = pool._job(
+        ParamsTree(TREE), "output", "input"
+    )
+    # Jobs are picklable
+    assert tree == ParamsTree(TREE).asdict()
+    assert (output_dir, input_dir, threads) == ("output", "input", 2)
+    assert submit_time <= time.time()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_session.py
+
+"""Test the parts of ``Session`` and of the session loop that don't use NEST."""
+
+# pylint: disable=missing-docstring,invalid-name
+
+import pytest
+
+from denest.session import Session
+from denest.simulation import Simulation
+from denest.utils.validation import ParameterError
+
+
+def make_sessions(durations, stop_conditions=None):
+    sessions, start = [], 0
+    for i, duration in enumerate(durations):
+        params = {"simulation_time": duration}
+        if stop_conditions:
+            params["stop_conditions"] = stop_conditions
+        sessions.append(Session(f"s{i}", params, start_time=start))
+        start = sessions[-1].end
+    return sessions
+
+
+def test_stop_condition_defaults():
+    (session,) = make_sessions([100], stop_conditions=[{"duration": 10, "below": 1}])
+    assert session.stop_conditions == [
+        {
+            "duration": 10,
+            "below": 1,
+            "above": None,
+            "layers": None,
+            "populations": None,
+        }
+    ]
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        {"duration": 10},
+        {"duration": 0, "above": 1},
+        {"above": 1},
+        {"duration": 10, "above": 1, "unknown": 0},
+    ],
+)
+def test_invalid_stop_condition(condition):
+    with pytest.raises(ParameterError):
+        make_sessions([100], stop_conditions=[condition])
+
+
+def test_abort():
+    (session,) = make_sessions([100])
+    assert not session.aborted
+    session.abort("first")
+    session.abort("second")
+    assert session.aborted
+    assert session.abort_reason == "first"
+
+
+def run_sessions(monkeypatch, sessions, abort_at, on_abort):
+    """Run the session loop, aborting sessions at the given kernel times.
+
+    Returns:
+        list: The ``(<start>, <end>)`` times of the sessions that were run.
+    """
+    runs = []
+
+    def run(session, network, hooks=None):  # pylint: disable=unused-argument
+        if session.name in abort_at:
+            session.abort("stop condition")
+            session._end = abort_at[session.name]
+        runs.append((session.start, session.end))
+
+    monkeypatch.setattr(Session, "run", run)
+    monkeypatch.setattr(Session, "save_metadata", lambda session, output_dir: None)
+    simulation = Simulation.__new__(Simulation)
+    simulation.sessions = sessions
+    simulation.sim_params = {"on_abort": on_abort, "checkpoint": False}
+    simulation.network = simulation.output_dir = None
+    simulation.hooks = []
+    simulation.session_status = {}
+    simulation._next_session = 0
+    simulation._stopped = False
+    simulation._run_sessions()
+    return runs, simulation.session_status
+
+
+def test_abort_continue(monkeypatch):
+    sessions = make_sessions([100, 100, 100, 100])
+    runs, status = run_sessions(
+        monkeypatch, sessions, {"s0": 40, "s2": 170}, on_abort="continue"
+    )
+    # Each abort shifts all the following sessions
+    assert runs == [(0, 40), (40, 140), (140, 170), (170, 270)]
+    assert [(session.start, session.end) for session in sessions] == runs
+    assert status == {
+        "s0": {"status": "aborted", "reason": "stop condition"},
+        "s1": {"status": "completed"},
+        "s2": {"status": "aborted", "reason": "stop condition"},
+        "s3": {"status": "completed"},
+    }
+
+
+def test_abort_stop(monkeypatch):
+    sessions = make_sessions([100, 100, 100])
+    runs, status = run_sessions(monkeypatch, sessions, {"s1": 150}, on_abort="stop")
+    assert runs == [(0, 100), (100, 150)]
+    assert status == {
+        "s0": {"status": "completed"},
+        "s1": {"status": "aborted", "reason": "stop condition"},
+        "s2": {"status": "skipped"},
+    }
+
+
+def make_chunked_session(simulation_time, chunk_size, resolution=0.1):
+    return Session(
+        "s",
+        {"simulation_time": simulation_time, "chunk_size": chunk_size},
+        start_time=0,
+        resolution=resolution,
+    )
+
+
+@pytest.mark.parametrize(
+    "simulation_time, chunk_size, resolution, expected",
+    [
+        (100, None, 0.1, [100]),
+        (100, 25, 0.1, [25, 25, 25, 25]),
+        (100, 30, 0.1, [30, 30, 30, 10]),
+        (100, 200, 0.1, [100]),
+        (0, 10, 0.1, []),
+        # Float accumulation of 0.1 ms chunks would run an eleventh chunk
+        (1, 0.1, 0.1, [0.1] * 10),
+        (1, 0.3, 0.1, [0.3, 0.3, 0.3, pytest.approx(0.1)]),
+        (10, 2.5, 0.5, [2.5] * 4),
+    ],
+)
+def test_chunk_durations(simulation_time, chunk_size, resolution, expected):
+    session = make_chunked_session(simulation_time, chunk_size, resolution)
+    durations = session.chunk_durations()
+    assert durations == expected
+    assert sum(durations) == pytest.approx(simulation_time)
+
+
+@pytest.mark.parametrize("chunk_size", [0, -1, 0.05, 0.15, 1.0001])
+def test_invalid_chunk_size(chunk_size):
+    with pytest.raises(ParameterError, match="multiple of the kernel's resolution"):
+        make_chunked_session(100, chunk_size)
+
+
+class RecordingNetwork:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def harvest_recorders(self):
+        self.calls.append("harvest")
+        return 0
+
+
+def test_chunk_hooks_order():
+    calls = []
+    session = make_chunked_session(100, 40)
+    session._phase_times = {"simulate": 0.0, "io": 0.0, "hooks": 0.0}
+    hooks = [
+        lambda session, network: calls.append("hook_1"),
+        lambda session, network: calls.append("hook_2"),
+    ]
+    session._run_chunk_loop(
+        lambda duration: calls.append(duration), RecordingNetwork(calls), hooks
+    )
+    # Recorders are harvested before the hooks are called in order
+    assert calls == [
+        40, "harvest", "hook_1", "hook_2",
+        40, "harvest", "hook_1", "hook_2",
+        20, "harvest", "hook_1", "hook_2",
+    ]
+
+
+def test_chunk_abort():
+    calls = []
+    session = make_chunked_session(100, 10)
+    session._phase_times = {"simulate": 0.0, "io": 0.0, "hooks": 0.0}
+
+    def hook(session, network):  # pylint: disable=unused-argument
+        calls.append("hook")
+        if len(calls) == 6:
+            session.abort("stop condition")
+
+    session._run_chunk_loop(
+        lambda duration: calls.append(duration), RecordingNetwork(calls), [hook]
+    )
+    # The chunks following the abort aren't run
+    assert calls == [10, "harvest", "hook"] * 2
+
+
+class Recorder:
+    def __init__(self, name, gid):
+        self.name = name
+        self.gid = (gid,)
+
+    def __str__(self):
+        return self.name
+
+
+class RecordersNetwork:
+    def __init__(self):
+        self.recorders = [
+            Recorder("spike_detector_l1_exc", 1),
+            Recorder("spike_detector_l1_inh", 2),
+            Recorder("multimeter_l1_exc", 3),
+            Recorder("multimeter_l2_exc", 3),  # Shared node
+            Recorder("weight_recorder_proj", 4),
+        ]
+
+    def get_recorders(self):
+        yield from self.recorders
+
+
+def make_recording_session(record):
+    return Session("s", {"simulation_time": 100, "record": record}, start_time=50)
+
+
+@pytest.mark.parametrize(
+    "record, expected",
+    [
+        (True, []),
+        (False, [1, 2, 3, 4]),
+        ([], [1, 2, 3, 4]),
+        (["spike_detector_*"], [3, 4]),
+        (["*_exc"], [2, 4]),
+        # Shared nodes are inactivated only if none of their recorders match
+        (["multimeter_l2_*"], [1, 2, 4]),
+        (["spike_detector_l1_inh", "weight_recorder_*"], [1, 3]),
+        (["*"], []),
+    ],
+)
+def test_recorders_to_inactivate(record, expected):
+    session = make_recording_session(record)
+    assert session.recorders_to_inactivate(RecordersNetwork()) == expected
+
+
+@pytest.mark.parametrize("record", [None, "spike_detector_*", [1]])
+def test_invalid_record(record):
+    with pytest.raises(ParameterError, match="record"):
+        make_recording_session(record)
+
+
+def test_reactivate_recorders(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        Session,
+        "_set_recorders_start",
+        staticmethod(lambda gids, start: calls.append((gids, start))),
+    )
+    session = make_recording_session(["*_exc"])
+    session.inactivate_recorders(RecordersNetwork())
+    # Inactivated until the planned end of the session
+    assert calls == [([2, 4], 150.0)]
+    # After an abort, the recorders record from the actual end of the session
+    session.abort("stop condition")
+    session._end = 80
+    session.reactivate_recorders()
+    assert calls[-1] == ([2, 4], 80.0)
+
+
+def test_reactivate_no_recorders(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        Session,
+        "_set_recorders_start",
+        staticmethod(lambda gids, start: calls.append((gids, start))),
+    )
+    session = make_recording_session(True)
+    session.inactivate_recorders(RecordersNetwork())
+    session.abort("stop condition")
+    session.reactivate_recorders()
+    assert not calls
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_simulation.py
+
+"""Test the parts of ``Simulation`` that don't use NEST."""
+
+# pylint: disable=missing-docstring,invalid-name
+
+import pytest
+
+from denest import simulation as simulation_module
+from denest.io.checkpoint import save_checkpoint
+from denest.parameters import ParamsTree
+from denest.simulation import Simulation
+from denest.utils.validation import ParameterError
+
+# Real time spent simulating with each number of threads, by MPI rank
+SIMULATE_TIMES = {
+    0: {1: 4.0, 2: 2.0, 4: 3.0},
+    1: {1: 4.0, 2: 5.0, 4: 1.0},
+}
+
+
+@pytest.fixture
+def kernel_tree():
+    return ParamsTree(
+        {
+            "params": {"autotune_threads": [1, 2, 4], "autotune_time": 10.0},
+            "nest_params": {"resolution": 0.1},
+        }
+    )
+
+
+def autotune(monkeypatch, kernel_tree, rank=None, broadcast=None):
+    """Run `Simulation.autotune` with a mocked benchmark."""
+    benchmarks = []
+
+    def benchmark(self, kernel_tree, network_tree, n_threads, duration, data_path):
+        benchmarks.append((n_threads, duration))
+        return {
+            "local_num_threads": n_threads,
+            "total_num_virtual_procs": 2 * n_threads,
+            "create_time": 1.0,
+            "simulate_time": SIMULATE_TIMES[rank or 0][n_threads],
+        }
+
+    monkeypatch.setattr(Simulation, "_benchmark", benchmark)
+    monkeypatch.setattr(Simulation, "_mpi_rank", staticmethod(lambda: rank))
+    if broadcast is not None:
+        monkeypatch.setattr(Simulation, "_mpi_broadcast", staticmethod(broadcast))
+    simulation = Simulation.__new__(Simulation)
+    simulation.autotune(kernel_tree, ParamsTree())
+    assert benchmarks == [(1, 10.0), (2, 10.0), (4, 10.0)]
+    return simulation
+
+
+def test_autotune(monkeypatch, kernel_tree):
+    simulation = autotune(monkeypatch, kernel_tree)
+    # The fastest number of threads is saved in the tree
+    assert kernel_tree.nest_params == {"resolution": 0.1, "local_num_threads": 2}
+    assert kernel_tree.params["autotune_threads"] is None
+    assert simulation.autotune_results["local_num_threads"] == 2
+    assert simulation.autotune_results["total_num_virtual_procs"] == 4
+    assert simulation.autotune_results["autotune_time"] == 10.0
+    assert [
+        point["simulate_time"] for point in simulation.autotune_results["curve"]
+    ] == [4.0, 2.0, 3.0]
+
+
+def test_autotune_mpi(monkeypatch, kernel_tree):
+    monkeypatch.setattr(simulation_module, "_has_mpi4py", lambda: True)
+    # Rank 1 measured different times but uses the curve of rank 0
+    rank_0_curve = []
+
+    def broadcast(curve):
+        if not rank_0_curve:
+            rank_0_curve.extend(curve)
+        return rank_0_curve
+
+    autotune(monkeypatch, kernel_tree, rank=0, broadcast=broadcast)
+    assert kernel_tree.nest_params["local_num_threads"] == 2
+    other_tree = ParamsTree(
+        {"params": {"autotune_threads": [1, 2, 4], "autotune_time": 10.0}}
+    )
+    simulation = autotune(monkeypatch, other_tree, rank=1, broadcast=broadcast)
+    assert other_tree.nest_params["local_num_threads"] == 2
+    assert simulation.autotune_results["curve"] == rank_0_curve
+
+
+def test_autotune_mpi_without_mpi4py(monkeypatch, kernel_tree):
+    monkeypatch.setattr(simulation_module, "_has_mpi4py", lambda: False)
+    monkeypatch.setattr(Simulation, "_mpi_rank", staticmethod(lambda: 0))
+    simulation = Simulation.__new__(Simulation)
+    with pytest.raises(ParameterError, match="mpi4py"):
+        simulation.autotune(kernel_tree, ParamsTree())
+    assert kernel_tree.params["autotune_threads"] == [1, 2, 4]
+
+
+@pytest.mark.parametrize(
+    "params, nest_params",
+    [
+        ({"unknown": 1}, {}),
+        ({}, {"data_path": "output"}),
+        ({"autotune_threads": 4}, {}),
+        ({"autotune_threads": []}, {}),
+        ({"autotune_threads": [1, 0]}, {}),
+    ],
+)
+def test_autotune_invalid_kernel_tree(monkeypatch, kernel_tree, params,
+                                      nest_params):
+    def benchmark(*args):
+        raise AssertionError("benchmarked an invalid kernel tree")
+
+    monkeypatch.setattr(Simulation, "_benchmark", benchmark)
+    monkeypatch.setattr(Simulation, "_mpi_rank", staticmethod(lambda: None))
+    kernel_tree.params.update(params)
+    kernel_tree.nest_params.update(nest_params)
+    simulation = Simulation.__new__(Simulation)
+    with pytest.raises(ParameterError):
+        simulation.autotune(kernel_tree, ParamsTree())
+
+
+def save_output_checkpoint(output_dir):
+    tree = ParamsTree({"simulation": {"params": {"output_dir": str(output_dir)}}})
+    path = output_dir / "checkpoint"
+    save_checkpoint(path, tree, {"next_session": 1}, {"units": {}, "synapses": {}})
+    return path
+
+
+def test_resume_into_previous_output(tmp_path):
+    output_dir = tmp_path / "output"
+    path = save_output_checkpoint(output_dir)
+    (output_dir / "data").mkdir()
+    (output_dir / "data" / "session_times.yml").write_text("{}")
+    # The output directory of the checkpoint's tree
+    with pytest.raises(ValueError, match="Use a new output directory"):
+        Simulation.resume(path)
+    # An explicit output directory
+    with pytest.raises(ValueError, match="Use a new output directory"):
+        Simulation.resume(path, output_dir=output_dir)
+
+
+@pytest.mark.parametrize("create", [False, True])
+def test_check_resume_output_dir(tmp_path, create):
+    path = save_output_checkpoint(tmp_path / "output")
+    output_dir = tmp_path / "new"
+    if create:
+        output_dir.mkdir()
+    simulation_module._check_resume_output_dir(output_dir, path)
+    # Only the checkpoint in the output directory
+    simulation_module._check_resume_output_dir(tmp_path / "output", path)
+
+
+class MetadataSaved(Exception):
+    pass
+
+
+@pytest.mark.parametrize(
+    "rank, clear_output_dir, expected",
+    [
+        (None, True, [("make_output_dir", True)]),
+        (0, True, [("make_output_dir", True), "barrier"]),
+        (1, True, [("make_output_dir", False), "barrier"]),
+        (1, False, [("make_output_dir", False)]),
+    ],
+)
+def test_save_metadata_clears_output_dir_once(
+    monkeypatch, tmp_path, rank, clear_output_dir, expected
+):
+    calls = []
+
+    def make_output_dir(output_dir, clear_output_dir=True):
+        calls.append(("make_output_dir", clear_output_dir))
+
+    def write(path):
+        # Stop once metadata is written
+        raise MetadataSaved
+
+    monkeypatch.setattr(simulation_module, "make_output_dir", make_output_dir)
+    monkeypatch.setattr(
+        Simulation, "_mpi_barrier", staticmethod(lambda: calls.append("barrier"))
+    )
+    simulation = Simulation.__new__(Simulation)
+    simulation.output_dir = str(tmp_path)
+    simulation._catalog_rank = rank
+    simulation.tree = ParamsTree()
+    monkeypatch.setattr(simulation.tree, "write", write)
+    with pytest.raises(MetadataSaved):
+        simulation.save_metadata(clear_output_dir=clear_output_dir)
+    assert calls == expected
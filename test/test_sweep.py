@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_sweep.py
+
+"""Test the parts of sweeps that don't use NEST."""
+
+# pylint: disable=missing-docstring,invalid-name,redefined-outer-name
+
+import pandas as pd
+import pytest
+from helpers import simulation_trees  # pylint: disable=unused-import
+
+from denest.sweep import (_REPLICA, SUMMARY_FILENAME, _init_replica,
+                          _run_point, _run_replica, _save_summary,
+                          _simulation_status)
+from denest.utils import misc
+
+
+@pytest.fixture
+def params_path(tmp_path):
+    (tmp_path / "tree.yml").write_text(
+        "kernel:\n  nest_params:\n    local_num_threads: 8\n    resolution: 0.1\n"
+    )
+    path = tmp_path / "params.yml"
+    path.write_text("- tree.yml\n")
+    return path
+
+
+def run_point(path, overrides, threads):
+    return _run_point(
+        (3, str(path), overrides, "output", None, threads, False, None)
+    )
+
+
+@pytest.mark.parametrize(
+    "overrides, threads, expected",
+    [
+        ({}, 2, 2),
+        ({"kernel": {"nest_params": {"local_num_threads": 4}}}, 2, 2),
+        ({"kernel": {"nest_params": {"local_num_threads": 4}}}, None, 4),
+        ({}, None, 8),
+    ],
+)
+def test_run_point_threads(simulation_trees, params_path, overrides, threads,
+                           expected):
+    run_point(params_path, overrides, threads)
+    (tree,) = simulation_trees
+    # `threads_per_worker` takes precedence over the point's overrides, which
+    # take precedence over the parameter files
+    assert tree.children["kernel"].nest_params["local_num_threads"] == expected
+    assert tree.children["kernel"].nest_params["resolution"] == 0.1
+
+
+def test_run_point_failed(simulation_trees, params_path):
+    result = run_point(params_path, {}, 1)
+    assert len(simulation_trees) == 1
+    assert result.pop("real_time") >= 0
+    assert result == {
+        "point": 3,
+        "output_dir": "output",
+        "status": "failed",
+        "error": "SimulationError: no NEST",
+        "n_aborted_sessions": None,
+        "virtual_time": None,
+    }
+
+
+def test_run_point_missing_file(tmp_path):
+    result = run_point(tmp_path / "missing.yml", {}, 1)
+    assert result["status"] == "failed"
+    assert result["error"].startswith("FileNotFoundError")
+
+
+class Replica:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.session_status = {
+            "a": {"status": "completed"},
+            "b": {"status": "aborted", "reason": "stop condition"},
+            "c": {"status": "skipped"},
+        }
+
+    def fork_replica(self, output_dir, **kwargs):
+        self.calls.append(("fork_replica", output_dir, kwargs))
+        if self.fail:
+            raise ValueError("already ran")
+
+    def run(self):
+        self.calls.append(("run",))
+
+    @staticmethod
+    def total_time():
+        return 150
+
+
+@pytest.fixture
+def replica():
+    replica = Replica()
+    _init_replica(replica)
+    yield replica
+    _REPLICA.clear()
+
+
+def test_run_replica(replica):
+    result = _run_replica((1, "output/1", ["s1"], {"s1": {}}, 12))
+    assert replica.calls == [
+        (
+            "fork_replica",
+            "output/1",
+            {"sessions": ["s1"], "session_models": {"s1": {}}, "nest_seed": 12},
+        ),
+        ("run",),
+    ]
+    assert result.pop("real_time") >= 0
+    assert result == {
+        "point": 1,
+        "output_dir": "output/1",
+        "status": "completed",
+        "error": None,
+        "n_aborted_sessions": 1,
+        "virtual_time": 150,
+    }
+
+
+def test_run_replica_failed(replica):
+    replica.fail = True
+    result = _run_replica((0, "output/0", None, None, 2))
+    assert replica.calls[-1][0] == "fork_replica"
+    assert result["status"] == "failed"
+    assert result["error"] == "ValueError: already ran"
+    assert result["n_aborted_sessions"] is None
+    assert result["virtual_time"] is None
+
+
+def test_save_summary(tmp_path):
+    results = [
+        {"point": 2, "status": "failed", "error": "ValueError: x",
+         "real_time": 1.5},
+        {"point": 0, "status": "completed", "error": None, "real_time": 2.0},
+        {"point": 1, "status": "cached", "error": None, "real_time": 0.1},
+    ]
+    summary = _save_summary(results, tmp_path)
+    saved = pd.read_csv(tmp_path / SUMMARY_FILENAME, sep="\t")
+    # One row per point, sorted by point
+    assert list(saved.columns) == ["point", "status", "error", "real_time"]
+    assert list(saved["point"]) == [0, 1, 2]
+    assert list(saved["status"]) == ["completed", "cached", "failed"]
+    assert saved["error"].isna().tolist() == [True, True, False]
+    assert list(summary.index) == [0, 1, 2]
+    assert list(summary["real_time"]) == [2.0, 0.1, 1.5]
+
+
+@pytest.mark.parametrize(
+    "cpu_count, threads, expected",
+    [(8, None, 8), (8, 1, 8), (8, 3, 2), (8, 16, 1), (None, None, 1)],
+)
+def test_default_n_workers(monkeypatch, cpu_count, threads, expected):
+    monkeypatch.setattr(misc.os, "cpu_count", lambda: cpu_count)
+    assert misc.default_n_workers(threads) == expected
+
+
+def test_simulation_status():
+    status = _simulation_status(Replica())
+    assert status == {"virtual_time": 150, "n_aborted_sessions": 1}